@@ -0,0 +1,82 @@
+import json
+import importlib
+import random
+import timeit
+
+ITERATIONS = {
+	"bookTicker": 200000,
+	"depth diff": 20000,
+	"depth snapshot 1000": 500
+}
+
+def create_book_ticker_frame() -> str:
+	return json.dumps({
+		"stream": "!bookTicker",
+		"data": {
+			"u": 400900217,
+			"s": "BNBUSDT",
+			"b": "25.35190000",
+			"B": "31.21000000",
+			"a": "25.36520000",
+			"A": "40.66000000"
+		}
+	}, separators = (',', ':'))
+
+def create_levels(count : int, start_price : float, step : float) -> list:
+	return [[f"{start_price + i * step:.8f}", f"{random.uniform(0.001, 50):.8f}"] for i in range(count)]
+
+def create_depth_diff_frame() -> str:
+	return json.dumps({
+		"stream": "btcusdt@depth@100ms",
+		"data": {
+			"e": "depthUpdate",
+			"E": 1588760131789,
+			"s": "BTCUSDT",
+			"U": 4283218713,
+			"u": 4283218740,
+			"b": create_levels(15, 8900.0, -0.01),
+			"a": create_levels(15, 8900.5, 0.01)
+		}
+	}, separators = (',', ':'))
+
+def create_depth_snapshot() -> bytes:
+	return json.dumps({
+		"lastUpdateId": 4283218713,
+		"bids": create_levels(1000, 8900.0, -0.01),
+		"asks": create_levels(1000, 8900.5, 0.01)
+	}, separators = (',', ':')).encode('utf-8')
+
+def get_decoders() -> dict:
+	decoders = {"json": json.loads}
+	for name in ["orjson", "simdjson", "ujson"]:
+		try:
+			decoders[name] = importlib.import_module(name).loads
+		except ImportError:
+			print(f"{name} not installed, skipping")
+
+	return decoders
+
+def run():
+	random.seed(0)
+	payloads = {
+		"bookTicker": create_book_ticker_frame(),
+		"depth diff": create_depth_diff_frame(),
+		"depth snapshot 1000": create_depth_snapshot()
+	}
+	decoders = get_decoders()
+
+	for payload_name, payload in payloads.items():
+		iterations = ITERATIONS[payload_name]
+		print(f"\n{payload_name} ({len(payload)} bytes, {iterations} iterations)")
+
+		for decoder_name, decoder in decoders.items():
+			elapsed = timeit.timeit(lambda: decoder(payload), number = iterations)
+			print(f"  {decoder_name:>10}: {elapsed / iterations * 1e6:9.2f} us/message")
+
+		# the original REST path: bytes -> str -> json.loads
+		if isinstance(payload, bytes):
+			elapsed = timeit.timeit(lambda: json.loads(payload.decode('utf-8')), number = iterations)
+			print(f"  {'json+text':>10}: {elapsed / iterations * 1e6:9.2f} us/message")
+
+if __name__ == "__main__":
+	run()
@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+from binance.Pair import Pair
+from binance.subscriptions import SubscriptionMgr, TradeSubscription
+
+ITERATIONS = 100000
+STREAM_COUNTS = [1, 10, 100, 500, 1000]
+
+async def run():
+	print(f"Dispatch cost per message ({ITERATIONS} messages, target is the last subscribed stream)\n")
+
+	for stream_count in STREAM_COUNTS:
+		subscriptions = [TradeSubscription(pair = Pair(f"SYM{i}", "USDT")) for i in range(stream_count)]
+		subscription_mgr = SubscriptionMgr(subscriptions, api_key = None)
+		subscription_mgr._build_subscription_index()
+
+		message = {
+			"stream": subscriptions[-1].get_channel_name(),
+			"data": {}
+		}
+
+		start = time.perf_counter()
+		for _ in range(ITERATIONS):
+			await subscription_mgr.process_message(message)
+		elapsed = time.perf_counter() - start
+
+		print(f"{stream_count:>5} streams: {elapsed / ITERATIONS * 1e9:8.1f} ns/message")
+
+if __name__ == "__main__":
+	asyncio.run(run())
@@ -0,0 +1,238 @@
+import asyncio
+import collections
+import logging
+import sys
+from typing import Dict, List, Optional, Union
+
+from binance.Pair import Pair
+
+LOG = logging.getLogger(__name__)
+
+class Order(object):
+	__slots__ = ('symbol', 'order_id', 'client_order_id', 'order_list_id', 'side', 'type', 'time_in_force', 'price',
+	             'quantity', 'stop_price', 'status', 'executed_quantity', 'cumulative_quote_quantity', 'time', 'update_time')
+
+	# statuses of orders which may still be executed
+	OPEN_STATUSES = frozenset(["NEW", "PARTIALLY_FILLED", "PENDING_NEW"])
+
+	def __init__(self, symbol : str, order_id : int, client_order_id : str, order_list_id : int, side : str, type : str,
+	             time_in_force : str, price : float, quantity : float, stop_price : float, status : str,
+	             executed_quantity : float, cumulative_quote_quantity : float, time : int, update_time : int) -> None:
+		self.symbol = sys.intern(symbol)
+		self.order_id = order_id
+		self.client_order_id = client_order_id
+		self.order_list_id = order_list_id
+		self.side = side
+		self.type = type
+		self.time_in_force = time_in_force
+		self.price = price
+		self.quantity = quantity
+		self.stop_price = stop_price
+		self.status = status
+		self.executed_quantity = executed_quantity
+		self.cumulative_quote_quantity = cumulative_quote_quantity
+		self.time = time
+		self.update_time = update_time
+
+	@staticmethod
+	def from_rest(raw : dict) -> 'Order':
+		return Order(raw["symbol"], raw["orderId"], raw["clientOrderId"], raw.get("orderListId", -1), raw["side"], raw["type"],
+		             raw["timeInForce"], float(raw["price"]), float(raw["origQty"]), float(raw.get("stopPrice", 0)), raw["status"],
+		             float(raw["executedQty"]), float(raw["cummulativeQuoteQty"]), raw["time"], raw["updateTime"])
+
+	@staticmethod
+	def from_execution_report(raw : dict) -> 'Order':
+		# cancellations carry the client order id of the cancel request in `c` and the one of the order in `C`
+		client_order_id = raw["C"] if raw["x"] == "CANCELED" and raw.get("C") else raw["c"]
+
+		return Order(raw["s"], raw["i"], client_order_id, raw.get("g", -1), raw["S"], raw["o"], raw["f"], float(raw["p"]),
+		             float(raw["q"]), float(raw["P"]), raw["X"], float(raw["z"]), float(raw["Z"]), raw["O"], raw["T"])
+
+	def is_open(self) -> bool:
+		return self.status in Order.OPEN_STATUSES
+
+	def __repr__(self):
+		fields = [f"{name}={getattr(self, name)!r}" for name in self.__slots__]
+		return f"Order({', '.join(fields)})"
+
+class AssetBalance(object):
+	__slots__ = ('asset', 'free', 'locked', 'update_time')
+
+	def __init__(self, asset : str, free : float, locked : float, update_time : int) -> None:
+		self.asset = sys.intern(asset)
+		self.free = free
+		self.locked = locked
+		self.update_time = update_time
+
+	def __repr__(self):
+		return f"AssetBalance(asset={self.asset!r}, free={self.free!r}, locked={self.locked!r}, update_time={self.update_time!r})"
+
+class AccountStore(object):
+	# In-memory state of orders and balances of the account kept up to date by events of the user data stream
+	# (executionReport and outboundAccountPosition, see AccountSubscription). The state is seeded from REST once and
+	# reconciled with REST periodically and whenever requested (e.g. after the websocket has been reconnected) to
+	# recover from events missed while the websocket was disconnected. Updates
+	# older than the stored state (by their transaction/update time) are ignored, hence REST responses and events may
+	# be applied in any order.
+	#
+	# Orders are indexed by symbol and order id, by client order id and open orders by symbol. Closed orders are kept
+	# for lookups until there are more than `max_closed_orders` of them.
+	#
+	# A store may be shared by several subscriptions, each initialize() is paired with a close() and the periodic
+	# reconciliation runs until the last user closes the store.
+	def __init__(self, binance_client, reconciliation_interval_s : float = 5 * 60, max_closed_orders : int = 10000) -> None:
+		self.binance_client = binance_client
+		self.reconciliation_interval_s = reconciliation_interval_s
+		self.max_closed_orders = max_closed_orders
+
+		# (symbol, order id) -> order
+		self.orders : Dict[tuple, Order] = {}
+		self.orders_by_client_order_id : Dict[str, Order] = {}
+		# symbol -> order id -> open order
+		self.open_orders_by_symbol : Dict[str, Dict[int, Order]] = {}
+		# (symbol, order id) of closed orders in the order they were closed
+		self.closed_orders = collections.OrderedDict()
+
+		self.balances : Dict[str, AssetBalance] = {}
+
+		self.initialized = False
+		self.user_count = 0
+		self.reconciliation_task = None
+		self.reconciliation_requested = None
+
+	async def initialize(self) -> None:
+		# seeds the state for the first user, the state is reconciled periodically from then on
+		self.user_count += 1
+		if self.initialized:
+			return
+
+		try:
+			await self.reconcile()
+		except BaseException:
+			self.user_count -= 1
+			raise
+
+		# another user may have initialized the store meanwhile
+		if not self.initialized:
+			self.initialized = True
+			self.reconciliation_requested = asyncio.Event()
+			self.reconciliation_task = asyncio.create_task(self._reconcile_periodically())
+
+	def close(self) -> None:
+		if self.user_count > 0:
+			self.user_count -= 1
+		if self.user_count > 0:
+			return
+
+		self.initialized = False
+		self.reconciliation_requested = None
+		if self.reconciliation_task is not None:
+			self.reconciliation_task.cancel()
+			self.reconciliation_task = None
+
+	def request_reconciliation(self) -> None:
+		# reconciles as soon as possible rather than waiting for the next periodic reconciliation
+		if self.reconciliation_requested is not None:
+			self.reconciliation_requested.set()
+
+	def get_order(self, pair : Union[Pair, str], order_id : int) -> Optional[Order]:
+		return self.orders.get((str(pair), order_id))
+
+	def get_order_by_client_order_id(self, client_order_id : str) -> Optional[Order]:
+		return self.orders_by_client_order_id.get(client_order_id)
+
+	def get_open_orders(self, pair : Union[Pair, str] = None) -> List[Order]:
+		if pair is not None:
+			return list(self.open_orders_by_symbol.get(str(pair), {}).values())
+
+		return [order for open_orders in self.open_orders_by_symbol.values() for order in open_orders.values()]
+
+	def get_balance(self, asset : str) -> Optional[AssetBalance]:
+		return self.balances.get(asset)
+
+	def get_balances(self) -> List[AssetBalance]:
+		return list(self.balances.values())
+
+	def process_event(self, raw : dict) -> None:
+		event_type = raw.get("e")
+		if event_type == "executionReport":
+			self.update_order(Order.from_execution_report(raw))
+		elif event_type == "outboundAccountPosition":
+			for balance in raw["B"]:
+				self.update_balance(AssetBalance(balance["a"], float(balance["f"]), float(balance["l"]), raw["u"]))
+
+	def update_order(self, order : Order) -> None:
+		key = (order.symbol, order.order_id)
+		stored_order = self.orders.get(key)
+		if stored_order is not None:
+			if stored_order.update_time > order.update_time:
+				return
+
+			# the same update may be received from REST and the stream, executed quantity grows only
+			if stored_order.update_time == order.update_time and stored_order.executed_quantity > order.executed_quantity:
+				return
+
+			if stored_order.client_order_id != order.client_order_id and \
+				self.orders_by_client_order_id.get(stored_order.client_order_id) is stored_order:
+				del self.orders_by_client_order_id[stored_order.client_order_id]
+
+		self.orders[key] = order
+		self.orders_by_client_order_id[order.client_order_id] = order
+
+		if order.is_open():
+			self.open_orders_by_symbol.setdefault(order.symbol, {})[order.order_id] = order
+			self.closed_orders.pop(key, None)
+		else:
+			open_orders = self.open_orders_by_symbol.get(order.symbol)
+			if open_orders is not None:
+				open_orders.pop(order.order_id, None)
+				if len(open_orders) == 0:
+					del self.open_orders_by_symbol[order.symbol]
+
+			self.closed_orders[key] = None
+			self.closed_orders.move_to_end(key)
+			if len(self.closed_orders) > self.max_closed_orders:
+				self._remove_order(self.closed_orders.popitem(last = False)[0])
+
+	def update_balance(self, balance : AssetBalance) -> None:
+		stored_balance = self.balances.get(balance.asset)
+		if stored_balance is None or stored_balance.update_time <= balance.update_time:
+			self.balances[balance.asset] = balance
+
+	async def reconcile(self) -> None:
+		# open orders and balances are replaced by the REST state unless the stream delivered a newer one meanwhile;
+		# orders open locally but not on the exchange have been closed while no events were received
+		account = (await self.binance_client.get_account())["response"]
+		for balance in account["balances"]:
+			self.update_balance(AssetBalance(balance["asset"], float(balance["free"]), float(balance["locked"]), account["updateTime"]))
+
+		open_orders = (await self.binance_client.get_open_orders())["response"]
+		for raw_order in open_orders:
+			self.update_order(Order.from_rest(raw_order))
+
+		open_order_keys = set((raw_order["symbol"], raw_order["orderId"]) for raw_order in open_orders)
+		for order in self.get_open_orders():
+			if (order.symbol, order.order_id) not in open_order_keys:
+				LOG.info(f"Open order {order.symbol} {order.order_id} missing on the exchange, fetching its state.")
+				raw_order = (await self.binance_client.get_order(order.symbol, order_id = order.order_id))["response"]
+				self.update_order(Order.from_rest(raw_order))
+
+	async def _reconcile_periodically(self) -> None:
+		while True:
+			try:
+				await asyncio.wait_for(self.reconciliation_requested.wait(), self.reconciliation_interval_s)
+			except asyncio.TimeoutError:
+				pass
+			self.reconciliation_requested.clear()
+
+			try:
+				await self.reconcile()
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				LOG.error(f"Account state could not be reconciled: {e}")
+
+	def _remove_order(self, key : tuple) -> None:
+		order = self.orders.pop(key, None)
+		if order is not None and self.orders_by_client_order_id.get(order.client_order_id) is order:
+			del self.orders_by_client_order_id[order.client_order_id]
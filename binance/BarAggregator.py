@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from binance.Pair import Pair
+from binance import enums
+
+LOG = logging.getLogger(__name__)
+
+# candlesticks are aligned to multiples of their interval since the epoch except for weeks starting on Monday, 4 days
+# after the epoch
+CANDELSTICK_INTERVAL_OFFSET_MS = {
+	enums.CandelstickInterval.I_1W: 4 * 24 * 3600 * 1000
+}
+
+class Bar(object):
+	__slots__ = ('symbol', 'open_time', 'close_time', 'open', 'high', 'low', 'close', 'volume', 'quote_volume',
+	             'trade_count', 'last_trade_id')
+
+	def __init__(self, symbol : str, open_time : int, close_time : int, open : float, high : float, low : float,
+	             close : float, volume : float = 0.0, quote_volume : float = 0.0, trade_count : int = 0,
+	             last_trade_id : int = -1) -> None:
+		self.symbol = symbol
+		self.open_time = open_time
+		self.close_time = close_time
+		self.open = open
+		self.high = high
+		self.low = low
+		self.close = close
+		self.volume = volume
+		self.quote_volume = quote_volume
+		self.trade_count = trade_count
+		self.last_trade_id = last_trade_id
+
+	def __repr__(self):
+		fields = [f"{name}={getattr(self, name)!r}" for name in self.__slots__]
+		return f"Bar({', '.join(fields)})"
+
+class BarAggregator(object):
+	# Incremental OHLCV bars of arbitrary length built from aggregate trades of any number of symbols, each trade
+	# updates the current bar of its symbol in O(1). Bars are aligned to multiples of the interval since the epoch
+	# (shifted by `offset_ms`) like the candlesticks of binance. Intervals without any trade produce bars with the
+	# previous close price and no volume.
+	#
+	# Callbacks are called synchronously with every closed bar. A bar is closed by the first trade after its end or,
+	# if `close_delay_ms` is set, by a timer once the local clock is `close_delay_ms` past its end (the delay absorbs
+	# latency and clock skew, later trades of the bar are ignored). The timer needs a running event loop and is meant
+	# for live trades, not for replaying historical ones.
+	#
+	# If a client is provided, the current bar of a symbol is seeded from REST (closed 1 minute candlesticks and
+	# aggregate trades) once its first trade is received, live trades are held back until then.
+	SEED_PAGE_SIZE = 1000
+
+	def __init__(self, interval_ms : int, callbacks : List[Callable[[Bar], Any]] = None, offset_ms : int = 0,
+	             binance_client = None, close_delay_ms : Optional[int] = None) -> None:
+		self.interval_ms = interval_ms
+		self.offset_ms = offset_ms
+		self.callbacks = callbacks if callbacks is not None else []
+		self.binance_client = binance_client
+		self.close_delay_ms = close_delay_ms
+		self.close_task = None
+		# close time of the bar the timer is waiting for, the timer is woken up by bars to be closed earlier
+		self.next_close_time = None
+		self.bar_opened = None
+
+		# symbol -> current bar
+		self.bars : Dict[str, Bar] = {}
+
+		# symbol -> live trades received while the symbol is being seeded
+		self.buffered_trades : Dict[str, list] = {}
+		self.seed_tasks : Dict[str, asyncio.Task] = {}
+
+	@staticmethod
+	def from_interval(interval : enums.CandelstickInterval, callbacks : List[Callable[[Bar], Any]] = None,
+	                  binance_client = None, close_delay_ms : Optional[int] = None) -> 'BarAggregator':
+		interval_ms = enums.CANDELSTICK_INTERVAL_MS.get(interval)
+		if interval_ms is None:
+			raise ValueError(f"Interval {interval.value} is not of a fixed length.")
+
+		return BarAggregator(interval_ms, callbacks, CANDELSTICK_INTERVAL_OFFSET_MS.get(interval, 0), binance_client, close_delay_ms)
+
+	def get_bar(self, pair : Union[Pair, str]) -> Optional[Bar]:
+		return self.bars.get(str(pair))
+
+	def get_open_time(self, time_ms : int) -> int:
+		return time_ms - (time_ms - self.offset_ms) % self.interval_ms
+
+	def add_trade(self, symbol : str, trade_id : int, time_ms : int, price : float, quantity : float, trade_count : int = 1) -> None:
+		if self.close_delay_ms is not None and self.close_task is None:
+			self.bar_opened = asyncio.Event()
+			self.close_task = asyncio.create_task(self._close_periodically())
+
+		buffered_trades = self.buffered_trades.get(symbol)
+		if buffered_trades is not None:
+			buffered_trades.append((trade_id, time_ms, price, quantity, trade_count))
+			return
+
+		if self.binance_client is not None and symbol not in self.bars:
+			self.buffered_trades[symbol] = [(trade_id, time_ms, price, quantity, trade_count)]
+			self.seed_tasks[symbol] = asyncio.create_task(self._seed(symbol, time_ms))
+			return
+
+		self._apply_trade(symbol, trade_id, time_ms, price, quantity, trade_count)
+
+	def remove_symbol(self, symbol : str) -> None:
+		# drops the symbol's current bar without closing it, the aggregator is closed once no symbol is left
+		seed_task = self.seed_tasks.pop(symbol, None)
+		if seed_task is not None:
+			seed_task.cancel()
+		self.buffered_trades.pop(symbol, None)
+		self.bars.pop(symbol, None)
+
+		if len(self.bars) == 0 and len(self.buffered_trades) == 0:
+			self.close()
+
+	def close(self) -> None:
+		for seed_task in self.seed_tasks.values():
+			seed_task.cancel()
+		self.seed_tasks.clear()
+
+		if self.close_task is not None:
+			self.close_task.cancel()
+			self.close_task = None
+			self.next_close_time = None
+			self.bar_opened = None
+
+	def _apply_trade(self, symbol : str, trade_id : int, time_ms : int, price : float, quantity : float, trade_count : int) -> None:
+		bar = self.bars.get(symbol)
+		if bar is not None:
+			# trades are delivered in order, older ones can come only from seeding
+			if trade_id <= bar.last_trade_id or time_ms < bar.open_time:
+				return
+
+			if time_ms <= bar.close_time:
+				# the first trade of a bar opened by the timer
+				if bar.trade_count == 0:
+					bar.open = bar.high = bar.low = price
+
+				bar.close = price
+				if price > bar.high:
+					bar.high = price
+				elif price < bar.low:
+					bar.low = price
+				bar.volume += quantity
+				bar.quote_volume += price * quantity
+				bar.trade_count += trade_count
+				bar.last_trade_id = trade_id
+				return
+
+			self._close_bars(bar, time_ms)
+
+		open_time = self.get_open_time(time_ms)
+		bar = Bar(symbol, open_time, open_time + self.interval_ms - 1, price, price, price, price, quantity,
+		          price * quantity, trade_count, trade_id)
+		self.bars[symbol] = bar
+		self._schedule_close(bar)
+
+	def _close_bars(self, bar : Bar, time_ms : int) -> None:
+		# closes the bar and the empty bars following it up to the bar of the given time
+		self._notify(bar)
+
+		open_time = bar.close_time + 1
+		while open_time + self.interval_ms <= time_ms:
+			self._notify(Bar(bar.symbol, open_time, open_time + self.interval_ms - 1, bar.close, bar.close, bar.close,
+			                 bar.close, last_trade_id = bar.last_trade_id))
+			open_time += self.interval_ms
+
+	async def _close_periodically(self) -> None:
+		while True:
+			# bars being seeded are completed by their trades first
+			self.next_close_time = min((bar.close_time for bar in self.bars.values() if bar.symbol not in self.buffered_trades), default = None)
+			timeout = None if self.next_close_time is None else max(0.0, (self.next_close_time + self.close_delay_ms) / 1000 - time.time())
+			try:
+				await asyncio.wait_for(self.bar_opened.wait(), timeout)
+			except asyncio.TimeoutError:
+				pass
+			self.bar_opened.clear()
+
+			now_ms = time.time() * 1000
+			for bar in list(self.bars.values()):
+				if bar.close_time + self.close_delay_ms <= now_ms and bar.symbol not in self.buffered_trades:
+					try:
+						self._notify(bar)
+					except Exception as e:
+						LOG.error(f"Callback of the closed bar {bar.symbol} {bar.open_time} failed: {e!r}")
+					# the next bar is empty until its first trade
+					open_time = bar.close_time + 1
+					self.bars[bar.symbol] = Bar(bar.symbol, open_time, open_time + self.interval_ms - 1, bar.close, bar.close,
+					                            bar.close, bar.close, last_trade_id = bar.last_trade_id)
+
+	def _schedule_close(self, bar : Bar) -> None:
+		if self.bar_opened is not None and bar.symbol not in self.buffered_trades and \
+			(self.next_close_time is None or bar.close_time < self.next_close_time):
+			self.bar_opened.set()
+
+	def _notify(self, bar : Bar) -> None:
+		for callback in self.callbacks:
+			callback(bar)
+
+	async def _seed(self, symbol : str, first_trade_time_ms : int) -> None:
+		try:
+			pair = Pair.from_symbol(symbol)
+			open_time = self.get_open_time(first_trade_time_ms)
+			trades_start_ms = open_time
+
+			# closed minutes of the bar are taken from candlesticks, trades are fetched for the current minute only
+			if self.interval_ms % 60000 == 0 and open_time % 60000 == 0:
+				trades_start_ms = first_trade_time_ms - first_trade_time_ms % 60000
+
+				start_ms = open_time
+				while start_ms < trades_start_ms:
+					candlesticks = (await self.binance_client.get_candelsticks(pair, limit = BarAggregator.SEED_PAGE_SIZE,
+						interval = enums.CandelstickInterval.I_1MIN, start_tmstmp_ms = start_ms, end_tmstmp_ms = trades_start_ms - 1))["response"]
+					if len(candlesticks) == 0:
+						break
+
+					for candlestick in candlesticks:
+						self._apply_candlestick(symbol, candlestick)
+					start_ms = int(candlesticks[-1][0]) + 60000
+
+			# trades up to the first live trade, which are possibly followed by some of the buffered ones
+			first_live_trade_id = self.buffered_trades[symbol][0][0]
+			trades = (await self.binance_client.get_aggregate_trades(pair, limit = BarAggregator.SEED_PAGE_SIZE, start_tmstmp_ms = trades_start_ms))["response"]
+			while True:
+				for trade in trades:
+					self._apply_trade(symbol, trade["a"], trade["T"], float(trade["p"]), float(trade["q"]), trade["l"] - trade["f"] + 1)
+
+				if len(trades) < BarAggregator.SEED_PAGE_SIZE or trades[-1]["a"] >= first_live_trade_id:
+					break
+
+				trades = (await self.binance_client.get_aggregate_trades(pair, limit = BarAggregator.SEED_PAGE_SIZE, from_id = trades[-1]["a"] + 1))["response"]
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			LOG.warning(f"Bar of {symbol} could not be seeded, it is built from live trades only: {e}")
+
+		self.seed_tasks.pop(symbol, None)
+		for trade in self.buffered_trades.pop(symbol):
+			self._apply_trade(symbol, *trade)
+
+		bar = self.bars.get(symbol)
+		if bar is not None:
+			self._schedule_close(bar)
+
+	def _apply_candlestick(self, symbol : str, candlestick : list) -> None:
+		bar = self.bars.get(symbol)
+		if bar is None:
+			open_time = int(candlestick[0])
+			self.bars[symbol] = Bar(symbol, self.get_open_time(open_time), self.get_open_time(open_time) + self.interval_ms - 1,
+			                        float(candlestick[1]), float(candlestick[2]), float(candlestick[3]), float(candlestick[4]),
+			                        float(candlestick[5]), float(candlestick[7]), int(candlestick[8]))
+			return
+
+		bar.high = max(bar.high, float(candlestick[2]))
+		bar.low = min(bar.low, float(candlestick[3]))
+		bar.close = float(candlestick[4])
+		bar.volume += float(candlestick[5])
+		bar.quote_volume += float(candlestick[7])
+		bar.trade_count += int(candlestick[8])
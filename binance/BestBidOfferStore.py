@@ -0,0 +1,97 @@
+from array import array
+from typing import List, Optional, Tuple, Union
+
+from binance.Pair import Pair
+
+class BestBidOfferStore(object):
+	# Latest best bid and offer per symbol kept in flat arrays indexed by a symbol id assigned on the first update of
+	# the symbol. Updates are applied in place and older updates (by their order book update id) are discarded, hence
+	# the store always holds the conflated state regardless of how many updates have been received.
+	#
+	# Symbol ids map to the interned pairs of the Pair registry (see Pair.from_symbol) once the pairs are known, e.g.
+	# after exchangeInfo has been loaded.
+	def __init__(self) -> None:
+		self.symbol_ids = {}
+		self.symbols : List[str] = []
+		self.pairs : List[Optional[Pair]] = []
+
+		self.update_ids = array('q')
+		self.bid_prices = array('d')
+		self.bid_quantities = array('d')
+		self.ask_prices = array('d')
+		self.ask_quantities = array('d')
+
+	def get_symbol_id(self, symbol : str) -> int:
+		symbol_id = self.symbol_ids.get(symbol)
+		if symbol_id is None:
+			symbol_id = len(self.symbols)
+			self.symbol_ids[symbol] = symbol_id
+			self.symbols.append(symbol)
+			self.pairs.append(Pair.from_symbol(symbol))
+
+			self.update_ids.append(-1)
+			self.bid_prices.append(0.0)
+			self.bid_quantities.append(0.0)
+			self.ask_prices.append(0.0)
+			self.ask_quantities.append(0.0)
+
+		return symbol_id
+
+	def update(self, symbol_id : int, update_id : int, bid_price : float, bid_quantity : float, ask_price : float,
+	           ask_quantity : float) -> bool:
+		# returns False if the update is not newer than the stored one
+		if update_id <= self.update_ids[symbol_id]:
+			return False
+
+		self.update_ids[symbol_id] = update_id
+		self.bid_prices[symbol_id] = bid_price
+		self.bid_quantities[symbol_id] = bid_quantity
+		self.ask_prices[symbol_id] = ask_price
+		self.ask_quantities[symbol_id] = ask_quantity
+
+		return True
+
+	# pairs and symbols (e.g. "BTCUSDT") are accepted interchangeably, None is returned for unknown symbols
+	def get(self, pair : Union[Pair, str]) -> Optional[Tuple[float, float, float, float]]:
+		symbol_id = self.symbol_ids.get(str(pair))
+		if symbol_id is None:
+			return None
+
+		return self.bid_prices[symbol_id], self.bid_quantities[symbol_id], self.ask_prices[symbol_id], self.ask_quantities[symbol_id]
+
+	def get_bid_price(self, pair : Union[Pair, str]) -> Optional[float]:
+		symbol_id = self.symbol_ids.get(str(pair))
+		return self.bid_prices[symbol_id] if symbol_id is not None else None
+
+	def get_ask_price(self, pair : Union[Pair, str]) -> Optional[float]:
+		symbol_id = self.symbol_ids.get(str(pair))
+		return self.ask_prices[symbol_id] if symbol_id is not None else None
+
+	def get_mid_price(self, pair : Union[Pair, str]) -> Optional[float]:
+		symbol_id = self.symbol_ids.get(str(pair))
+		return (self.bid_prices[symbol_id] + self.ask_prices[symbol_id]) / 2 if symbol_id is not None else None
+
+	def get_update_id(self, pair : Union[Pair, str]) -> Optional[int]:
+		symbol_id = self.symbol_ids.get(str(pair))
+		return self.update_ids[symbol_id] if symbol_id is not None else None
+
+	def get_symbols(self) -> List[str]:
+		return list(self.symbols)
+
+	def get_symbol(self, symbol_id : int) -> str:
+		return self.symbols[symbol_id]
+
+	def get_pair(self, symbol_id : int) -> Optional[Pair]:
+		# None until the pair of the symbol is registered
+		pair = self.pairs[symbol_id]
+		if pair is None:
+			pair = Pair.from_symbol(self.symbols[symbol_id])
+			self.pairs[symbol_id] = pair
+
+		return pair
+
+	def __len__(self):
+		return len(self.symbols)
+
+	def __contains__(self, pair : Union[Pair, str]) -> bool:
+		return str(pair) in self.symbol_ids
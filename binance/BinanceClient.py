@@ -5,26 +5,72 @@ import hashlib
 import ssl
 import logging
 import datetime
-import json
-from typing import List, Optional
+import urllib.parse
+from yarl import URL
+from typing import List, Optional, Tuple, Union, Callable, Awaitable, Any
 
 from binance.Pair import Pair
-from binance.subscriptions import Subscription, SubscriptionMgr
+from binance.subscriptions import Subscription, SubscriptionMgr, SharedStream
 from binance import enums
 from binance.Timer import Timer
+from binance.RateLimiter import RateLimiter
+from binance.HistoricalCache import HistoricalCache
+from binance.ResponseCache import ResponseCache
+from binance.SymbolInfo import SymbolInfo, SymbolInfoIndex
+from binance.OrderFilters import OrderFilters
 from binance.BinanceException import BinanceException
+from binance import json_decoder
+from binance import columnar
 
 LOG = logging.getLogger(__name__)
 
 class BinanceClient(object):
 	REST_API_URI = "https://api.binance.com/api/v3/"
 
+	# request weight of the order book snapshot based on its depth (100 levels by default)
+	DEPTH_WEIGHTS = {
+		None: 1,
+		enums.DepthLimit.L_5: 1,
+		enums.DepthLimit.L_10: 1,
+		enums.DepthLimit.L_20: 1,
+		enums.DepthLimit.L_50: 1,
+		enums.DepthLimit.L_100: 1,
+		enums.DepthLimit.L_500: 5,
+		enums.DepthLimit.L_1000: 10,
+		enums.DepthLimit.L_5000: 50
+	}
+
 	def __init__(self, certificate_path : str = None, api_key : str = None, sec_key : str = None,
-	             api_trace_log : bool = False) -> None:
+	             api_trace_log : bool = False, rate_limiter : RateLimiter = None,
+	             connection_limit : int = 100, connection_limit_per_host : int = 0, keepalive_timeout_s : float = 60,
+	             dns_cache_ttl_s : int = 300, websocket_options : dict = None,
+	             historical_cache : HistoricalCache = None, response_cache : ResponseCache = None) -> None:
 		self.api_key = api_key
 		self.sec_key = sec_key
 		self.api_trace_log = api_trace_log
 
+		# keyed HMAC copied for every signed request instead of being rebuilt from the secret key
+		self.hmac = hmac.new(sec_key.encode('utf-8'), digestmod = hashlib.sha256) if sec_key is not None else None
+
+		# REST connection pool settings
+		self.connection_limit = connection_limit
+		self.connection_limit_per_host = connection_limit_per_host
+		self.keepalive_timeout_s = keepalive_timeout_s
+		self.dns_cache_ttl_s = dns_cache_ttl_s
+
+		# optional scheduler shared by all REST calls of the client (or even several clients using the same IP)
+		self.rate_limiter = rate_limiter
+
+		# optional on-disk cache of historical data used by HistoricalDownloader
+		self.historical_cache = historical_cache
+
+		# optional short-lived cache of exchangeInfo and tickers coalescing concurrent identical requests
+		self.response_cache = response_cache
+		self.symbol_info_index = None
+
+		# orders are validated locally once the filters have been loaded by load_order_filters
+		self.order_filters = None
+
 		self.rest_session = None
 
 		self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLSv1_2)
@@ -32,11 +78,42 @@ class BinanceClient(object):
 
 		self.subscription_sets = []
 
+		# channel name -> stream shared by all composed subscriptions of the channel
+		self.shared_streams = {}
+
+		# additional keyword arguments of every SubscriptionMgr, e.g. ping/receive timeouts and reconnection delays
+		self.websocket_options = websocket_options if websocket_options is not None else {}
+
+		# running websockets, populated once subscriptions are started
+		self.subscription_mgr_tasks = {}
+		self.subscription_mgrs_changed = None
+		self.auto_sharding = False
+		self.max_streams_per_connection = None
+		self.max_message_rate_per_connection = None
+
 	async def ping(self) -> dict:
 		return await self._create_get("ping")
 
 	async def get_exchange_info(self) -> dict:
-		return await self._create_get("exchangeInfo")
+		return await self._create_get("exchangeInfo", weight = 10)
+
+	async def get_symbol_info_index(self, refresh : bool = False) -> SymbolInfoIndex:
+		# Without a response cache the index is loaded once (or on refresh), otherwise it follows the cached
+		# exchangeInfo and is rebuilt only when a new response is fetched.
+		if self.symbol_info_index is None or refresh or self.response_cache is not None:
+			exchange_info = (await self.get_exchange_info())["response"]
+			if self.symbol_info_index is None or self.symbol_info_index.exchange_info is not exchange_info:
+				self.symbol_info_index = SymbolInfoIndex(exchange_info)
+
+		return self.symbol_info_index
+
+	async def get_symbol_info(self, pair : Pair) -> Optional[SymbolInfo]:
+		return (await self.get_symbol_info_index()).get(pair)
+
+	async def load_order_filters(self, refresh : bool = False) -> OrderFilters:
+		self.order_filters = OrderFilters(await self.get_symbol_info_index(refresh))
+
+		return self.order_filters
 
 	async def get_time(self) -> dict:
 		return await self._create_get("time")
@@ -49,26 +126,29 @@ class BinanceClient(object):
 		if limit:
 			params['limit'] = limit.value
 
-		return await self._create_get("depth", params = params)
+		return await self._create_get("depth", params = params, weight = BinanceClient.DEPTH_WEIGHTS[limit])
 
-	async def get_trades(self, pair : Pair, limit : int = None) -> dict:
+	async def get_trades(self, pair : Pair, limit : int = None, output_format : enums.OutputFormat = enums.OutputFormat.JSON) -> dict:
 		params = BinanceClient._clean_request_params({
 			"symbol": pair,
 			"limit": limit
 		})
 
-		return await self._create_get("trades", params = params)
+		return await self._create_get("trades", params = params, decoder = BinanceClient._get_decoder(output_format, columnar.TRADE_LAYOUT))
 
-	async def get_historical_trades(self, pair : Pair, limit : int = None, from_id : int = None) -> dict:
+	async def get_historical_trades(self, pair : Pair, limit : int = None, from_id : int = None,
+	                                output_format : enums.OutputFormat = enums.OutputFormat.JSON) -> dict:
 		params = BinanceClient._clean_request_params({
 			"symbol": pair,
 			"limit": limit,
 			"fromId": from_id
 		})
 
-		return await self._create_get("historicalTrades", params = params, headers = self._get_header_api_key())
+		return await self._create_get("historicalTrades", params = params, headers = self._get_header_api_key(), weight = 5,
+		                              decoder = BinanceClient._get_decoder(output_format, columnar.TRADE_LAYOUT))
 
-	async def get_aggregate_trades(self, pair : Pair, limit : int = None, from_id : int = None, start_tmstmp_ms : int = None, end_tmstmp_ms : int = None) -> dict:
+	async def get_aggregate_trades(self, pair : Pair, limit : int = None, from_id : int = None, start_tmstmp_ms : int = None, end_tmstmp_ms : int = None,
+	                               output_format : enums.OutputFormat = enums.OutputFormat.JSON) -> dict:
 		params = BinanceClient._clean_request_params({
 			"symbol": pair,
 			"limit": limit,
@@ -77,9 +157,10 @@ class BinanceClient(object):
 			"endTime": end_tmstmp_ms
 		})
 
-		return await self._create_get("aggTrades", params = params)
+		return await self._create_get("aggTrades", params = params, decoder = BinanceClient._get_decoder(output_format, columnar.AGGREGATE_TRADE_LAYOUT))
 
-	async def get_candelsticks(self, pair : Pair, limit : int = None, interval : enums.CandelstickInterval = None, start_tmstmp_ms : int = None, end_tmstmp_ms : int = None) -> dict:
+	async def get_candelsticks(self, pair : Pair, limit : int = None, interval : enums.CandelstickInterval = None, start_tmstmp_ms : int = None, end_tmstmp_ms : int = None,
+	                           output_format : enums.OutputFormat = enums.OutputFormat.JSON) -> dict:
 		params = BinanceClient._clean_request_params({
 			"symbol": pair,
 			"limit": limit,
@@ -90,7 +171,7 @@ class BinanceClient(object):
 		if interval:
 			params['interval'] = interval.value
 
-		return await self._create_get("klines", params = params)
+		return await self._create_get("klines", params = params, decoder = BinanceClient._get_decoder(output_format, columnar.KLINE_LAYOUT))
 
 	async def get_average_price(self, pair : Pair) -> dict:
 		params = BinanceClient._clean_request_params({
@@ -104,21 +185,21 @@ class BinanceClient(object):
 			"symbol": pair,
 		})
 
-		return await self._create_get("ticker/24hr", params = params)
+		return await self._create_get("ticker/24hr", params = params, weight = 1 if pair is not None else 40)
 
 	async def get_price_ticker(self, pair : Pair = None) -> dict:
 		params = BinanceClient._clean_request_params({
 			"symbol": pair,
 		})
 
-		return await self._create_get("ticker/price", params = params)
+		return await self._create_get("ticker/price", params = params, weight = 1 if pair is not None else 2)
 
 	async def get_best_orderbook_ticker(self, pair : Optional[Pair] = None) -> dict:
 		params = BinanceClient._clean_request_params({
 			"symbol": pair,
 		})
 
-		return await self._create_get("ticker/bookTicker", headers = self._get_header_api_key(), params = params)
+		return await self._create_get("ticker/bookTicker", headers = self._get_header_api_key(), params = params, weight = 1 if pair is not None else 2)
 
 	async def create_order(self, pair : Pair, side : enums.OrderSide, type : enums.OrderType,
 	                             quantity : str,
@@ -130,6 +211,9 @@ class BinanceClient(object):
 	                             iceberg_quantity : str = None,
 	                             new_order_response_type : enums.OrderResponseType = None,
 	                             recv_window_ms : int = None) -> dict:
+		if self.order_filters is not None:
+			self.order_filters.validate_order(pair, type, quantity, price, stop_price)
+
 		params = BinanceClient._clean_request_params({
 			"symbol": str(pair),
 			"side": side.value,
@@ -150,7 +234,8 @@ class BinanceClient(object):
 		if new_order_response_type:
 			params['newOrderRespType'] = new_order_response_type.value
 
-		return await self._create_post("order", params = params, headers = self._get_header_api_key(), signed = True)
+		return await self._create_post("order", params = params, headers = self._get_header_api_key(), signed = True,
+		                               order_count = 1, priority = enums.RequestPriority.HIGH)
 
 	async def create_test_order(self, pair : Pair, side : enums.OrderSide, type : enums.OrderType,
 	                             quantity : str,
@@ -162,6 +247,9 @@ class BinanceClient(object):
 	                             iceberg_quantity : str = None,
 	                             new_order_response_type : enums.OrderResponseType = None,
 	                             recv_window_ms : int = None) -> dict:
+		if self.order_filters is not None:
+			self.order_filters.validate_order(pair, type, quantity, price, stop_price)
+
 		params = BinanceClient._clean_request_params({
 			"symbol": str(pair),
 			"side": side.value,
@@ -206,16 +294,37 @@ class BinanceClient(object):
 			"timestamp": self._get_current_timestamp_ms()
 		})
 
-		return await self._create_delete("order", params = params, headers = self._get_header_api_key(), signed = True)
+		return await self._create_delete("order", params = params, headers = self._get_header_api_key(), signed = True,
+		                                 priority = enums.RequestPriority.HIGH)
 
-	async def get_open_orders(self, pair : Pair = None, recv_window_ms : int = None) -> dict:
+	async def cancel_all_orders(self, pair : Pair, recv_window_ms : int = None) -> dict:
 		params = BinanceClient._clean_request_params({
 			"symbol": str(pair),
 			"recvWindow": recv_window_ms,
 			"timestamp": self._get_current_timestamp_ms()
 		})
 
-		return await self._create_get("openOrders", params = params, headers = self._get_header_api_key(), signed = True)
+		return await self._create_delete("openOrders", params = params, headers = self._get_header_api_key(), signed = True,
+		                                 priority = enums.RequestPriority.HIGH)
+
+	# Each order is a dictionary of create_order's arguments. Orders are sent concurrently (at most concurrency_limit at
+	# a time) and results are returned in the order of the input, failed orders are represented by their exception.
+	async def create_orders_batch(self, orders : List[dict], concurrency_limit : int = 10) -> List[Union[dict, Exception]]:
+		return await BinanceClient._run_batch(self.create_order, orders, concurrency_limit)
+
+	# Each cancellation is a dictionary of cancel_order's arguments, see create_orders_batch for details.
+	async def cancel_orders_batch(self, cancellations : List[dict], concurrency_limit : int = 10) -> List[Union[dict, Exception]]:
+		return await BinanceClient._run_batch(self.cancel_order, cancellations, concurrency_limit)
+
+	async def get_open_orders(self, pair : Pair = None, recv_window_ms : int = None) -> dict:
+		params = BinanceClient._clean_request_params({
+			"symbol": pair,
+			"recvWindow": recv_window_ms,
+			"timestamp": self._get_current_timestamp_ms()
+		})
+
+		return await self._create_get("openOrders", params = params, headers = self._get_header_api_key(), signed = True,
+		                              weight = 1 if pair is not None else 40)
 
 	async def get_all_orders(self, pair : Pair, order_id : int = None, limit : int = None, start_tmstmp_ms : int = None, end_tmstmp_ms : int = None, recv_window_ms : int = None) -> dict:
 		params = BinanceClient._clean_request_params({
@@ -228,7 +337,7 @@ class BinanceClient(object):
 			"timestamp": self._get_current_timestamp_ms()
 		})
 
-		return await self._create_get("allOrders", params = params, headers = self._get_header_api_key(), signed = True)
+		return await self._create_get("allOrders", params = params, headers = self._get_header_api_key(), signed = True, weight = 5)
 
 	async def create_oco_order(self, pair : Pair, side : enums.OrderSide,
 	                           quantity : str,
@@ -243,6 +352,9 @@ class BinanceClient(object):
 	                           stop_limit_time_in_force: enums.TimeInForce = None,
 	                           new_order_response_type : enums.OrderResponseType = None,
 	                           recv_window_ms : int = None) -> dict:
+		if self.order_filters is not None:
+			self.order_filters.validate_oco_order(pair, quantity, price, stop_price, stop_limit_price)
+
 		params = BinanceClient._clean_request_params({
 			"symbol": str(pair),
 			"side": side.value,
@@ -265,7 +377,8 @@ class BinanceClient(object):
 		if new_order_response_type:
 			params['newOrderRespType'] = new_order_response_type.value
 
-		return await self._create_post("order/oco", params = params, headers = self._get_header_api_key(), signed = True)
+		return await self._create_post("order/oco", params = params, headers = self._get_header_api_key(), signed = True,
+		                               order_count = 2, priority = enums.RequestPriority.HIGH)
 
 	async def cancel_oco_order(self, pair : Pair, order_list_id : str = None, list_client_order_id : str = None,
 	                       new_client_order_id : str = None, recv_window_ms : int = None) -> dict:
@@ -278,7 +391,8 @@ class BinanceClient(object):
 			"timestamp": self._get_current_timestamp_ms()
 		})
 
-		return await self._create_delete("orderList", params = params, headers = self._get_header_api_key(), signed = True)
+		return await self._create_delete("orderList", params = params, headers = self._get_header_api_key(), signed = True,
+		                                 priority = enums.RequestPriority.HIGH)
 
 	async def get_oco_order(self, order_list_id : int = None, orig_client_order_id : int = None, recv_window_ms : int = None) -> dict:
 		params = BinanceClient._clean_request_params({
@@ -300,7 +414,7 @@ class BinanceClient(object):
 			"timestamp": self._get_current_timestamp_ms()
 		})
 
-		return await self._create_get("allOrderList", params = params, headers = self._get_header_api_key(), signed = True)
+		return await self._create_get("allOrderList", params = params, headers = self._get_header_api_key(), signed = True, weight = 10)
 
 	async def get_open_oco_orders(self, recv_window_ms : int = None) -> dict:
 		params = BinanceClient._clean_request_params({
@@ -308,7 +422,7 @@ class BinanceClient(object):
 			"timestamp": self._get_current_timestamp_ms()
 		})
 
-		return await self._create_get("openOrderList", params = params, headers = self._get_header_api_key(), signed = True)
+		return await self._create_get("openOrderList", params = params, headers = self._get_header_api_key(), signed = True, weight = 3)
 
 	async def get_account(self, recv_window_ms: Optional[int] = None) -> dict:
 		params = BinanceClient._clean_request_params({
@@ -316,7 +430,7 @@ class BinanceClient(object):
 			"timestamp": self._get_current_timestamp_ms()
 		})
 
-		return await self._create_get("account", headers = self._get_header_api_key(), params = params, signed = True)
+		return await self._create_get("account", headers = self._get_header_api_key(), params = params, signed = True, weight = 5)
 
 	async def get_account_trades(self, pair: Pair, limit: int = None, from_id: int = None,
 	                               start_tmstmp_ms: int = None, end_tmstmp_ms: int = None) -> dict:
@@ -329,84 +443,348 @@ class BinanceClient(object):
 			"timestamp": self._get_current_timestamp_ms()
 		})
 
-		return await self._create_get("myTrades", params = params, headers = self._get_header_api_key(), signed = True)
+		return await self._create_get("myTrades", params = params, headers = self._get_header_api_key(), signed = True, weight = 5)
 
 	async def get_listen_key(self):
 		return await self._create_post("userDataStream", headers = self._get_header_api_key())
 
+	async def keep_alive_listen_key(self, listen_key : str) -> dict:
+		params = BinanceClient._clean_request_params({
+			"listenKey": listen_key
+		})
+
+		return await self._create_put("userDataStream", params = params, headers = self._get_header_api_key())
+
+	async def close_listen_key(self, listen_key : str) -> dict:
+		params = BinanceClient._clean_request_params({
+			"listenKey": listen_key
+		})
+
+		return await self._create_delete("userDataStream", params = params, headers = self._get_header_api_key())
+
 	def compose_subscriptions(self, subscriptions : List[Subscription]) -> None:
-		self.subscription_sets.append(subscriptions)
-
-	async def start_subscriptions(self) -> None:
-		if len(self.subscription_sets):
-			done, pending = await asyncio.wait(
-				[asyncio.create_task(SubscriptionMgr(subscriptions, self.api_key, self.ssl_context).run()) for subscriptions in self.subscription_sets],
-				return_when = asyncio.FIRST_EXCEPTION
-			)
-			for task in done:
+		# Channels already composed before (e.g. by another subscription set) are not subscribed again, the subscriptions
+		# are attached to the existing stream instead. Subscriptions composed after the websockets have been started are
+		# started right away, errors of their initialization or subscription are logged (see add_subscriptions).
+		composition = self._compose_subscriptions(subscriptions)
+		if composition is not None:
+			composition.add_done_callback(BinanceClient._log_composition_error)
+
+	async def add_subscriptions(self, subscriptions : List[Subscription]) -> None:
+		# Composes the subscriptions as compose_subscriptions does. Once the websockets have been started, returns when the
+		# subscriptions are initialized and subscribed on running websockets and raises the first error.
+		composition = self._compose_subscriptions(subscriptions)
+		if composition is not None:
+			await composition
+
+	async def remove_subscriptions(self, subscriptions : List[Subscription]) -> None:
+		# Running subscriptions are unsubscribed on their live websockets which stay connected. A shared channel is
+		# unsubscribed only when its last subscription is removed.
+		subscriptions = self._unregister_shared_streams(subscriptions)
+
+		if self.subscription_mgrs_changed is None:
+			for subscription_set in self.subscription_sets:
+				subscription_set[:] = [x for x in subscription_set if not any(x is subscription for subscription in subscriptions)]
+			return
+
+		confirmations = []
+		for subscription_mgr in self.subscription_mgr_tasks.keys():
+			removed = [subscription for subscription in subscriptions if subscription.subscription_mgr is subscription_mgr]
+			if len(removed) > 0:
+				confirmations.append(subscription_mgr.remove_subscriptions(removed))
+
+		await asyncio.gather(*confirmations)
+
+	async def start_subscriptions(self, auto_sharding : bool = False, max_streams_per_connection : int = 200,
+	                              max_message_rate_per_connection : float = 1000) -> None:
+		if len(self.subscription_sets) == 0:
+			raise Exception("ERROR: There are no subscriptions to be started.")
+
+		self.auto_sharding = auto_sharding
+		self.max_streams_per_connection = max_streams_per_connection
+		self.max_message_rate_per_connection = max_message_rate_per_connection
+		self.subscription_mgrs_changed = asyncio.Event()
+
+		if auto_sharding:
+			subscriptions = [subscription for subscriptions in self.subscription_sets for subscription in subscriptions]
+			self.subscription_sets = []
+			self._shard_subscriptions(subscriptions)
+		else:
+			# sets whose subscriptions have all been removed meanwhile are not connected
+			for subscriptions in self.subscription_sets:
+				if len(subscriptions) > 0:
+					self._start_subscription_mgr(subscriptions)
+
+		while len(self.subscription_mgr_tasks) > 0:
+			changed = asyncio.create_task(self.subscription_mgrs_changed.wait())
+			done, _ = await asyncio.wait(list(self.subscription_mgr_tasks.values()) + [changed], return_when = asyncio.FIRST_COMPLETED)
+			changed.cancel()
+			self.subscription_mgrs_changed.clear()
+
+			for subscription_mgr, task in list(self.subscription_mgr_tasks.items()):
+				if task not in done:
+					continue
+
+				del self.subscription_mgr_tasks[subscription_mgr]
 				try:
 					task.result()
 				except Exception as e:
 					LOG.exception(f"Unrecoverable exception occurred while processing messages: {e}")
 					LOG.info("All websockets scheduled for shutdown")
-					for task in pending:
-						if not task.cancelled():
-							task.cancel()
-		else:
-			raise Exception("ERROR: There are no subscriptions to be started.")
-
-	async def close(self) -> None:
-		session = self._get_rest_session()
-		if session is not None:
-			await session.close()
-
-	async def _create_get(self, resource : str, params : dict = None, headers : dict = None, signed : bool = False) -> dict:
-		return await self._create_rest_call(enums.RestCallType.GET, resource, None, params, headers, signed)
-
-	async def _create_post(self, resource : str, data : dict = None, params : dict = None, headers : dict = None, signed : bool = False) -> dict:
-		return await self._create_rest_call(enums.RestCallType.POST, resource, data, params, headers, signed)
-
-	async def _create_delete(self, resource : str, params : dict = None, headers : dict = None, signed : bool = False) -> dict:
-		return await self._create_rest_call(enums.RestCallType.DELETE, resource, None, params, headers, signed)
-
-	async def _create_put(self, resource : str, params : dict = None, headers : dict = None, signed : bool = False) -> dict:
-		return await self._create_rest_call(enums.RestCallType.PUT, resource, None, params, headers, signed)
-
-	async def _create_rest_call(self, rest_call_type : enums.RestCallType, resource : str, data : dict = None, params : dict = None, headers : dict = None, signed : bool = False) -> dict:
-		with Timer('RestCall'):
-			# add signature into parameters
-			if signed:
-				params = {} if params is None else params
-				params['signature'] = self._get_signature(params, data)
-
-			if rest_call_type == enums.RestCallType.GET:
-				rest_call = self._get_rest_session().get(BinanceClient.REST_API_URI + resource, json = data, params = params, headers = headers, ssl = self.ssl_context)
-			elif rest_call_type == enums.RestCallType.POST:
-				rest_call = self._get_rest_session().post(BinanceClient.REST_API_URI + resource, json = data, params = params, headers = headers, ssl = self.ssl_context)
-			elif rest_call_type == enums.RestCallType.DELETE:
-				rest_call = self._get_rest_session().delete(BinanceClient.REST_API_URI + resource, json = data, params = params, headers = headers, ssl = self.ssl_context)
-			elif rest_call_type == enums.RestCallType.PUT:
-				rest_call = self._get_rest_session().put(BinanceClient.REST_API_URI + resource, json = data, params = params, headers = headers, ssl = self.ssl_context)
+					for pending_task in self.subscription_mgr_tasks.values():
+						if not pending_task.cancelled():
+							pending_task.cancel()
+
+	def _compose_subscriptions(self, subscriptions : List[Subscription]) -> Optional[asyncio.Future]:
+		# returns the future of the composition or None before the websockets are started
+		subscriptions, initializations = self._register_shared_streams(subscriptions)
+
+		if self.subscription_mgrs_changed is None:
+			if len(subscriptions) > 0:
+				self.subscription_sets.append(subscriptions)
+			return None
+
+		confirmations = initializations
+		if len(subscriptions) > 0:
+			if self.auto_sharding:
+				confirmations += self._shard_subscriptions(subscriptions, initialize = True)
 			else:
-				raise Exception(f"Unsupported REST call type {rest_call_type}.")
-
-			LOG.debug(f"> rest type [{rest_call_type.name}], resource [{resource}], params [{params}], headers [{headers}], data [{data}]")
-			async with rest_call as response:
-				status_code = response.status
-				response_body = await response.text()
+				self.subscription_sets.append(subscriptions)
+				confirmations.append(self._start_subscription_mgr(subscriptions, initialize = True))
 
-				LOG.debug(f"<: status [{status_code}], response [{response_body}]")
+		# the list is shared with the websocket manager, which removes subscriptions failing to initialize
+		return asyncio.ensure_future(self._confirm_composition(list(subscriptions), confirmations))
 
-				if str(status_code)[0] != '2':
-					raise BinanceException(f"<: status [{status_code}], response [{response_body}]")
+	@staticmethod
+	def _log_composition_error(composition : asyncio.Future) -> None:
+		if not composition.cancelled() and composition.exception() is not None:
+			LOG.error(f"Composed subscriptions could not be started: {composition.exception()!r}")
+
+	def _register_shared_streams(self, subscriptions : List[Subscription]) -> Tuple[List[Subscription], List[asyncio.Future]]:
+		# returns the streams to be subscribed, i.e. subscriptions of channels not composed so far wrapped into
+		# shared streams and subscriptions whose channel is not known upfront (e.g. the listen key of the user stream),
+		# and initializations of subscriptions joining streams which have been initialized already
+		new_streams = []
+		initializations = []
+		for subscription in subscriptions:
+			channel_name = subscription.get_channel_name()
+			if channel_name is None:
+				new_streams.append(subscription)
+				continue
+
+			shared_stream = self.shared_streams.get(channel_name)
+			if shared_stream is None:
+				shared_stream = SharedStream(channel_name)
+				self.shared_streams[channel_name] = shared_stream
+				new_streams.append(shared_stream)
+			elif shared_stream.initialized:
+				initializations.append(asyncio.ensure_future(self._initialize_consumer(shared_stream, subscription)))
+
+			shared_stream.add_consumer(subscription)
+
+		return new_streams, initializations
+
+	async def _initialize_consumer(self, shared_stream : SharedStream, subscription : Subscription) -> None:
+		try:
+			await subscription.initialize()
+		except Exception:
+			# the stream is unsubscribed if the subscription is its only consumer
+			await self.remove_subscriptions([subscription])
+			raise
+
+		shared_stream.activate_consumer(subscription)
+
+	async def _confirm_composition(self, streams : List[Subscription], confirmations : List[asyncio.Future]) -> None:
+		results = await asyncio.gather(*confirmations, return_exceptions = True)
+
+		# shared streams failing to initialize have been removed from their websocket
+		for stream in streams:
+			if isinstance(stream, SharedStream) and stream.subscription_mgr is None and \
+				self.shared_streams.get(stream.channel_name) is stream:
+				del self.shared_streams[stream.channel_name]
+
+		for result in results:
+			if isinstance(result, BaseException):
+				raise result
+
+	def _unregister_shared_streams(self, subscriptions : List[Subscription]) -> List[Subscription]:
+		# returns the streams to be unsubscribed, i.e. shared streams left without any subscription and subscriptions
+		# not being shared
+		removed_streams = []
+		for subscription in subscriptions:
+			shared_stream = self.shared_streams.get(subscription.get_channel_name())
+			if shared_stream is None or not any(consumer is subscription for consumer in shared_stream.consumers):
+				removed_streams.append(subscription)
+				continue
+
+			shared_stream.remove_consumer(subscription)
+			if shared_stream.subscription_mgr is not None and shared_stream.subscription_mgr.started:
+				subscription.close()
+
+			if len(shared_stream.consumers) == 0:
+				del self.shared_streams[shared_stream.channel_name]
+				removed_streams.append(shared_stream)
+
+		return removed_streams
+
+	def _start_subscription_mgr(self, subscriptions : List[Subscription], initialize : bool = False) -> Optional[asyncio.Future]:
+		# Subscriptions of websockets started next to running ones are initialized before connecting, those failing to
+		# initialize are removed rather than terminating all websockets. The returned future is then resolved once they
+		# are initialized and fails with the first error.
+		subscription_mgr = SubscriptionMgr(subscriptions, self.api_key, self.ssl_context, **self.websocket_options)
+		if not initialize:
+			self.subscription_mgr_tasks[subscription_mgr] = asyncio.create_task(subscription_mgr.run())
+			self.subscription_mgrs_changed.set()
+			return None
+
+		initialization = asyncio.get_event_loop().create_future()
+		self.subscription_mgr_tasks[subscription_mgr] = asyncio.create_task(BinanceClient._initialize_and_run(subscription_mgr, initialization))
+		self.subscription_mgrs_changed.set()
+
+		return initialization
 
-				if len(response_body) > 0:
-					response_body = json.loads(response_body)
+	@staticmethod
+	async def _initialize_and_run(subscription_mgr : SubscriptionMgr, initialization : asyncio.Future) -> None:
+		try:
+			error = await subscription_mgr.initialize()
+			if error is not None:
+				initialization.set_exception(error)
+			else:
+				initialization.set_result(None)
+		finally:
+			if not initialization.done():
+				initialization.cancel()
+
+		if len(subscription_mgr.subscriptions) > 0:
+			await subscription_mgr.run()
+
+	def _shard_subscriptions(self, subscriptions : List[Subscription], initialize : bool = False) -> List[asyncio.Future]:
+		# First-fit decreasing packing of the subscriptions into websocket connections (shards) limited by the number
+		# of streams and the expected message rate. Subscriptions are placed into running shards with spare capacity
+		# first and subscribed on their live connections, the remaining ones are started in new shards. Shards whose
+		# websocket manager has terminated are dropped.
+		# [subscriptions of the shard, its websocket manager (None for a new shard), subscriptions added to it]
+		shards = [[subscription_mgr.subscriptions, subscription_mgr, []]
+		          for subscription_mgr, task in self.subscription_mgr_tasks.items() if not task.done()]
+		self.subscription_sets = [shard[0] for shard in shards]
+		for subscription in sorted(subscriptions, key = lambda x: x.get_expected_message_rate(), reverse = True):
+			message_rate = subscription.get_expected_message_rate()
+			for shard_subscriptions, _, added in shards:
+				if len(shard_subscriptions) + len(added) < self.max_streams_per_connection and \
+					sum(x.get_expected_message_rate() for x in shard_subscriptions + added) + message_rate <= self.max_message_rate_per_connection:
+					added.append(subscription)
+					break
+			else:
+				shards.append([[], None, [subscription]])
+
+		confirmations = []
+		new_shard_count = 0
+		for _, subscription_mgr, added in shards:
+			if subscription_mgr is None:
+				self.subscription_sets.append(added)
+				initialization = self._start_subscription_mgr(added, initialize)
+				if initialization is not None:
+					confirmations.append(initialization)
+				new_shard_count += 1
+			elif len(added) > 0:
+				confirmations.append(subscription_mgr.add_subscriptions(added))
+
+		LOG.info(f"Subscriptions sharded into {len(self.subscription_sets)} websockets ({new_shard_count} new, {len(shards) - new_shard_count} running).")
+
+		# changes of running shards and initializations of new shards if requested
+		return confirmations
+
+	async def warm_up(self, connections : int = 1) -> None:
+		# opens (and completes TLS handshake of) the given number of pooled connections upfront so that the first calls
+		# do not have to
+		await asyncio.gather(*[self.ping() for _ in range(connections)])
 
-				return {
-					"status_code": status_code,
-					"response": response_body
-				}
+	async def close(self) -> None:
+		if self.rest_session is not None:
+			await self.rest_session.close()
+			self.rest_session = None
+
+	async def _create_get(self, resource : str, params : dict = None, headers : dict = None, signed : bool = False,
+	                      weight : int = 1, order_count : int = 0, priority : enums.RequestPriority = enums.RequestPriority.NORMAL,
+	                      decoder : Callable[[bytes], Any] = None) -> dict:
+		if self.response_cache is not None and not signed and self.response_cache.is_cached(resource):
+			return await self.response_cache.get(resource, params, lambda: self._create_rest_call(enums.RestCallType.GET, resource, None, params, headers,
+			                                                                                       signed, weight, order_count, priority, decoder))
+
+		return await self._create_rest_call(enums.RestCallType.GET, resource, None, params, headers, signed, weight, order_count, priority, decoder)
+
+	async def _create_post(self, resource : str, data : dict = None, params : dict = None, headers : dict = None, signed : bool = False,
+	                       weight : int = 1, order_count : int = 0, priority : enums.RequestPriority = enums.RequestPriority.NORMAL) -> dict:
+		return await self._create_rest_call(enums.RestCallType.POST, resource, data, params, headers, signed, weight, order_count, priority)
+
+	async def _create_delete(self, resource : str, params : dict = None, headers : dict = None, signed : bool = False,
+	                         weight : int = 1, order_count : int = 0, priority : enums.RequestPriority = enums.RequestPriority.NORMAL) -> dict:
+		return await self._create_rest_call(enums.RestCallType.DELETE, resource, None, params, headers, signed, weight, order_count, priority)
+
+	async def _create_put(self, resource : str, params : dict = None, headers : dict = None, signed : bool = False,
+	                      weight : int = 1, order_count : int = 0, priority : enums.RequestPriority = enums.RequestPriority.NORMAL) -> dict:
+		return await self._create_rest_call(enums.RestCallType.PUT, resource, None, params, headers, signed, weight, order_count, priority)
+
+	async def _create_rest_call(self, rest_call_type : enums.RestCallType, resource : str, data : dict = None, params : dict = None, headers : dict = None, signed : bool = False,
+	                            weight : int = 1, order_count : int = 0, priority : enums.RequestPriority = enums.RequestPriority.NORMAL,
+	                            decoder : Callable[[bytes], Any] = None) -> dict:
+		if self.rate_limiter is not None:
+			await self.rate_limiter.acquire(weight, order_count, priority)
+
+		response_headers = None
+		try:
+			with Timer('RestCall'):
+				# signed requests have their query string built just once, it is used both for the signature and as part
+				# of the (already encoded) URL
+				if signed:
+					query_string = urllib.parse.urlencode(params) if params is not None else ""
+					signature = self._get_signature(query_string, data)
+					url = URL(f"{BinanceClient.REST_API_URI}{resource}?{query_string}&signature={signature}", encoded = True)
+					params = None
+				else:
+					url = BinanceClient.REST_API_URI + resource
+
+				if rest_call_type == enums.RestCallType.GET:
+					rest_call = self._get_rest_session().get(url, json = data, params = params, headers = headers)
+				elif rest_call_type == enums.RestCallType.POST:
+					rest_call = self._get_rest_session().post(url, json = data, params = params, headers = headers)
+				elif rest_call_type == enums.RestCallType.DELETE:
+					rest_call = self._get_rest_session().delete(url, json = data, params = params, headers = headers)
+				elif rest_call_type == enums.RestCallType.PUT:
+					rest_call = self._get_rest_session().put(url, json = data, params = params, headers = headers)
+				else:
+					raise Exception(f"Unsupported REST call type {rest_call_type}.")
+
+				LOG.debug(f"> rest type [{rest_call_type.name}], url [{url}], params [{params}], headers [{headers}], data [{data}]")
+				async with rest_call as response:
+					status_code = response.status
+					response_headers = response.headers
+					# raw bytes are decoded directly, no intermediate text copy is made
+					response_body = await response.read()
+
+					if LOG.isEnabledFor(logging.DEBUG):
+						LOG.debug(f"<: status [{status_code}], response [{response_body.decode('utf-8')}]")
+
+					if str(status_code)[0] != '2':
+						# 429 - request limit exceeded, 418 - IP banned for exceeding the limits repeatedly
+						if status_code in [418, 429] and self.rate_limiter is not None:
+							retry_after = response_headers.get('Retry-After')
+							self.rate_limiter.block(int(retry_after) if retry_after is not None else None)
+
+						raise BinanceException(f"<: status [{status_code}], response [{response_body.decode('utf-8')}]")
+
+					if len(response_body) > 0:
+						response_body = decoder(response_body) if decoder is not None else json_decoder.loads(response_body)
+					else:
+						response_body = ""
+
+					return {
+						"status_code": status_code,
+						"response": response_body
+					}
+		finally:
+			if self.rate_limiter is not None:
+				self.rate_limiter.release(weight, order_count, response_headers)
 
 	def _get_rest_session(self) -> aiohttp.ClientSession:
 		if self.rest_session is not None:
@@ -420,7 +798,11 @@ class BinanceClient(object):
 		else:
 			trace_configs = None
 
-		self.rest_session = aiohttp.ClientSession(trace_configs=trace_configs)
+		# aiohttp enables TCP_NODELAY on its connections itself
+		connector = aiohttp.TCPConnector(ssl = self.ssl_context, limit = self.connection_limit, limit_per_host = self.connection_limit_per_host,
+		                                 keepalive_timeout = self.keepalive_timeout_s, ttl_dns_cache = self.dns_cache_ttl_s)
+
+		self.rest_session = aiohttp.ClientSession(connector = connector, trace_configs=trace_configs)
 
 		return self.rest_session
 
@@ -432,6 +814,24 @@ class BinanceClient(object):
 
 		return header
 
+	@staticmethod
+	async def _run_batch(fnc : Callable[..., Awaitable[dict]], batch : List[dict], concurrency_limit : int) -> List[Union[dict, Exception]]:
+		semaphore = asyncio.Semaphore(concurrency_limit)
+
+		async def run(kwargs : dict) -> dict:
+			async with semaphore:
+				return await fnc(**kwargs)
+
+		return await asyncio.gather(*[run(kwargs) for kwargs in batch], return_exceptions = True)
+
+	@staticmethod
+	def _get_decoder(output_format : enums.OutputFormat, layout : columnar.ColumnLayout) -> Optional[Callable[[bytes], Any]]:
+		# None stands for the default JSON decoding
+		if output_format == enums.OutputFormat.NUMPY:
+			return layout.decode
+
+		return None
+
 	@staticmethod
 	def _clean_request_params(params : dict) -> dict:
 		res = {}
@@ -453,15 +853,11 @@ class BinanceClient(object):
 	def _get_current_timestamp_ms() -> int:
 		return int(datetime.datetime.now(tz = datetime.timezone.utc).timestamp() * 1000)
 
-	def _get_signature(self, params : dict, data : dict) -> str:
-		params_string = ""
-		data_string = ""
-
-		if params is not None:
-			params_string = '&'.join([f"{key}={val}" for key, val in params.items()])
+	def _get_signature(self, query_string : str, data : dict) -> str:
+		m = self.hmac.copy()
+		m.update(query_string.encode('utf-8'))
 
 		if data is not None:
-			data_string = '&'.join(["{}={}".format(param[0], param[1]) for param in data])
+			m.update(urllib.parse.urlencode(data).encode('utf-8'))
 
-		m = hmac.new(self.sec_key.encode('utf-8'), (params_string+data_string).encode('utf-8'), hashlib.sha256)
-		return m.hexdigest()
\ No newline at end of file
+		return m.hexdigest()
@@ -1,2 +1,6 @@
 class BinanceException(Exception):
-	pass
\ No newline at end of file
+	pass
+
+# raised before sending an order which would be rejected by the filters of its symbol
+class OrderValidationException(BinanceException):
+	pass
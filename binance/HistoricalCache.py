@@ -0,0 +1,102 @@
+import collections
+import logging
+import os
+import uuid
+from typing import Optional
+
+from binance import columnar
+
+LOG = logging.getLogger(__name__)
+
+class HistoricalCache(object):
+	# Persistent cache of immutable historical data (closed candlesticks, aggregate and historical trades). Data are
+	# stored in chunks of a fixed range (e.g. one page of candlesticks or one hour of aggregate trades), each chunk in
+	# its own .npy file holding a numpy structured array which is memory-mapped when read. Only completed chunks are
+	# stored, hence a cached chunk never has to be refreshed.
+	#
+	# When the total size of the chunks exceeds `max_size_bytes`, the least recently used chunks are removed. The size
+	# is tracked per process, processes sharing the directory may exceed the limit until one of them evicts.
+	def __init__(self, directory : str, max_size_bytes : int = 10 * 1024 ** 3) -> None:
+		columnar._check_availability()
+
+		self.directory = directory
+		self.max_size_bytes = max_size_bytes
+
+		# path -> size in the order of the last access
+		self.chunks = collections.OrderedDict()
+		self.total_size = 0
+
+		os.makedirs(directory, exist_ok = True)
+		self._load_index()
+
+	def get(self, kind : str, symbol : str, parameter : str, chunk_start : int, layout : columnar.ColumnLayout) -> Optional['columnar.numpy.ndarray']:
+		path = self._get_chunk_path(kind, symbol, parameter, chunk_start)
+		if path not in self.chunks:
+			return None
+
+		try:
+			chunk = columnar.numpy.load(path, mmap_mode = 'r')
+			os.utime(path)
+		except (OSError, ValueError) as e:
+			LOG.warning(f"Cached chunk {path} could not be read and is discarded: {e}")
+			self._remove(path)
+			return None
+
+		if chunk.dtype != layout.dtype:
+			self._remove(path)
+			return None
+
+		self.chunks.move_to_end(path)
+
+		return chunk
+
+	def put(self, kind : str, symbol : str, parameter : str, chunk_start : int, chunk : 'columnar.numpy.ndarray') -> None:
+		path = self._get_chunk_path(kind, symbol, parameter, chunk_start)
+		os.makedirs(os.path.dirname(path), exist_ok = True)
+
+		# written under a temporary name first so that concurrent readers never see a partial chunk
+		tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+		with open(tmp_path, 'wb') as file:
+			columnar.numpy.save(file, columnar.numpy.ascontiguousarray(chunk))
+		os.replace(tmp_path, path)
+
+		if path in self.chunks:
+			self.total_size -= self.chunks.pop(path)
+		self.chunks[path] = os.path.getsize(path)
+		self.total_size += self.chunks[path]
+
+		self._evict()
+
+	def clear(self) -> None:
+		for path in list(self.chunks.keys()):
+			self._remove(path)
+
+	def _get_chunk_path(self, kind : str, symbol : str, parameter : str, chunk_start : int) -> str:
+		return os.path.join(self.directory, kind, symbol, parameter, f"{chunk_start}.npy")
+
+	def _load_index(self) -> None:
+		chunks = []
+		for root, _, file_names in os.walk(self.directory):
+			for file_name in file_names:
+				if file_name.endswith(".npy"):
+					stat = os.stat(os.path.join(root, file_name))
+					chunks.append((stat.st_mtime, os.path.join(root, file_name), stat.st_size))
+
+		for _, path, size in sorted(chunks):
+			self.chunks[path] = size
+			self.total_size += size
+
+		self._evict()
+
+	def _evict(self) -> None:
+		while self.total_size > self.max_size_bytes and len(self.chunks) > 0:
+			path = next(iter(self.chunks))
+			LOG.debug(f"Evicting cached chunk {path}.")
+			self._remove(path)
+
+	def _remove(self, path : str) -> None:
+		self.total_size -= self.chunks.pop(path, 0)
+		try:
+			os.remove(path)
+		except FileNotFoundError:
+			pass
@@ -0,0 +1,287 @@
+import asyncio
+import collections
+import itertools
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, Tuple
+
+from binance.Pair import Pair
+from binance import enums
+from binance import columnar
+
+LOG = logging.getLogger(__name__)
+
+# terminates the pages of a window
+_WINDOW_END = object()
+# terminates the pages of a window and marks the end of the available data
+_DATA_END = object()
+
+class _ChunkCollector(object):
+	# takes the place of the page queue of a window, collects the pages of a chunk to be cached
+	def __init__(self, layout : columnar.ColumnLayout) -> None:
+		self.array_builder = columnar.ArrayBuilder(layout)
+
+	async def put(self, page : 'numpy.ndarray') -> None:
+		self.array_builder.append(page)
+
+class HistoricalDownloader(object):
+	# Pages through historical REST endpoints and yields rows in chronological order. The requested range is split into
+	# windows which are fetched concurrently (at most `concurrency` windows at a time, each buffering up to
+	# `buffered_pages` pages) while rows are yielded from the oldest window, hence the memory use does not depend on the
+	# length of the range. Requests go through the client and hence through its rate limiter, if any.
+	#
+	# With `enums.OutputFormat.NUMPY` whole pages are yielded as structured arrays instead of single rows, they can be
+	# joined by `collect_array`. If the client has a `HistoricalCache`, windows of candlesticks, aggregate trades and
+	# historical trades downloaded in this format are served from the cache and only missing windows are requested.
+	MAX_PAGE_SIZE = 1000
+	AGGREGATE_TRADES_MAX_WINDOW_MS = 3600 * 1000
+	ACCOUNT_TRADES_MAX_WINDOW_MS = 24 * 3600 * 1000
+
+	# time windows are cached once they ended at least this long ago
+	CACHE_COMPLETION_DELAY_MS = 60 * 1000
+
+	def __init__(self, binance_client, concurrency : int = 4, buffered_pages : int = 2) -> None:
+		self.binance_client = binance_client
+		self.concurrency = concurrency
+		self.buffered_pages = buffered_pages
+
+	async def download_candlesticks(self, pair : Pair, interval : enums.CandelstickInterval, start_tmstmp_ms : int,
+	                                end_tmstmp_ms : int = None, output_format : enums.OutputFormat = enums.OutputFormat.JSON) -> AsyncIterator:
+		if end_tmstmp_ms is None:
+			end_tmstmp_ms = self.binance_client._get_current_timestamp_ms()
+
+		interval_ms = enums.CANDELSTICK_INTERVAL_MS.get(interval)
+		if interval_ms is not None:
+			windows = HistoricalDownloader._split_range(start_tmstmp_ms, end_tmstmp_ms, interval_ms * HistoricalDownloader.MAX_PAGE_SIZE)
+		else:
+			windows = iter([(start_tmstmp_ms, end_tmstmp_ms)])
+
+		async def fetch_window(window : Tuple[int, int], queue : asyncio.Queue) -> None:
+			window_start, window_end = window
+			while window_start <= window_end:
+				page = (await self.binance_client.get_candelsticks(pair, limit = HistoricalDownloader.MAX_PAGE_SIZE, interval = interval,
+				                                                   start_tmstmp_ms = window_start, end_tmstmp_ms = window_end,
+				                                                   output_format = output_format))["response"]
+				if len(page) > 0:
+					await queue.put(page)
+				if len(page) < HistoricalDownloader.MAX_PAGE_SIZE:
+					break
+
+				# next candlestick after the last one, without a fixed interval any later open time will do
+				window_start = int(page[-1][0]) + (interval_ms if interval_ms is not None else 1)
+
+		if interval_ms is not None and self._is_cache_used(output_format):
+			fetch_window = self._create_cached_window_fetcher(fetch_window, columnar.KLINE_LAYOUT, "klines", pair, interval.value,
+			                                                  interval_ms * HistoricalDownloader.MAX_PAGE_SIZE, "open_time",
+			                                                  self._is_time_chunk_complete)
+
+		async for row in self._download(windows, fetch_window, output_format):
+			yield row
+
+	async def download_aggregate_trades(self, pair : Pair, start_tmstmp_ms : int, end_tmstmp_ms : int = None,
+	                                    window_ms : int = AGGREGATE_TRADES_MAX_WINDOW_MS,
+	                                    output_format : enums.OutputFormat = enums.OutputFormat.JSON) -> AsyncIterator:
+		if end_tmstmp_ms is None:
+			end_tmstmp_ms = self.binance_client._get_current_timestamp_ms()
+
+		# cached windows always span the maximal window
+		if self._is_cache_used(output_format):
+			window_ms = HistoricalDownloader.AGGREGATE_TRADES_MAX_WINDOW_MS
+
+		windows = HistoricalDownloader._split_range(start_tmstmp_ms, end_tmstmp_ms, min(window_ms, HistoricalDownloader.AGGREGATE_TRADES_MAX_WINDOW_MS))
+		if output_format == enums.OutputFormat.NUMPY:
+			fetch_window = self._create_trade_window_fetcher(self.binance_client.get_aggregate_trades, pair, "agg_trade_id", "time", output_format = output_format)
+		else:
+			fetch_window = self._create_trade_window_fetcher(self.binance_client.get_aggregate_trades, pair, "a", "T")
+
+		if self._is_cache_used(output_format):
+			fetch_window = self._create_cached_window_fetcher(fetch_window, columnar.AGGREGATE_TRADE_LAYOUT, "aggTrades", pair, "",
+			                                                  window_ms, "time", self._is_time_chunk_complete)
+
+		async for row in self._download(windows, fetch_window, output_format):
+			yield row
+
+	async def download_account_trades(self, pair : Pair, start_tmstmp_ms : int, end_tmstmp_ms : int = None,
+	                                  window_ms : int = ACCOUNT_TRADES_MAX_WINDOW_MS) -> AsyncIterator[dict]:
+		if end_tmstmp_ms is None:
+			end_tmstmp_ms = self.binance_client._get_current_timestamp_ms()
+
+		windows = HistoricalDownloader._split_range(start_tmstmp_ms, end_tmstmp_ms, min(window_ms, HistoricalDownloader.ACCOUNT_TRADES_MAX_WINDOW_MS))
+		fetch_window = self._create_trade_window_fetcher(self.binance_client.get_account_trades, pair, "id", "time")
+
+		async for row in self._download(windows, fetch_window, enums.OutputFormat.JSON):
+			yield row
+
+	async def download_historical_trades(self, pair : Pair, from_id : int = None, to_id : int = None, start_tmstmp_ms : int = None,
+	                                     output_format : enums.OutputFormat = enums.OutputFormat.JSON) -> AsyncIterator:
+		# trade ids are consecutive, hence pages can be requested by id ranges right away
+		if from_id is None:
+			if start_tmstmp_ms is None:
+				raise Exception("Either from_id or start_tmstmp_ms has to be provided.")
+
+			from_id = await self._find_first_trade_id(pair, start_tmstmp_ms)
+			if from_id is None:
+				return
+
+		windows = HistoricalDownloader._split_range(from_id, to_id, HistoricalDownloader.MAX_PAGE_SIZE)
+
+		async def fetch_window(window : Tuple[int, int], queue : asyncio.Queue) -> bool:
+			window_start, window_end = window
+			page = (await self.binance_client.get_historical_trades(pair, limit = window_end - window_start + 1, from_id = window_start,
+			                                                        output_format = output_format))["response"]
+			if len(page) > 0:
+				await queue.put(HistoricalDownloader._trim_page(page, "id", window_end))
+
+			# no trades beyond this page yet
+			return len(page) < window_end - window_start + 1
+
+		if self._is_cache_used(output_format):
+			fetch_window = self._create_cached_window_fetcher(fetch_window, columnar.TRADE_LAYOUT, "historicalTrades", pair, "",
+			                                                  HistoricalDownloader.MAX_PAGE_SIZE, "id",
+			                                                  lambda chunk_end, chunk : len(chunk) == HistoricalDownloader.MAX_PAGE_SIZE)
+
+		async for row in self._download(windows, fetch_window, output_format):
+			yield row
+
+	@staticmethod
+	async def collect_array(pages : AsyncIterator['numpy.ndarray'], layout : columnar.ColumnLayout, capacity : int = 1024) -> 'numpy.ndarray':
+		# joins pages downloaded in the NUMPY output format into a single array
+		array_builder = columnar.ArrayBuilder(layout, capacity)
+		async for page in pages:
+			array_builder.append(page)
+
+		return array_builder.get_array()
+
+	def _create_trade_window_fetcher(self, endpoint : Callable[..., Awaitable[dict]], pair : Pair, id_key : str, time_key : str, **kwargs):
+		# The first page of a window is requested by time, further pages continue by id as a busy window may hold
+		# more trades than fit into a page. Rows beyond the window are left to the next window.
+		async def fetch_window(window : Tuple[int, int], queue : asyncio.Queue) -> None:
+			window_start, window_end = window
+			page = (await endpoint(pair, limit = HistoricalDownloader.MAX_PAGE_SIZE,
+			                       start_tmstmp_ms = window_start, end_tmstmp_ms = window_end, **kwargs))["response"]
+			while True:
+				if len(page) > 0 and page[-1][time_key] > window_end:
+					page = HistoricalDownloader._trim_page(page, time_key, window_end)
+					if len(page) > 0:
+						await queue.put(page)
+					break
+
+				if len(page) > 0:
+					await queue.put(page)
+				if len(page) < HistoricalDownloader.MAX_PAGE_SIZE:
+					break
+
+				page = (await endpoint(pair, limit = HistoricalDownloader.MAX_PAGE_SIZE, from_id = int(page[-1][id_key]) + 1, **kwargs))["response"]
+
+		return fetch_window
+
+	def _create_cached_window_fetcher(self, fetch_window : Callable[[Tuple[int, int], asyncio.Queue], Awaitable], layout : columnar.ColumnLayout,
+	                                  kind : str, pair : Pair, parameter : str, chunk_size : int, key : str,
+	                                  is_complete : Callable[[int, 'numpy.ndarray'], bool]):
+		# Windows are aligned to cache chunks. A missing chunk is downloaded as a whole and stored if it is complete,
+		# the window is then cut out of the chunk.
+		historical_cache = self.binance_client.historical_cache
+		symbol = str(pair)
+
+		async def fetch_cached_window(window : Tuple[int, int], queue : asyncio.Queue) -> bool:
+			window_start, window_end = window
+			chunk_start = window_start - window_start % chunk_size
+			chunk_end = chunk_start + chunk_size - 1
+
+			data_end = False
+			chunk = historical_cache.get(kind, symbol, parameter, chunk_start, layout)
+			if chunk is None:
+				chunk_collector = _ChunkCollector(layout)
+				data_end = await fetch_window((chunk_start, chunk_end), chunk_collector)
+				chunk = chunk_collector.array_builder.get_array()
+
+				if is_complete(chunk_end, chunk):
+					historical_cache.put(kind, symbol, parameter, chunk_start, chunk)
+
+			page = chunk[(chunk[key] >= window_start) & (chunk[key] <= window_end)]
+			if len(page) > 0:
+				await queue.put(page)
+
+			return data_end
+
+		return fetch_cached_window
+
+	def _is_cache_used(self, output_format : enums.OutputFormat) -> bool:
+		return output_format == enums.OutputFormat.NUMPY and self.binance_client.historical_cache is not None
+
+	def _is_time_chunk_complete(self, chunk_end : int, chunk : 'numpy.ndarray') -> bool:
+		return chunk_end < self.binance_client._get_current_timestamp_ms() - HistoricalDownloader.CACHE_COMPLETION_DELAY_MS
+
+	async def _find_first_trade_id(self, pair : Pair, start_tmstmp_ms : int) -> int:
+		end_tmstmp_ms = self.binance_client._get_current_timestamp_ms()
+		for window_start, window_end in HistoricalDownloader._split_range(start_tmstmp_ms, end_tmstmp_ms, HistoricalDownloader.AGGREGATE_TRADES_MAX_WINDOW_MS):
+			page = (await self.binance_client.get_aggregate_trades(pair, limit = 1, start_tmstmp_ms = window_start, end_tmstmp_ms = window_end))["response"]
+			if len(page) > 0:
+				return page[0]["f"]
+
+		return None
+
+	async def _download(self, windows : Iterator[Tuple[int, int]], fetch_window : Callable[[Tuple[int, int], asyncio.Queue], Awaitable],
+	                    output_format : enums.OutputFormat) -> AsyncIterator:
+		# windows in flight in the order of their ranges, each with a bounded queue of its pages
+		in_flight = collections.deque()
+
+		async def run_window(window : Tuple[int, int], queue : asyncio.Queue) -> None:
+			try:
+				data_end = await fetch_window(window, queue)
+				await queue.put(_DATA_END if data_end else _WINDOW_END)
+			except Exception as e:
+				await queue.put(e)
+
+		def start_windows() -> None:
+			while len(in_flight) < self.concurrency:
+				window = next(windows, None)
+				if window is None:
+					break
+
+				queue = asyncio.Queue(maxsize = self.buffered_pages + 1)
+				in_flight.append((asyncio.create_task(run_window(window, queue)), queue))
+
+		try:
+			start_windows()
+			while len(in_flight) > 0:
+				_, queue = in_flight[0]
+				while True:
+					page = await queue.get()
+					if page is _WINDOW_END or page is _DATA_END:
+						break
+					if isinstance(page, Exception):
+						raise page
+
+					if output_format == enums.OutputFormat.NUMPY:
+						yield page
+					else:
+						for row in page:
+							yield row
+
+				in_flight.popleft()
+				if page is _DATA_END:
+					break
+
+				start_windows()
+		finally:
+			for task, _ in in_flight:
+				task.cancel()
+
+	@staticmethod
+	def _trim_page(page, key : str, max_value : int):
+		# rows of a page (list of dicts or a structured array) whose key does not exceed the value
+		if page[-1][key] <= max_value:
+			return page
+
+		if isinstance(page, list):
+			return [row for row in page if row[key] <= max_value]
+		else:
+			return page[page[key] <= max_value]
+
+	@staticmethod
+	def _split_range(start : int, end : Optional[int], step : int) -> Iterator[Tuple[int, int]]:
+		# inclusive sub-ranges covering [start, end] aligned to multiples of the step, unbounded without an end
+		aligned_starts = itertools.count(start - start % step, step) if end is None else range(start - start % step, end + 1, step)
+
+		return ((max(window_start, start), window_start + step - 1 if end is None else min(window_start + step - 1, end))
+		        for window_start in aligned_starts)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import multiprocessing
+from typing import List
+
+from binance.Pair import Pair
+from binance.SharedRingBuffer import SharedRingBuffer, RingBufferReader, MultiRingBufferReader, TRADE_LAYOUT, BOOK_TICKER_LAYOUT
+from binance.dispatchers import SyncDispatcher
+
+LOG = logging.getLogger(__name__)
+
+class MarketDataPublisher(object):
+	# Runs websocket subscriptions of the given pairs in `worker_count` worker processes which decode the messages and
+	# publish them as fixed-width records into shared memory ring buffers, so that decoding is spread across cores.
+	# Streams are assigned to the workers by their expected message rate, every worker publishes trades into its own
+	# buffer ('<name>_trades_<worker>') and the worker running the book ticker stream into '<name>_book_tickers'.
+	# Consumers in any process attach to the buffers by name and read the records without any pickling. Symbol id of a
+	# record is the index of its pair in the list of pairs.
+	def __init__(self, name : str, pairs : List[Pair], certificate_path : str = None, api_key : str = None,
+	             trades : bool = True, book_tickers : bool = True, capacity : int = 65536, worker_count : int = 1) -> None:
+		self.name = name
+		self.pairs = pairs
+		self.certificate_path = certificate_path
+		self.api_key = api_key
+		self.trades = trades
+		self.book_tickers = book_tickers
+		self.capacity = capacity
+		self.worker_count = worker_count
+
+		self.ring_buffers = []
+		self.processes = []
+
+	def start(self) -> List[multiprocessing.Process]:
+		for worker, (symbol_ids, book_tickers) in enumerate(self._assign_streams()):
+			if len(symbol_ids) == 0 and not book_tickers:
+				continue
+
+			if len(symbol_ids) > 0:
+				self.ring_buffers.append(SharedRingBuffer.create(MarketDataPublisher.get_trades_buffer_name(self.name, worker), TRADE_LAYOUT, self.capacity))
+			if book_tickers:
+				self.ring_buffers.append(SharedRingBuffer.create(MarketDataPublisher.get_book_tickers_buffer_name(self.name), BOOK_TICKER_LAYOUT, self.capacity))
+
+			process = multiprocessing.Process(target = _run_publisher, name = f"MarketDataPublisher-{self.name}-{worker}", daemon = True,
+			                                  args = (self.name, worker, [(pair.base, pair.quote) for pair in self.pairs], symbol_ids,
+			                                          self.certificate_path, self.api_key, book_tickers))
+			process.start()
+			self.processes.append(process)
+
+		return self.processes
+
+	def stop(self) -> None:
+		for process in self.processes:
+			process.terminate()
+			process.join()
+		self.processes = []
+
+		for ring_buffer in self.ring_buffers:
+			ring_buffer.close()
+		self.ring_buffers = []
+
+	def _assign_streams(self) -> List[tuple]:
+		# Longest processing time first: streams ordered by their expected message rate are assigned one by one to the
+		# least loaded worker. Returns the symbol ids of trade streams and whether to run the book ticker stream by worker.
+		from binance.subscriptions import TradeSubscription, BestOrderBookTickerSubscription
+
+		streams = []
+		if self.book_tickers:
+			streams.append((BestOrderBookTickerSubscription.EXPECTED_MESSAGE_RATE, None))
+		if self.trades:
+			streams += [(TradeSubscription.EXPECTED_MESSAGE_RATE, symbol_id) for symbol_id in range(len(self.pairs))]
+
+		loads = [0.0] * self.worker_count
+		assignments = [([], False) for _ in range(self.worker_count)]
+		for message_rate, symbol_id in sorted(streams, key = lambda x: x[0], reverse = True):
+			worker = loads.index(min(loads))
+			loads[worker] += message_rate
+			if symbol_id is None:
+				assignments[worker] = (assignments[worker][0], True)
+			else:
+				assignments[worker][0].append(symbol_id)
+
+		return assignments
+
+	@staticmethod
+	def get_trades_buffer_name(name : str, worker : int) -> str:
+		return f"{name}_trades_{worker}"
+
+	@staticmethod
+	def get_book_tickers_buffer_name(name : str) -> str:
+		return f"{name}_book_tickers"
+
+	@staticmethod
+	def attach_trades(name : str, from_latest : bool = True, worker_count : int = 1) -> MultiRingBufferReader:
+		# trade buffers of all workers of a publisher started with the given number of workers
+		readers = []
+		for worker in range(worker_count):
+			try:
+				ring_buffer = SharedRingBuffer.attach(MarketDataPublisher.get_trades_buffer_name(name, worker), TRADE_LAYOUT)
+			except FileNotFoundError:
+				# the worker runs just the book ticker stream or no stream at all
+				continue
+			readers.append(ring_buffer.create_reader(from_latest, detach_on_close = True))
+
+		if len(readers) == 0:
+			raise FileNotFoundError(f"No trade buffers of market data publisher {name} found.")
+
+		return MultiRingBufferReader(readers)
+
+	@staticmethod
+	def attach_book_tickers(name : str, from_latest : bool = True) -> RingBufferReader:
+		return SharedRingBuffer.attach(MarketDataPublisher.get_book_tickers_buffer_name(name), BOOK_TICKER_LAYOUT).create_reader(from_latest, detach_on_close = True)
+
+def _run_publisher(name : str, worker : int, pairs : List[tuple], symbol_ids : List[int], certificate_path : str, api_key : str,
+                   book_tickers : bool) -> None:
+	# imported here so that the consumer side does not depend on the websocket stack
+	from binance.BinanceClient import BinanceClient
+	from binance.subscriptions import TradeSubscription, BestOrderBookTickerSubscription
+
+	pairs = [Pair(base, quote) for base, quote in pairs]
+	symbol_ids_by_symbol = {str(pair): symbol_id for symbol_id, pair in enumerate(pairs)}
+
+	subscriptions = []
+	if len(symbol_ids) > 0:
+		trade_buffer = SharedRingBuffer.attach(MarketDataPublisher.get_trades_buffer_name(name, worker), TRADE_LAYOUT)
+
+		def publish_trade(data : dict) -> None:
+			trade_buffer.write(symbol_ids_by_symbol[data["s"]], data["m"], data["t"], float(data["p"]), float(data["q"]), data["T"], data["E"])
+
+		subscriptions += [TradeSubscription(pairs[symbol_id], callbacks = [publish_trade], dispatcher = SyncDispatcher()) for symbol_id in symbol_ids]
+
+	if book_tickers:
+		book_ticker_buffer = SharedRingBuffer.attach(MarketDataPublisher.get_book_tickers_buffer_name(name), BOOK_TICKER_LAYOUT)
+
+		def publish_book_ticker(data : dict) -> None:
+			symbol_id = symbol_ids_by_symbol.get(data["s"])
+			if symbol_id is not None:
+				book_ticker_buffer.write(symbol_id, data["u"], float(data["b"]), float(data["B"]), float(data["a"]), float(data["A"]))
+
+		subscriptions.append(BestOrderBookTickerSubscription(callbacks = [publish_book_ticker], dispatcher = SyncDispatcher()))
+
+	async def run() -> None:
+		client = BinanceClient(certificate_path, api_key)
+		client.compose_subscriptions(subscriptions)
+		try:
+			await client.start_subscriptions(auto_sharding = True)
+		finally:
+			await client.close()
+
+	LOG.info(f"Market data publisher {name} worker {worker} started for {len(symbol_ids)} trade streams{' and book tickers' if book_tickers else ''}.")
+	asyncio.run(run())
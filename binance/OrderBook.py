@@ -0,0 +1,88 @@
+import bisect
+from typing import List, Tuple, Optional
+
+from binance.Pair import Pair
+
+class OrderBook(object):
+	# Price levels of each side are kept in a list sorted so that the best price is always the last element. Asks are
+	# stored as negative prices to achieve that. Reading the top of the book is then O(1), top-N is O(N) and updates
+	# close to the top of the book (the most frequent ones) shift only a few elements.
+	def __init__(self, pair : Pair) -> None:
+		self.pair = pair
+		self.last_update_id = None
+
+		self.bids = {}
+		self.asks = {}
+
+		self._bid_keys = []
+		self._ask_keys = []
+
+	def clear(self) -> None:
+		self.last_update_id = None
+		self.bids.clear()
+		self.asks.clear()
+		self._bid_keys.clear()
+		self._ask_keys.clear()
+
+	def set_snapshot(self, snapshot : dict) -> None:
+		self.clear()
+
+		self.update_bids(snapshot["bids"])
+		self.update_asks(snapshot["asks"])
+		self.last_update_id = snapshot["lastUpdateId"]
+
+	def apply_update(self, update : dict) -> None:
+		self.update_bids(update["b"])
+		self.update_asks(update["a"])
+		self.last_update_id = update["u"]
+
+	def update_bids(self, levels : List[List[str]]) -> None:
+		OrderBook._update_side(self.bids, self._bid_keys, levels, 1.0)
+
+	def update_asks(self, levels : List[List[str]]) -> None:
+		OrderBook._update_side(self.asks, self._ask_keys, levels, -1.0)
+
+	def get_best_bid(self) -> Optional[Tuple[float, float]]:
+		if len(self._bid_keys) == 0:
+			return None
+
+		price = self._bid_keys[-1]
+		return price, self.bids[price]
+
+	def get_best_ask(self) -> Optional[Tuple[float, float]]:
+		if len(self._ask_keys) == 0:
+			return None
+
+		price = -self._ask_keys[-1]
+		return price, self.asks[price]
+
+	def get_bids(self, depth : int = None) -> List[Tuple[float, float]]:
+		keys = self._bid_keys if depth is None else self._bid_keys[max(0, len(self._bid_keys) - depth):]
+		return [(price, self.bids[price]) for price in reversed(keys)]
+
+	def get_asks(self, depth : int = None) -> List[Tuple[float, float]]:
+		keys = self._ask_keys if depth is None else self._ask_keys[max(0, len(self._ask_keys) - depth):]
+		return [(-key, self.asks[-key]) for key in reversed(keys)]
+
+	def get_spread(self) -> Optional[float]:
+		if len(self._bid_keys) == 0 or len(self._ask_keys) == 0:
+			return None
+
+		return -self._ask_keys[-1] - self._bid_keys[-1]
+
+	@staticmethod
+	def _update_side(levels_by_price : dict, keys : list, levels : List[List[str]], sign : float) -> None:
+		for level in levels:
+			price = float(level[0])
+			quantity = float(level[1])
+
+			if quantity == 0:
+				if levels_by_price.pop(price, None) is not None:
+					del keys[bisect.bisect_left(keys, sign * price)]
+			else:
+				if price not in levels_by_price:
+					bisect.insort(keys, sign * price)
+				levels_by_price[price] = quantity
+
+	def __repr__(self):
+		return f"OrderBook({self.pair}, last_update_id={self.last_update_id}, best_bid={self.get_best_bid()}, best_ask={self.get_best_ask()})"
@@ -0,0 +1,167 @@
+from typing import Dict, Optional, Union
+
+from binance.Pair import Pair
+from binance.SymbolInfo import SymbolInfo, SymbolInfoIndex
+from binance.BinanceException import OrderValidationException
+from binance.events import to_fixed_point
+from binance import enums
+
+# all prices and quantities are handled as integers scaled by 10^8, the maximal precision used by binance
+DECIMALS = 8
+SCALE = 10 ** DECIMALS
+
+Number = Union[str, float]
+
+class SymbolFilters(object):
+	# PRICE_FILTER, LOT_SIZE, MARKET_LOT_SIZE and MIN_NOTIONAL/NOTIONAL of a symbol in fixed point, a value of 0
+	# disables the respective check the same way as on the exchange
+	__slots__ = ('symbol', 'min_price', 'max_price', 'tick_size', 'min_quantity', 'max_quantity', 'step_size',
+	             'market_min_quantity', 'market_max_quantity', 'market_step_size', 'min_notional')
+
+	def __init__(self, symbol_info : SymbolInfo) -> None:
+		self.symbol = symbol_info.symbol
+
+		price_filter = symbol_info.filters.get("PRICE_FILTER", {})
+		self.min_price = to_fixed_point(price_filter.get("minPrice", "0"), DECIMALS)
+		self.max_price = to_fixed_point(price_filter.get("maxPrice", "0"), DECIMALS)
+		self.tick_size = to_fixed_point(price_filter.get("tickSize", "0"), DECIMALS)
+
+		lot_size = symbol_info.filters.get("LOT_SIZE", {})
+		self.min_quantity = to_fixed_point(lot_size.get("minQty", "0"), DECIMALS)
+		self.max_quantity = to_fixed_point(lot_size.get("maxQty", "0"), DECIMALS)
+		self.step_size = to_fixed_point(lot_size.get("stepSize", "0"), DECIMALS)
+
+		# market orders have to pass both LOT_SIZE and MARKET_LOT_SIZE
+		market_lot_size = symbol_info.filters.get("MARKET_LOT_SIZE", {})
+		self.market_min_quantity = to_fixed_point(market_lot_size.get("minQty", "0"), DECIMALS)
+		self.market_max_quantity = to_fixed_point(market_lot_size.get("maxQty", "0"), DECIMALS)
+		self.market_step_size = to_fixed_point(market_lot_size.get("stepSize", "0"), DECIMALS)
+
+		min_notional = symbol_info.filters.get("MIN_NOTIONAL", symbol_info.filters.get("NOTIONAL", {}))
+		self.min_notional = to_fixed_point(min_notional.get("minNotional", "0"), DECIMALS)
+
+	def check_price(self, price : int, name : str = "price") -> None:
+		if price <= 0:
+			raise OrderValidationException(f"{self.symbol}: {name} {format_fixed_point(price)} is not positive.")
+		if self.min_price > 0 and price < self.min_price:
+			raise OrderValidationException(f"{self.symbol}: {name} {format_fixed_point(price)} is below the minimal price {format_fixed_point(self.min_price)}.")
+		if self.max_price > 0 and price > self.max_price:
+			raise OrderValidationException(f"{self.symbol}: {name} {format_fixed_point(price)} is above the maximal price {format_fixed_point(self.max_price)}.")
+		if self.tick_size > 0 and (price - self.min_price) % self.tick_size != 0:
+			raise OrderValidationException(f"{self.symbol}: {name} {format_fixed_point(price)} is not a multiple of the tick size {format_fixed_point(self.tick_size)}.")
+
+	def check_quantity(self, quantity : int, market : bool = False, name : str = "quantity") -> None:
+		if market:
+			min_quantity, max_quantity, step_size = self.market_min_quantity, self.market_max_quantity, self.market_step_size
+		else:
+			min_quantity, max_quantity, step_size = self.min_quantity, self.max_quantity, self.step_size
+
+		if quantity <= 0:
+			raise OrderValidationException(f"{self.symbol}: {name} {format_fixed_point(quantity)} is not positive.")
+		if quantity < min_quantity:
+			raise OrderValidationException(f"{self.symbol}: {name} {format_fixed_point(quantity)} is below the minimal quantity {format_fixed_point(min_quantity)}.")
+		if max_quantity > 0 and quantity > max_quantity:
+			raise OrderValidationException(f"{self.symbol}: {name} {format_fixed_point(quantity)} is above the maximal quantity {format_fixed_point(max_quantity)}.")
+		if step_size > 0 and (quantity - min_quantity) % step_size != 0:
+			raise OrderValidationException(f"{self.symbol}: {name} {format_fixed_point(quantity)} is not a multiple of the step size {format_fixed_point(step_size)}.")
+
+	def check_notional(self, price : int, quantity : int) -> None:
+		# both operands are scaled, hence the product is scaled twice
+		if self.min_notional > 0 and price * quantity < self.min_notional * SCALE:
+			raise OrderValidationException(f"{self.symbol}: notional {format_fixed_point(price * quantity // SCALE)} is below the minimal notional {format_fixed_point(self.min_notional)}.")
+
+	def round_price(self, price : int, round_up : bool = False) -> int:
+		return SymbolFilters._round(price, self.min_price, self.tick_size, round_up)
+
+	def round_quantity(self, quantity : int, market : bool = False, round_up : bool = False) -> int:
+		if market and self.market_step_size > 0:
+			return SymbolFilters._round(quantity, self.market_min_quantity, self.market_step_size, round_up)
+		else:
+			return SymbolFilters._round(quantity, self.min_quantity, self.step_size, round_up)
+
+	@staticmethod
+	def _round(value : int, offset : int, step : int, round_up : bool) -> int:
+		if step <= 0:
+			return value
+
+		remainder = (value - offset) % step
+		if remainder == 0:
+			return value
+
+		return value - remainder + step if round_up else value - remainder
+
+class OrderFilters(object):
+	# Table of precompiled symbol filters loaded from exchangeInfo used to reject orders locally and to round prices and
+	# quantities to the tick and step sizes. Symbols missing in the table are not checked.
+	def __init__(self, symbol_info_index : SymbolInfoIndex) -> None:
+		self.symbol_filters : Dict[str, SymbolFilters] = {
+			symbol_info.symbol: SymbolFilters(symbol_info) for symbol_info in symbol_info_index.get_all()
+		}
+
+	def get(self, pair : Pair) -> Optional[SymbolFilters]:
+		return self.symbol_filters.get(str(pair))
+
+	def validate_order(self, pair : Pair, type : enums.OrderType, quantity : Number = None, price : Number = None,
+	                   stop_price : Number = None) -> None:
+		symbol_filters = self.symbol_filters.get(str(pair))
+		if symbol_filters is None:
+			return
+
+		fixed_price = parse_fixed_point(price, "price") if price is not None else None
+		if fixed_price is not None:
+			symbol_filters.check_price(fixed_price)
+
+		if stop_price is not None:
+			symbol_filters.check_price(parse_fixed_point(stop_price, "stop price"), "stop price")
+
+		# market orders may specify the quote order quantity instead
+		if quantity is not None:
+			fixed_quantity = parse_fixed_point(quantity, "quantity")
+			symbol_filters.check_quantity(fixed_quantity)
+			if type == enums.OrderType.MARKET:
+				symbol_filters.check_quantity(fixed_quantity, market = True)
+
+			# market orders are executed at an unknown price, their notional is checked by the exchange only
+			if fixed_price is not None:
+				symbol_filters.check_notional(fixed_price, fixed_quantity)
+
+	def validate_oco_order(self, pair : Pair, quantity : Number, price : Number, stop_price : Number,
+	                       stop_limit_price : Number = None) -> None:
+		self.validate_order(pair, enums.OrderType.LIMIT_MAKER, quantity, price)
+		self.validate_order(pair, enums.OrderType.STOP_LOSS_LIMIT if stop_limit_price is not None else enums.OrderType.STOP_LOSS,
+		                    quantity, stop_limit_price, stop_price)
+
+	def round_price(self, pair : Pair, price : Number, round_up : bool = False) -> str:
+		symbol_filters = self._get_symbol_filters(pair)
+		return format_fixed_point(symbol_filters.round_price(parse_fixed_point(price, "price", exact = False), round_up))
+
+	def round_quantity(self, pair : Pair, quantity : Number, market : bool = False, round_up : bool = False) -> str:
+		symbol_filters = self._get_symbol_filters(pair)
+		return format_fixed_point(symbol_filters.round_quantity(parse_fixed_point(quantity, "quantity", exact = False), market, round_up))
+
+	def _get_symbol_filters(self, pair : Pair) -> SymbolFilters:
+		symbol_filters = self.symbol_filters.get(str(pair))
+		if symbol_filters is None:
+			raise OrderValidationException(f"No filters available for symbol {pair}.")
+
+		return symbol_filters
+
+def parse_fixed_point(value : Number, name : str, exact : bool = True) -> int:
+	# digits beyond the supported precision would be silently cut off, orders with such values are invalid
+	if exact and value.__class__ is str:
+		fractional_part = value.partition('.')[2]
+		if len(fractional_part) > DECIMALS and fractional_part[DECIMALS:].strip('0') != '':
+			raise OrderValidationException(f"{name} {value} has more than {DECIMALS} decimals.")
+
+	try:
+		return to_fixed_point(value, DECIMALS)
+	except ValueError:
+		raise OrderValidationException(f"{name} {value} is not a number.")
+
+def format_fixed_point(value : int) -> str:
+	sign = '-' if value < 0 else ''
+	integer_part, fractional_part = divmod(abs(value), SCALE)
+	if fractional_part == 0:
+		return f"{sign}{integer_part}"
+
+	return f"{sign}{integer_part}.{fractional_part:0{DECIMALS}d}".rstrip('0')
@@ -1,10 +1,67 @@
+import sys
+from typing import Optional
+
+# interned pairs by (base, quote) and by their exchange symbol
+_pairs = {}
+_pairs_by_symbol = {}
+
 class Pair(object):
-	def __init__(self, base : str, quote : str):
-		self.base = base
-		self.quote = quote
+	# Immutable value type, a single instance exists per base and quote asset so that pairs can be compared by
+	# identity, used as dictionary keys and looked up by their symbol (e.g. "BTCUSDT") in O(1). The symbol is built
+	# just once.
+	__slots__ = ('base', 'quote', 'symbol')
+
+	def __new__(cls, base : str, quote : str) -> 'Pair':
+		pair = _pairs.get((base, quote))
+		if pair is None:
+			# symbols are plain concatenations, different splits of the same symbol cannot coexist
+			conflicting_pair = _pairs_by_symbol.get(base + quote)
+			if conflicting_pair is not None:
+				raise ValueError(f"Pair {base}/{quote} conflicts with the existing pair {conflicting_pair.base}/{conflicting_pair.quote} of symbol {conflicting_pair.symbol}.")
+
+			pair = object.__new__(cls)
+			object.__setattr__(pair, 'base', sys.intern(base))
+			object.__setattr__(pair, 'quote', sys.intern(quote))
+			object.__setattr__(pair, 'symbol', sys.intern(base + quote))
+
+			_pairs[(pair.base, pair.quote)] = pair
+			_pairs_by_symbol[pair.symbol] = pair
+
+		return pair
+
+	def __setattr__(self, name, value):
+		raise AttributeError(f"Pair {self} is immutable.")
+
+	def __delattr__(self, name):
+		raise AttributeError(f"Pair {self} is immutable.")
+
+	@staticmethod
+	def from_symbol(symbol : str) -> Optional['Pair']:
+		# only symbols of pairs created before (e.g. when loading exchangeInfo) are known
+		return _pairs_by_symbol.get(symbol)
+
+	@staticmethod
+	def register_exchange_info(exchange_info : dict) -> None:
+		for symbol in exchange_info.get("symbols", []):
+			Pair(symbol["baseAsset"], symbol["quoteAsset"])
+
+	def __eq__(self, other):
+		if self is other:
+			return True
+		if not isinstance(other, Pair):
+			return NotImplemented
+
+		return self.base == other.base and self.quote == other.quote
+
+	def __hash__(self):
+		return hash(self.symbol)
+
+	def __reduce__(self):
+		# unpickled pairs are interned as well
+		return Pair, (self.base, self.quote)
 
 	def __str__(self):
-		return self.base + self.quote
+		return self.symbol
 
 	def __repr__(self):
 		return self.__str__()
@@ -0,0 +1,154 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import List
+
+from binance import enums
+
+LOG = logging.getLogger(__name__)
+
+class TokenBucket(object):
+	def __init__(self, capacity : int, interval_s : float, header_names : List[str] = None) -> None:
+		self.capacity = capacity
+		self.refill_rate = capacity / interval_s
+		self.header_names = header_names if header_names is not None else []
+
+		self.tokens = float(capacity)
+		self.last_refill = time.monotonic()
+
+		# amount consumed by requests which have not been answered yet and hence are not reflected in the usage
+		# reported by the server
+		self.inflight = 0
+
+	def refill(self, now : float) -> None:
+		self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+		self.last_refill = now
+
+	def get_wait_time(self, amount : int) -> float:
+		return max(0.0, (amount - self.tokens) / self.refill_rate)
+
+	def correct(self, used : int, now : float) -> None:
+		self.tokens = self.capacity - used - self.inflight
+		self.last_refill = now
+
+class RateLimiter(object):
+	# Client side scheduler keeping REST calls within binance's request weight and order count limits. Calls proceed
+	# immediately as long as there is enough budget; otherwise they are queued and released by priority (and in FIFO
+	# order within the same priority). The budget is corrected by the usage reported in the response headers.
+	DEFAULT_RETRY_AFTER_S = 60
+	MIN_WAIT_TIME_S = 0.001
+
+	def __init__(self, weight_limit : int = 1200, weight_interval_s : float = 60,
+	             order_limit : int = 10, order_interval_s : float = 1,
+	             daily_order_limit : int = 200000) -> None:
+		self.weight_bucket = TokenBucket(weight_limit, weight_interval_s, ["X-MBX-USED-WEIGHT-1M", "X-MBX-USED-WEIGHT"])
+		self.order_buckets = [
+			TokenBucket(order_limit, order_interval_s, [f"X-MBX-ORDER-COUNT-{int(order_interval_s)}S"]),
+			TokenBucket(daily_order_limit, 24 * 3600, ["X-MBX-ORDER-COUNT-1D"])
+		]
+
+		self.waiters = []
+		self.waiter_counter = itertools.count()
+		self.timer = None
+
+		# set when the server responds with 429/418
+		self.blocked_until = 0.0
+
+	async def acquire(self, weight : int = 1, order_count : int = 0, priority : enums.RequestPriority = enums.RequestPriority.NORMAL) -> None:
+		weight = min(weight, self.weight_bucket.capacity)
+
+		# skip the queue unless there is a request of the same or higher priority already waiting
+		if (len(self.waiters) == 0 or self.waiters[0][0] > priority.value) and self._try_consume(weight, order_count):
+			return
+
+		future = asyncio.get_event_loop().create_future()
+		heapq.heappush(self.waiters, (priority.value, next(self.waiter_counter), weight, order_count, future))
+		self._process_waiters()
+
+		try:
+			await future
+		except asyncio.CancelledError:
+			# budget has been granted already but the request will never be sent
+			if not future.cancelled():
+				self.release(weight, order_count)
+			raise
+
+	def release(self, weight : int = 1, order_count : int = 0, headers = None) -> None:
+		weight = min(weight, self.weight_bucket.capacity)
+		now = time.monotonic()
+
+		self.weight_bucket.inflight -= weight
+		for bucket in self.order_buckets:
+			bucket.inflight -= order_count
+
+		if headers is not None:
+			for bucket in [self.weight_bucket] + self.order_buckets:
+				for header_name in bucket.header_names:
+					used = headers.get(header_name)
+					if used is not None:
+						bucket.correct(int(used), now)
+						break
+
+		if len(self.waiters) > 0:
+			self._process_waiters()
+
+	def block(self, retry_after_s : float = None) -> None:
+		if retry_after_s is None:
+			retry_after_s = RateLimiter.DEFAULT_RETRY_AFTER_S
+
+		LOG.warning(f"Request rate limit exceeded, all requests blocked for {retry_after_s} s.")
+		self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after_s)
+
+	def _try_consume(self, weight : int, order_count : int) -> bool:
+		now = time.monotonic()
+		if now < self.blocked_until:
+			return False
+
+		self.weight_bucket.refill(now)
+		if self.weight_bucket.tokens < weight:
+			return False
+
+		if order_count > 0:
+			for bucket in self.order_buckets:
+				bucket.refill(now)
+				if bucket.tokens < order_count:
+					return False
+
+			for bucket in self.order_buckets:
+				bucket.tokens -= order_count
+				bucket.inflight += order_count
+
+		self.weight_bucket.tokens -= weight
+		self.weight_bucket.inflight += weight
+
+		return True
+
+	def _get_wait_time(self, weight : int, order_count : int) -> float:
+		wait_time = max(self.weight_bucket.get_wait_time(weight), self.blocked_until - time.monotonic())
+		if order_count > 0:
+			wait_time = max([wait_time] + [bucket.get_wait_time(order_count) for bucket in self.order_buckets])
+
+		# avoid spinning on rounding errors
+		return max(wait_time, RateLimiter.MIN_WAIT_TIME_S)
+
+	def _process_waiters(self) -> None:
+		if self.timer is not None:
+			self.timer.cancel()
+			self.timer = None
+
+		while len(self.waiters) > 0:
+			_, _, weight, order_count, future = self.waiters[0]
+
+			# waiter has been cancelled in the meantime
+			if future.done():
+				heapq.heappop(self.waiters)
+				continue
+
+			if not self._try_consume(weight, order_count):
+				self.timer = asyncio.get_event_loop().call_later(self._get_wait_time(weight, order_count), self._process_waiters)
+				break
+
+			heapq.heappop(self.waiters)
+			future.set_result(None)
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict
+
+LOG = logging.getLogger(__name__)
+
+class ResponseCache(object):
+	# In-memory cache of responses of public endpoints with a time to live per endpoint. Concurrent identical requests
+	# are coalesced into a single REST call whose response (or exception) is shared by all of them. Cached responses
+	# are shared as well, hence they must not be modified by the caller.
+	DEFAULT_TTLS_S = {
+		"exchangeInfo": 300,
+		"ticker/price": 1,
+		"ticker/24hr": 1,
+		"ticker/bookTicker": 1
+	}
+
+	def __init__(self, ttls_s : Dict[str, float] = None) -> None:
+		self.ttls_s = dict(ResponseCache.DEFAULT_TTLS_S)
+		if ttls_s is not None:
+			self.ttls_s.update(ttls_s)
+
+		# key -> (expiration, response)
+		self.responses = {}
+		# key -> task of the REST call in progress
+		self.inflight = {}
+
+	def is_cached(self, resource : str) -> bool:
+		return resource in self.ttls_s
+
+	async def get(self, resource : str, params : dict, fetch : Callable[[], Awaitable[dict]]) -> dict:
+		key = (resource, tuple(sorted(params.items())) if params is not None else ())
+
+		cached = self.responses.get(key)
+		if cached is not None and cached[0] > time.monotonic():
+			return cached[1]
+
+		task = self.inflight.get(key)
+		if task is None:
+			task = asyncio.ensure_future(self._fetch(key, fetch))
+			self.inflight[key] = task
+		else:
+			LOG.debug(f"Request {resource} coalesced with a request in progress.")
+
+		# cancellation of one of the callers does not cancel the call shared with the others
+		return await asyncio.shield(task)
+
+	def invalidate(self, resource : str = None) -> None:
+		if resource is None:
+			self.responses.clear()
+		else:
+			for key in [key for key in self.responses.keys() if key[0] == resource]:
+				del self.responses[key]
+
+	async def _fetch(self, key : tuple, fetch : Callable[[], Awaitable[dict]]) -> dict:
+		try:
+			response = await fetch()
+			self.responses[key] = (time.monotonic() + self.ttls_s[key[0]], response)
+
+			return response
+		finally:
+			del self.inflight[key]
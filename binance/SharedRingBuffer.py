@@ -0,0 +1,189 @@
+import struct
+import sys
+import multiprocessing
+from typing import List, Tuple
+
+# multiprocessing.shared_memory is available since python 3.8
+try:
+	from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+	shared_memory = None
+
+class RecordLayout(object):
+	def __init__(self, name : str, record_format : str, fields : List[str]) -> None:
+		self.name = name
+		self.struct = struct.Struct(record_format)
+		self.fields = fields
+
+		self.size = self.struct.size
+
+TRADE_LAYOUT = RecordLayout("trade", "<IB3xqddqq",
+                            ["symbol_id", "is_buyer_maker", "trade_id", "price", "quantity", "trade_time", "event_time"])
+
+BOOK_TICKER_LAYOUT = RecordLayout("book_ticker", "<I4xqdddd",
+                                  ["symbol_id", "update_id", "bid_price", "bid_quantity", "ask_price", "ask_quantity"])
+
+# names of the blocks created by this process
+_created_names = set()
+
+class SharedRingBuffer(object):
+	# Single producer, multiple consumer ring buffer of fixed-width records in a shared memory block. Every slot is
+	# prefixed by the sequence number of the record it holds; the sequence is invalidated before the record is
+	# rewritten and set after it has been written so that consumers can detect records overwritten while being read.
+	#
+	# header: [write sequence : uint64][capacity : uint64][record size : uint64]
+	# slot:   [sequence + 1 : uint64][record]
+	HEADER = struct.Struct("<QQQ")
+	SEQUENCE = struct.Struct("<Q")
+
+	def __init__(self, shm, layout : RecordLayout, owner : bool) -> None:
+		self.shm = shm
+		self.buf = shm.buf
+		self.layout = layout
+		self.owner = owner
+
+		_, self.capacity, record_size = SharedRingBuffer.HEADER.unpack_from(self.buf, 0)
+		if record_size != layout.size:
+			raise Exception(f"Shared memory block {shm.name} holds records of size {record_size}, layout {layout.name} expects {layout.size}.")
+
+		self.slot_size = SharedRingBuffer.SEQUENCE.size + layout.size
+
+		self.write_sequence = SharedRingBuffer.HEADER.unpack_from(self.buf, 0)[0]
+
+	@staticmethod
+	def create(name : str, layout : RecordLayout, capacity : int = 65536) -> 'SharedRingBuffer':
+		SharedRingBuffer._check_availability()
+
+		slot_size = SharedRingBuffer.SEQUENCE.size + layout.size
+		shm = shared_memory.SharedMemory(name = name, create = True, size = SharedRingBuffer.HEADER.size + capacity * slot_size)
+		shm.buf[:] = bytes(shm.size)
+		SharedRingBuffer.HEADER.pack_into(shm.buf, 0, 0, capacity, layout.size)
+		_created_names.add(name)
+
+		return SharedRingBuffer(shm, layout, owner = True)
+
+	@staticmethod
+	def attach(name : str, layout : RecordLayout) -> 'SharedRingBuffer':
+		SharedRingBuffer._check_availability()
+
+		# The block is owned (and eventually unlinked) by its creator, the resource tracker of the attaching process
+		# must not unlink it on exit. Processes started by multiprocessing share the tracker of their parent, hence only
+		# processes with their own tracker unregister the block.
+		if sys.version_info >= (3, 13):
+			shm = shared_memory.SharedMemory(name = name, track = False)
+		else:
+			shm = shared_memory.SharedMemory(name = name)
+			if multiprocessing.parent_process() is None and name not in _created_names:
+				resource_tracker.unregister(shm._name, "shared_memory")
+
+		return SharedRingBuffer(shm, layout, owner = False)
+
+	def write(self, *values) -> None:
+		sequence = self.write_sequence
+		offset = SharedRingBuffer.HEADER.size + (sequence % self.capacity) * self.slot_size
+
+		SharedRingBuffer.SEQUENCE.pack_into(self.buf, offset, 0)
+		self.layout.struct.pack_into(self.buf, offset + SharedRingBuffer.SEQUENCE.size, *values)
+		SharedRingBuffer.SEQUENCE.pack_into(self.buf, offset, sequence + 1)
+
+		self.write_sequence = sequence + 1
+		SharedRingBuffer.SEQUENCE.pack_into(self.buf, 0, self.write_sequence)
+
+	def get_write_sequence(self) -> int:
+		return SharedRingBuffer.SEQUENCE.unpack_from(self.buf, 0)[0]
+
+	def create_reader(self, from_latest : bool = True, detach_on_close : bool = False) -> 'RingBufferReader':
+		return RingBufferReader(self, self.get_write_sequence() if from_latest else 0, detach_on_close)
+
+	def close(self) -> None:
+		self.buf = None
+		self.shm.close()
+		if self.owner:
+			self.shm.unlink()
+			_created_names.discard(self.shm.name.lstrip('/'))
+
+	@staticmethod
+	def _check_availability() -> None:
+		if shared_memory is None:
+			raise Exception("Shared memory ring buffers require python 3.8 or higher.")
+
+class RingBufferReader(object):
+	def __init__(self, ring_buffer : SharedRingBuffer, read_sequence : int, detach_on_close : bool = False) -> None:
+		self.ring_buffer = ring_buffer
+		self.read_sequence = read_sequence
+
+		# a reader of a buffer attached just for it detaches the buffer when closed
+		self.detach_on_close = detach_on_close
+
+		# number of records overwritten by the producer before they could be read
+		self.lost_records = 0
+
+	def close(self) -> None:
+		if self.detach_on_close and self.ring_buffer.buf is not None:
+			self.ring_buffer.close()
+
+	def read(self, max_records : int = None) -> List[Tuple]:
+		ring_buffer = self.ring_buffer
+		buf = ring_buffer.buf
+		capacity = ring_buffer.capacity
+		slot_size = ring_buffer.slot_size
+		unpack_record = ring_buffer.layout.struct.unpack_from
+		unpack_sequence = SharedRingBuffer.SEQUENCE.unpack_from
+		sequence_size = SharedRingBuffer.SEQUENCE.size
+
+		write_sequence = ring_buffer.get_write_sequence()
+		if write_sequence - self.read_sequence > capacity:
+			self._skip_overwritten(write_sequence)
+
+		end_sequence = write_sequence if max_records is None else min(write_sequence, self.read_sequence + max_records)
+
+		records = []
+		while self.read_sequence < end_sequence:
+			offset = SharedRingBuffer.HEADER.size + (self.read_sequence % capacity) * slot_size
+			record = unpack_record(buf, offset + sequence_size)
+
+			# slot has been overwritten in the meantime, the reader has been lapped
+			if unpack_sequence(buf, offset)[0] != self.read_sequence + 1:
+				self._skip_overwritten(ring_buffer.get_write_sequence())
+				end_sequence = max(end_sequence, self.read_sequence)
+				continue
+
+			records.append(record)
+			self.read_sequence += 1
+
+		return records
+
+	def _skip_overwritten(self, write_sequence : int) -> None:
+		# continue from the oldest record not being overwritten right now
+		read_sequence = max(self.read_sequence + 1, write_sequence - self.ring_buffer.capacity + 1)
+		self.lost_records += read_sequence - self.read_sequence
+		self.read_sequence = read_sequence
+
+class MultiRingBufferReader(object):
+	# Reads several ring buffers (e.g. one per publishing process) as one. Records of the same buffer are returned in
+	# order, there is no ordering across the buffers.
+	def __init__(self, readers : List[RingBufferReader]) -> None:
+		self.readers = readers
+
+		# reading starts with a different buffer every time so that a limited read cannot starve any of them
+		self.first_reader = 0
+
+	@property
+	def lost_records(self) -> int:
+		return sum(reader.lost_records for reader in self.readers)
+
+	def read(self, max_records : int = None) -> List[Tuple]:
+		first_reader = self.first_reader
+		self.first_reader = (first_reader + 1) % len(self.readers)
+
+		records = []
+		for reader in self.readers[first_reader:] + self.readers[:first_reader]:
+			records += reader.read(max_records - len(records) if max_records is not None else None)
+			if max_records is not None and len(records) >= max_records:
+				break
+
+		return records
+
+	def close(self) -> None:
+		for reader in self.readers:
+			reader.close()
@@ -0,0 +1,68 @@
+import sys
+from typing import Dict, List, Optional
+
+from binance.Pair import Pair
+
+class SymbolInfo(object):
+	# Trading rules of a symbol extracted from exchangeInfo. Commonly used filter values are available directly as
+	# floats, all filters are kept unchanged in `filters` keyed by their type.
+	__slots__ = ('symbol', 'pair', 'base_asset', 'quote_asset', 'status', 'base_asset_precision', 'quote_precision', 'order_types',
+	             'filters', 'tick_size', 'min_price', 'max_price', 'step_size', 'min_quantity', 'max_quantity', 'min_notional')
+
+	def __init__(self, raw : dict) -> None:
+		self.symbol = sys.intern(raw["symbol"])
+		self.base_asset = sys.intern(raw["baseAsset"])
+		self.quote_asset = sys.intern(raw["quoteAsset"])
+		# registers the symbol to be resolvable by Pair.from_symbol
+		self.pair = Pair(self.base_asset, self.quote_asset)
+		self.status = raw["status"]
+		self.base_asset_precision = raw.get("baseAssetPrecision")
+		self.quote_precision = raw.get("quotePrecision")
+		self.order_types = raw.get("orderTypes", [])
+		self.filters = {raw_filter["filterType"]: raw_filter for raw_filter in raw.get("filters", [])}
+
+		price_filter = self.filters.get("PRICE_FILTER", {})
+		self.tick_size = SymbolInfo._get_float(price_filter, "tickSize")
+		self.min_price = SymbolInfo._get_float(price_filter, "minPrice")
+		self.max_price = SymbolInfo._get_float(price_filter, "maxPrice")
+
+		lot_size = self.filters.get("LOT_SIZE", {})
+		self.step_size = SymbolInfo._get_float(lot_size, "stepSize")
+		self.min_quantity = SymbolInfo._get_float(lot_size, "minQty")
+		self.max_quantity = SymbolInfo._get_float(lot_size, "maxQty")
+
+		# newer exchangeInfo versions replaced MIN_NOTIONAL by NOTIONAL
+		min_notional = self.filters.get("MIN_NOTIONAL", self.filters.get("NOTIONAL", {}))
+		self.min_notional = SymbolInfo._get_float(min_notional, "minNotional")
+
+	def get_pair(self) -> Pair:
+		return self.pair
+
+	def __repr__(self):
+		return f"SymbolInfo(symbol={self.symbol!r}, status={self.status!r}, tick_size={self.tick_size!r}, step_size={self.step_size!r}, min_notional={self.min_notional!r})"
+
+	@staticmethod
+	def _get_float(raw_filter : dict, name : str) -> Optional[float]:
+		value = raw_filter.get(name)
+		return float(value) if value is not None else None
+
+class SymbolInfoIndex(object):
+	# symbols of an exchangeInfo response indexed by their name, all of them are registered as pairs
+	def __init__(self, exchange_info : dict) -> None:
+		self.exchange_info = exchange_info
+		self.symbol_infos = {raw["symbol"]: SymbolInfo(raw) for raw in exchange_info.get("symbols", [])}
+
+	def get(self, pair : Pair) -> Optional[SymbolInfo]:
+		return self.symbol_infos.get(str(pair))
+
+	def get_by_symbol(self, symbol : str) -> Optional[SymbolInfo]:
+		return self.symbol_infos.get(symbol)
+
+	def get_all(self) -> List[SymbolInfo]:
+		return list(self.symbol_infos.values())
+
+	def __len__(self):
+		return len(self.symbol_infos)
+
+	def __contains__(self, pair : Pair) -> bool:
+		return str(pair) in self.symbol_infos
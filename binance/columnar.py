@@ -0,0 +1,134 @@
+import re
+from typing import List, Tuple, Union
+
+from binance import json_decoder
+
+# numpy is an optional dependency needed only for the columnar output
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Decoding of kline and trade responses straight from the raw body into numpy structured arrays. The body is reduced
+# to comma separated numbers (brackets, quotes and keys stripped, booleans mapped to 1/0) which numpy parses in one
+# pass, no python object is created per value. Integer columns pass through float64 which is exact for the
+# timestamps, ids and counts binance returns (all below 2^53).
+
+KEY_PATTERN = re.compile(rb'"[A-Za-z]+":')
+
+class ColumnLayout(object):
+	# columns: (position in a list row or key in an object row, field name, numpy type) of every decoded column
+	def __init__(self, name : str, columns : List[Tuple[Union[int, str], str, str]]) -> None:
+		self.name = name
+		self.columns = columns
+
+		self.dtype = numpy.dtype([(field_name, field_type) for _, field_name, field_type in columns]) if numpy is not None else None
+
+	def decode(self, body : bytes) -> 'numpy.ndarray':
+		_check_availability()
+
+		if isinstance(self.columns[0][0], int):
+			return self._decode_list_rows(body)
+		else:
+			return self._decode_object_rows(body)
+
+	def empty(self, size : int = 0) -> 'numpy.ndarray':
+		_check_availability()
+
+		return numpy.empty(size, dtype = self.dtype)
+
+	def _decode_list_rows(self, body : bytes) -> 'numpy.ndarray':
+		first_row_start = body.find(b'[', body.find(b'[') + 1)
+		if first_row_start == -1:
+			return self.empty()
+
+		row_length = len(json_decoder.loads(body[first_row_start:body.index(b']', first_row_start) + 1]))
+		values = _parse_numbers(body.translate(None, b'[]"'), row_length)
+
+		res = self.empty(len(values))
+		for position, field_name, _ in self.columns:
+			res[field_name] = values[:, position]
+
+		return res
+
+	def _decode_object_rows(self, body : bytes) -> 'numpy.ndarray':
+		first_row_start = body.find(b'{')
+		if first_row_start == -1:
+			return self.empty()
+
+		# order of the keys is the same in all rows, it is taken from the first one
+		keys = list(json_decoder.loads(body[first_row_start:body.index(b'}', first_row_start) + 1]).keys())
+		body = KEY_PATTERN.sub(b'', body).replace(b'true', b'1').replace(b'false', b'0')
+		values = _parse_numbers(body.translate(None, b'[]{}"'), len(keys))
+
+		res = self.empty(len(values))
+		for key, field_name, _ in self.columns:
+			res[field_name] = values[:, keys.index(key)]
+
+		return res
+
+KLINE_LAYOUT = ColumnLayout("kline", [
+	(0, "open_time", "<i8"),
+	(1, "open", "<f8"),
+	(2, "high", "<f8"),
+	(3, "low", "<f8"),
+	(4, "close", "<f8"),
+	(5, "volume", "<f8"),
+	(6, "close_time", "<i8"),
+	(7, "quote_volume", "<f8"),
+	(8, "trade_count", "<i8"),
+	(9, "taker_buy_base_volume", "<f8"),
+	(10, "taker_buy_quote_volume", "<f8")
+])
+
+AGGREGATE_TRADE_LAYOUT = ColumnLayout("aggregate_trade", [
+	("a", "agg_trade_id", "<i8"),
+	("p", "price", "<f8"),
+	("q", "quantity", "<f8"),
+	("f", "first_trade_id", "<i8"),
+	("l", "last_trade_id", "<i8"),
+	("T", "time", "<i8"),
+	("m", "is_buyer_maker", "?"),
+	("M", "is_best_match", "?")
+])
+
+TRADE_LAYOUT = ColumnLayout("trade", [
+	("id", "id", "<i8"),
+	("price", "price", "<f8"),
+	("qty", "quantity", "<f8"),
+	("quoteQty", "quote_quantity", "<f8"),
+	("time", "time", "<i8"),
+	("isBuyerMaker", "is_buyer_maker", "?"),
+	("isBestMatch", "is_best_match", "?")
+])
+
+class ArrayBuilder(object):
+	# Concatenates pages into a single preallocated array which grows geometrically when its capacity is exceeded,
+	# hence every row is copied a constant number of times on average and no list of pages is kept.
+	def __init__(self, layout : ColumnLayout, capacity : int = 1024) -> None:
+		self.layout = layout
+		self.array = layout.empty(max(capacity, 1))
+		self.size = 0
+
+	def append(self, page : 'numpy.ndarray') -> None:
+		end = self.size + len(page)
+		if end > len(self.array):
+			array = self.layout.empty(max(end, 2 * len(self.array)))
+			array[:self.size] = self.array[:self.size]
+			self.array = array
+
+		self.array[self.size:end] = page
+		self.size = end
+
+	def get_array(self) -> 'numpy.ndarray':
+		return self.array[:self.size]
+
+def _parse_numbers(text : bytes, row_length : int) -> 'numpy.ndarray':
+	if len(text.strip()) == 0:
+		return numpy.empty((0, row_length))
+
+	return numpy.fromstring(text, dtype = numpy.float64, sep = ',').reshape(-1, row_length)
+
+def _check_availability() -> None:
+	if numpy is None:
+		raise Exception("Columnar output requires numpy to be installed.")
@@ -0,0 +1,103 @@
+import asyncio
+import collections
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Callable, Any
+
+from binance import enums
+
+LOG = logging.getLogger(__name__)
+
+class CallbackDispatcher(ABC):
+	@abstractmethod
+	async def dispatch(self, callbacks : List[Callable[[Any], Any]], message : Any) -> None:
+		pass
+
+	def close(self) -> None:
+		pass
+
+# runs coroutine callbacks concurrently and waits for all of them to finish
+class GatherDispatcher(CallbackDispatcher):
+	async def dispatch(self, callbacks : List[Callable[[Any], Any]], message : Any) -> None:
+		# no need for a task when there is nothing to run concurrently
+		if len(callbacks) == 1:
+			await callbacks[0](message)
+		else:
+			await asyncio.gather(*[asyncio.create_task(cb(message)) for cb in callbacks])
+
+# awaits coroutine callbacks one after another without creating any tasks
+class InlineDispatcher(CallbackDispatcher):
+	async def dispatch(self, callbacks : List[Callable[[Any], Any]], message : Any) -> None:
+		for cb in callbacks:
+			await cb(message)
+
+# calls plain (non-coroutine) callables directly
+class SyncDispatcher(CallbackDispatcher):
+	async def dispatch(self, callbacks : List[Callable[[Any], Any]], message : Any) -> None:
+		for cb in callbacks:
+			cb(message)
+
+# hands messages over to a bounded queue drained by a background worker so that slow callbacks do not hold up reading
+# from the websocket; an instance must not be shared between subscriptions
+class QueueDispatcher(CallbackDispatcher):
+	def __init__(self, max_size : int = 1000, overflow_policy : enums.QueueOverflowPolicy = enums.QueueOverflowPolicy.BLOCK,
+	             dispatcher : CallbackDispatcher = None) -> None:
+		self.max_size = max_size
+		self.overflow_policy = overflow_policy
+		self.dispatcher = dispatcher if dispatcher is not None else InlineDispatcher()
+
+		self.queue = collections.deque()
+		self.dropped_messages = 0
+
+		# created lazily so that they are bound to the running event loop
+		self.not_empty = None
+		self.not_full = None
+		self.worker = None
+
+	async def dispatch(self, callbacks : List[Callable[[Any], Any]], message : Any) -> None:
+		if self.worker is None:
+			self._start_worker()
+
+		if len(self.queue) >= self.max_size:
+			if self.overflow_policy == enums.QueueOverflowPolicy.BLOCK:
+				while len(self.queue) >= self.max_size:
+					self.not_full.clear()
+					await self.not_full.wait()
+			elif self.overflow_policy == enums.QueueOverflowPolicy.DROP_OLDEST:
+				self.queue.popleft()
+				self.dropped_messages += 1
+			elif self.overflow_policy == enums.QueueOverflowPolicy.CONFLATE_LATEST:
+				self.queue[-1] = (callbacks, message)
+				self.dropped_messages += 1
+				return
+			else:
+				raise Exception(f"Unsupported queue overflow policy {self.overflow_policy}.")
+
+		self.queue.append((callbacks, message))
+		self.not_empty.set()
+
+	def close(self) -> None:
+		if self.worker is not None:
+			self.worker.cancel()
+			self.worker = None
+
+	def _start_worker(self) -> None:
+		self.not_empty = asyncio.Event()
+		self.not_full = asyncio.Event()
+		self.worker = asyncio.create_task(self._drain())
+
+	async def _drain(self) -> None:
+		while True:
+			while len(self.queue) == 0:
+				self.not_empty.clear()
+				await self.not_empty.wait()
+
+			callbacks, message = self.queue.popleft()
+			self.not_full.set()
+
+			try:
+				await self.dispatcher.dispatch(callbacks, message)
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				LOG.exception(f"Exception occurred in a queued callback: {e}")
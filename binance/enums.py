@@ -46,6 +46,24 @@ class CandelstickInterval(enum.Enum):
 	I_1W = '1w'
 	I_1MONTH = '1M'
 
+# duration of a candlestick, monthly candlesticks do not have a fixed one
+CANDELSTICK_INTERVAL_MS = {
+	CandelstickInterval.I_1MIN: 60 * 1000,
+	CandelstickInterval.I_3MIN: 3 * 60 * 1000,
+	CandelstickInterval.I_5MIN: 5 * 60 * 1000,
+	CandelstickInterval.I_15MIN: 15 * 60 * 1000,
+	CandelstickInterval.I_30MIN: 30 * 60 * 1000,
+	CandelstickInterval.I_1H: 3600 * 1000,
+	CandelstickInterval.I_2H: 2 * 3600 * 1000,
+	CandelstickInterval.I_4H: 4 * 3600 * 1000,
+	CandelstickInterval.I_6H: 6 * 3600 * 1000,
+	CandelstickInterval.I_8H: 8 * 3600 * 1000,
+	CandelstickInterval.I_12H: 12 * 3600 * 1000,
+	CandelstickInterval.I_1D: 24 * 3600 * 1000,
+	CandelstickInterval.I_3D: 3 * 24 * 3600 * 1000,
+	CandelstickInterval.I_1W: 7 * 24 * 3600 * 1000,
+}
+
 class OrderResponseType(enum.Enum):
 	ACT = "ACK"
 	RESULT = "RESULT"
@@ -56,3 +74,16 @@ class TimeInForce(enum.Enum):
 	IMMEDIATE_OR_CANCELLED = "IOC"
 	FILL_OR_KILL = "FOK"
 
+class QueueOverflowPolicy(enum.Enum):
+	BLOCK = enum.auto()
+	DROP_OLDEST = enum.auto()
+	CONFLATE_LATEST = enum.auto()
+
+class RequestPriority(enum.Enum):
+	HIGH = 0
+	NORMAL = 1
+	LOW = 2
+
+class OutputFormat(enum.Enum):
+	JSON = enum.auto()
+	NUMPY = enum.auto()
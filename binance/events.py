@@ -0,0 +1,247 @@
+import sys
+from typing import Union
+
+# Typed wrappers of websocket payloads. Decimal fields are kept as the received strings and converted to float on the
+# first access only (the converted value replaces the string in the very same slot). Payload dictionaries are not
+# referenced by the events so that buffered events occupy just their slots.
+
+def to_fixed_point(value : Union[str, float], decimals : int = 8) -> int:
+	if value.__class__ is not str:
+		return int(round(value * 10 ** decimals))
+
+	negative = value.startswith('-')
+	if negative:
+		value = value[1:]
+
+	integer_part, _, fractional_part = value.partition('.')
+	fractional_part = (fractional_part + '0' * decimals)[:decimals]
+	res = int(integer_part + fractional_part) if len(integer_part) > 0 else int(fractional_part or '0')
+
+	return -res if negative else res
+
+def _lazy_float(slot_name : str) -> property:
+	def getter(self):
+		value = getattr(self, slot_name)
+		if value.__class__ is str:
+			value = float(value)
+			setattr(self, slot_name, value)
+		return value
+
+	return property(getter)
+
+class Event(object):
+	__slots__ = ()
+
+	def __repr__(self):
+		fields = [f"{name.lstrip('_')}={getattr(self, name)!r}" for name in self.__slots__]
+		return f"{self.__class__.__name__}({', '.join(fields)})"
+
+# buyer_order_id and seller_order_id are None for trades backfilled from REST by TradeSubscription
+class TradeEvent(Event):
+	__slots__ = ('event_time', 'symbol', 'trade_id', '_price', '_quantity', 'buyer_order_id', 'seller_order_id',
+	             'trade_time', 'is_buyer_maker')
+
+	def __init__(self, raw : dict) -> None:
+		self.reset(raw)
+
+	def reset(self, raw : dict) -> None:
+		self.event_time = raw["E"]
+		self.symbol = sys.intern(raw["s"])
+		self.trade_id = raw["t"]
+		self._price = raw["p"]
+		self._quantity = raw["q"]
+		self.buyer_order_id = raw["b"]
+		self.seller_order_id = raw["a"]
+		self.trade_time = raw["T"]
+		self.is_buyer_maker = raw["m"]
+
+	price = _lazy_float('_price')
+	quantity = _lazy_float('_quantity')
+
+	def get_price_fixed(self, decimals : int = 8) -> int:
+		return to_fixed_point(self._price, decimals)
+
+	def get_quantity_fixed(self, decimals : int = 8) -> int:
+		return to_fixed_point(self._quantity, decimals)
+
+class AggregateTradeEvent(Event):
+	__slots__ = ('event_time', 'symbol', 'aggregate_trade_id', '_price', '_quantity', 'first_trade_id', 'last_trade_id',
+	             'trade_time', 'is_buyer_maker')
+
+	def __init__(self, raw : dict) -> None:
+		self.reset(raw)
+
+	def reset(self, raw : dict) -> None:
+		self.event_time = raw["E"]
+		self.symbol = sys.intern(raw["s"])
+		self.aggregate_trade_id = raw["a"]
+		self._price = raw["p"]
+		self._quantity = raw["q"]
+		self.first_trade_id = raw["f"]
+		self.last_trade_id = raw["l"]
+		self.trade_time = raw["T"]
+		self.is_buyer_maker = raw["m"]
+
+	price = _lazy_float('_price')
+	quantity = _lazy_float('_quantity')
+
+	def get_price_fixed(self, decimals : int = 8) -> int:
+		return to_fixed_point(self._price, decimals)
+
+	def get_quantity_fixed(self, decimals : int = 8) -> int:
+		return to_fixed_point(self._quantity, decimals)
+
+class CandlestickEvent(Event):
+	__slots__ = ('event_time', 'symbol', 'interval', 'open_time', 'close_time', 'first_trade_id', 'last_trade_id', '_open',
+	             '_high', '_low', '_close', '_volume', '_quote_volume', 'trade_count', 'is_closed', '_taker_buy_base_volume',
+	             '_taker_buy_quote_volume')
+
+	def __init__(self, raw : dict) -> None:
+		self.reset(raw)
+
+	def reset(self, raw : dict) -> None:
+		self.event_time = raw["E"]
+		self.symbol = sys.intern(raw["s"])
+
+		kline = raw["k"]
+		self.interval = kline["i"]
+		self.open_time = kline["t"]
+		self.close_time = kline["T"]
+		self.first_trade_id = kline["f"]
+		self.last_trade_id = kline["L"]
+		self._open = kline["o"]
+		self._high = kline["h"]
+		self._low = kline["l"]
+		self._close = kline["c"]
+		self._volume = kline["v"]
+		self._quote_volume = kline["q"]
+		self.trade_count = kline["n"]
+		self.is_closed = kline["x"]
+		self._taker_buy_base_volume = kline["V"]
+		self._taker_buy_quote_volume = kline["Q"]
+
+	open = _lazy_float('_open')
+	high = _lazy_float('_high')
+	low = _lazy_float('_low')
+	close = _lazy_float('_close')
+	volume = _lazy_float('_volume')
+	quote_volume = _lazy_float('_quote_volume')
+	taker_buy_base_volume = _lazy_float('_taker_buy_base_volume')
+	taker_buy_quote_volume = _lazy_float('_taker_buy_quote_volume')
+
+class BookTickerEvent(Event):
+	__slots__ = ('update_id', 'symbol', '_bid_price', '_bid_quantity', '_ask_price', '_ask_quantity')
+
+	def __init__(self, raw : dict) -> None:
+		self.reset(raw)
+
+	def reset(self, raw : dict) -> None:
+		self.update_id = raw["u"]
+		self.symbol = sys.intern(raw["s"])
+		self._bid_price = raw["b"]
+		self._bid_quantity = raw["B"]
+		self._ask_price = raw["a"]
+		self._ask_quantity = raw["A"]
+
+	bid_price = _lazy_float('_bid_price')
+	bid_quantity = _lazy_float('_bid_quantity')
+	ask_price = _lazy_float('_ask_price')
+	ask_quantity = _lazy_float('_ask_quantity')
+
+	def get_bid_price_fixed(self, decimals : int = 8) -> int:
+		return to_fixed_point(self._bid_price, decimals)
+
+	def get_ask_price_fixed(self, decimals : int = 8) -> int:
+		return to_fixed_point(self._ask_price, decimals)
+
+class ExecutionReportEvent(Event):
+	__slots__ = ('event_time', 'symbol', 'client_order_id', 'side', 'order_type', 'time_in_force', '_quantity', '_price',
+	             '_stop_price', '_iceberg_quantity', 'order_list_id', 'orig_client_order_id', 'execution_type',
+	             'order_status', 'reject_reason', 'order_id', '_last_executed_quantity', '_cumulative_filled_quantity',
+	             '_last_executed_price', '_commission', 'commission_asset', 'transaction_time', 'trade_id', 'is_on_book',
+	             'is_maker', 'order_creation_time', '_cumulative_quote_quantity', '_last_quote_quantity')
+
+	def __init__(self, raw : dict) -> None:
+		self.event_time = raw["E"]
+		self.symbol = sys.intern(raw["s"])
+		self.client_order_id = raw["c"]
+		self.side = raw["S"]
+		self.order_type = raw["o"]
+		self.time_in_force = raw["f"]
+		self._quantity = raw["q"]
+		self._price = raw["p"]
+		self._stop_price = raw["P"]
+		self._iceberg_quantity = raw["F"]
+		self.order_list_id = raw["g"]
+		self.orig_client_order_id = raw["C"]
+		self.execution_type = raw["x"]
+		self.order_status = raw["X"]
+		self.reject_reason = raw["r"]
+		self.order_id = raw["i"]
+		self._last_executed_quantity = raw["l"]
+		self._cumulative_filled_quantity = raw["z"]
+		self._last_executed_price = raw["L"]
+		self._commission = raw["n"]
+		self.commission_asset = raw["N"]
+		self.transaction_time = raw["T"]
+		self.trade_id = raw["t"]
+		self.is_on_book = raw["w"]
+		self.is_maker = raw["m"]
+		self.order_creation_time = raw["O"]
+		self._cumulative_quote_quantity = raw["Z"]
+		self._last_quote_quantity = raw["Y"]
+
+	quantity = _lazy_float('_quantity')
+	price = _lazy_float('_price')
+	stop_price = _lazy_float('_stop_price')
+	iceberg_quantity = _lazy_float('_iceberg_quantity')
+	last_executed_quantity = _lazy_float('_last_executed_quantity')
+	cumulative_filled_quantity = _lazy_float('_cumulative_filled_quantity')
+	last_executed_price = _lazy_float('_last_executed_price')
+	commission = _lazy_float('_commission')
+	cumulative_quote_quantity = _lazy_float('_cumulative_quote_quantity')
+	last_quote_quantity = _lazy_float('_last_quote_quantity')
+
+class Balance(Event):
+	__slots__ = ('asset', '_free', '_locked')
+
+	def __init__(self, raw : dict) -> None:
+		self.asset = sys.intern(raw["a"])
+		self._free = raw["f"]
+		self._locked = raw["l"]
+
+	free = _lazy_float('_free')
+	locked = _lazy_float('_locked')
+
+class AccountPositionEvent(Event):
+	__slots__ = ('event_time', 'last_update_time', 'balances')
+
+	def __init__(self, raw : dict) -> None:
+		self.event_time = raw["E"]
+		self.last_update_time = raw["u"]
+		self.balances = [Balance(balance) for balance in raw["B"]]
+
+class BalanceUpdateEvent(Event):
+	__slots__ = ('event_time', 'asset', '_delta', 'clear_time')
+
+	def __init__(self, raw : dict) -> None:
+		self.event_time = raw["E"]
+		self.asset = sys.intern(raw["a"])
+		self._delta = raw["d"]
+		self.clear_time = raw["T"]
+
+	delta = _lazy_float('_delta')
+
+ACCOUNT_EVENT_TYPES = {
+	"executionReport": ExecutionReportEvent,
+	"outboundAccountPosition": AccountPositionEvent,
+	"balanceUpdate": BalanceUpdateEvent
+}
+
+# account events without a typed counterpart are returned unchanged
+def create_account_event(raw : dict) -> Union[Event, dict]:
+	event_type = ACCOUNT_EVENT_TYPES.get(raw.get("e"))
+	if event_type is None:
+		return raw
+
+	return event_type(raw)
@@ -0,0 +1,42 @@
+import json
+import logging
+from typing import Any, Callable, Union, Tuple
+
+LOG = logging.getLogger(__name__)
+
+# fastest available decoder is used by default, all of them accept both str and bytes
+def _get_default_decoder() -> Tuple[str, Callable[[Union[str, bytes]], Any]]:
+	try:
+		import orjson
+		return "orjson", orjson.loads
+	except ImportError:
+		pass
+
+	try:
+		import simdjson
+		return "simdjson", simdjson.loads
+	except ImportError:
+		pass
+
+	try:
+		import ujson
+		return "ujson", ujson.loads
+	except ImportError:
+		pass
+
+	return "json", json.loads
+
+decoder_name, decoder = _get_default_decoder()
+LOG.debug(f"JSON decoder in use: {decoder_name}")
+
+def loads(payload : Union[str, bytes]) -> Any:
+	return decoder(payload)
+
+def set_decoder(name : str, decoder_fnc : Callable[[Union[str, bytes]], Any]) -> None:
+	global decoder_name, decoder
+
+	decoder_name = name
+	decoder = decoder_fnc
+
+def get_decoder_name() -> str:
+	return decoder_name
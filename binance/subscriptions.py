@@ -2,16 +2,50 @@ import websockets
 import json
 import logging
 import asyncio
+import collections
+import itertools
+import random
+import time
+from array import array
 from abc import ABC, abstractmethod
-from typing import List, Callable, Any
+from typing import List, Callable, Any, Optional, Tuple
 
 from binance.Pair import Pair
+from binance.OrderBook import OrderBook
+from binance.BestBidOfferStore import BestBidOfferStore
+from binance.BarAggregator import BarAggregator
+from binance.AccountStore import AccountStore
+from binance.BinanceException import BinanceException
+from binance import enums
+from binance import json_decoder
+from binance.dispatchers import CallbackDispatcher, GatherDispatcher
+from binance import events
 
 LOG = logging.getLogger(__name__)
 
 class Subscription(ABC):
-	def __init__(self, callbacks = None):
+	# rough number of messages per second used to balance subscriptions across websockets
+	EXPECTED_MESSAGE_RATE = 1.0
+
+	# subscriptions parsing the raw (not decoded) data payload themselves override process_raw_data
+	RAW_DATA = False
+
+	def __init__(self, callbacks = None, dispatcher : CallbackDispatcher = None, event_factory : Callable[[dict], Any] = None,
+	             reuse_events : bool = False):
 		self.callbacks = callbacks
+		self.dispatcher = dispatcher if dispatcher is not None else GatherDispatcher()
+
+		# optional conversion of raw payloads into typed events; a reused event is overwritten by every message and is
+		# therefore safe only if callbacks do not keep a reference to it beyond their invocation
+		self.event_factory = event_factory
+		self.reuse_events = reuse_events
+		self.event = None
+
+		# paused subscriptions stay subscribed but their messages are discarded without being decoded
+		self.paused = False
+
+		# websocket manager the subscription is assigned to
+		self.subscription_mgr = None
 
 	@abstractmethod
 	def get_channel_name(self) -> str:
@@ -20,69 +54,495 @@ class Subscription(ABC):
 	async def initialize(self) -> None:
 		pass
 
+	# called before the websocket connection is rotated, the subscription may change its channel
+	async def rotate(self) -> None:
+		pass
+
+	# called whenever a websocket connection carrying the subscription has been established (connected, reconnected or
+	# rotated), messages sent before may have been missed
+	async def connected(self) -> None:
+		pass
+
+	def get_expected_message_rate(self) -> float:
+		return self.EXPECTED_MESSAGE_RATE
+
 	async def process_message(self, response : dict) -> None:
-		await self.process_callbacks(response)
+		await self.process_callbacks(self.create_event(response))
+
+	async def process_raw_data(self, data : str) -> None:
+		await self.process_message(json_decoder.loads(data))
+
+	def create_event(self, response : dict) -> Any:
+		if self.event_factory is None:
+			return response
+
+		if self.reuse_events:
+			if self.event is None:
+				self.event = self.event_factory(response)
+			else:
+				self.event.reset(response)
+			return self.event
+
+		return self.event_factory(response)
 
 	async def process_callbacks(self, response : dict) -> None:
-		if self.callbacks is not None:
-			await asyncio.gather(*[asyncio.create_task(cb(response)) for cb in self.callbacks])
+		if self.callbacks:
+			await self.dispatcher.dispatch(self.callbacks, response)
+
+	def close(self) -> None:
+		self.dispatcher.close()
 
+	def pause(self) -> None:
+		self.paused = True
+
+	def resume(self) -> None:
+		self.paused = False
 
 class SubscriptionMgr(object):
 	WEB_SOCKET_URI = "wss://stream.binance.com:9443/"
 
-	SUBSCRIPTION_ID = 0
+	# regular messages of combined streams have the form {"stream":"<channel>","data":<payload>}
+	STREAM_PREFIX = '{"stream":"'
+	DATA_PREFIX = '","data":'
 
-	def __init__(self, subscriptions : List[Subscription], api_key : str, ssl_context = None):
+	def __init__(self, subscriptions : List[Subscription], api_key : str, ssl_context = None, lazy_routing : bool = True,
+	             ping_interval_s : float = 20, ping_timeout_s : float = 20, receive_timeout_s : float = 60,
+	             reconnect_delay_s : float = 0.25, max_reconnect_delay_s : float = 30,
+	             max_connection_age_s : float = 23 * 3600, rotation_overlap_s : float = 1, rotation_retry_delay_s : float = 30,
+	             change_batch_delay_s : float = 0.05):
 		self.api_key = api_key
 		self.ssl_context = ssl_context
+		self.lazy_routing = lazy_routing
+
+		# liveness detection, None disables the respective check
+		self.ping_interval_s = ping_interval_s
+		self.ping_timeout_s = ping_timeout_s
+		self.receive_timeout_s = receive_timeout_s
+
+		# jittered exponential backoff between reconnection attempts
+		self.reconnect_delay_s = reconnect_delay_s
+		self.max_reconnect_delay_s = max_reconnect_delay_s
+		self.reconnect_attempt = 0
+
+		# Connections are rotated make-before-break: a new connection is established and its subscription confirmed
+		# before the old one is closed. Rotation happens before binance closes connections older than 24 hours or when
+		# requested by a subscription. A failed rotation keeps the current connection and is retried later.
+		self.max_connection_age_s = max_connection_age_s
+		self.rotation_overlap_s = rotation_overlap_s
+		self.rotation_retry_delay_s = rotation_retry_delay_s
+		self.rotation_requested = None
+
+		# Channels subscribed by both connections of a rotation are delivered by the old connection and buffered by the
+		# new one until the new connection takes over. Then the buffered messages not delivered by the old connection
+		# are delivered and later messages delivered by the old connection already are skipped. Messages are compared
+		# by their raw frames, which carry event times or ids and are therefore unique within a stream.
+		self.rotated_websocket = None
+		self.incoming_websocket = None
+		self.rotated_channels = frozenset()
+		self.rotation_buffer = None
+		self.rotation_delivered = set()
+		self.handing_over = False
 
 		self.subscriptions = subscriptions
+		for subscription in subscriptions:
+			subscription.subscription_mgr = self
+
+		# channel name -> subscription, rebuilt whenever the set of subscribed channels is (re)established
+		self.subscriptions_by_channel = {}
+
+		# (un)subscription request id -> future resolved once the request is confirmed
+		self.request_ids = itertools.count(1)
+		self.pending_confirmations = {}
+
+		# Subscriptions can be added and removed while running. Changes made within `change_batch_delay_s` are
+		# sent together in one SUBSCRIBE and one UNSUBSCRIBE message over the live connection; a connection
+		# established later subscribes the current set of subscriptions anyway.
+		self.started = False
+		self.initialized = False
+		self.websocket = None
+		self.subscribed_channels = set()
+		self.uninitialized_subscriptions = []
+		self.change_batch_delay_s = change_batch_delay_s
+		self.change_task = None
+		self.change_futures = []
+		self.connection_lock = None
+
+		# monotonic time of the last message received, checked by the receive timeout watchdog
+		self.last_received_at = None
+
+	async def initialize(self) -> Optional[Exception]:
+		# Optional initialization of the subscriptions before run(), e.g. of a websocket started next to running ones.
+		# Unlike in run(), subscriptions failing to initialize are removed, the first error is returned.
+		self.uninitialized_subscriptions = list(self.subscriptions)
+		_, error = await self._initialize_new_subscriptions()
+		self.initialized = True
+
+		return error
 
 	async def run(self) -> None:
-		for subscription in self.subscriptions:
-			await subscription.initialize()
+		if not self.initialized:
+			for subscription in self.subscriptions:
+				await subscription.initialize()
+			self.initialized = True
 
+		self.started = True
+		self.rotation_requested = asyncio.Event()
+		self.connection_lock = asyncio.Lock()
+		websocket = None
+		consumer = None
 		try:
-			# main loop ensuring proper reconnection after a graceful connection termination by the remote server
+			# main loop ensuring proper reconnection after the connection is terminated or found dead
 			while True:
-				LOG.debug(f"Initiating websocket connection.")
-				uri = SubscriptionMgr.WEB_SOCKET_URI + self._create_stream_uri()
-				LOG.debug(f"Websocket uri: {uri}")
-				async with websockets.connect(uri, ssl = self.ssl_context, ping_interval = None) as websocket:
-					subscription_message = self._create_subscription_message()
-					LOG.debug(f"> {subscription_message}")
-					await websocket.send(json.dumps(subscription_message))
-
-					# start processing incoming messages
-					while True:
-						response = json.loads(await websocket.recv())
-						LOG.debug(f"< {response}")
-
-						if self._is_subscription_confirmation(response):
-							LOG.info(f"Subscription confirmed for id: {response['id']}")
-						# regular message
+				try:
+					if consumer is None:
+						async with self.connection_lock:
+							websocket, _ = await self._connect()
+							consumer = asyncio.create_task(self._consume(websocket))
+							self.websocket = websocket
+						rotate_at = time.monotonic() + self.max_connection_age_s
+						await self._notify_connected()
+
+					rotation = asyncio.create_task(self.rotation_requested.wait())
+					await asyncio.wait([consumer, rotation], return_when = asyncio.FIRST_COMPLETED,
+					                   timeout = max(0.0, rotate_at - time.monotonic()))
+					rotation.cancel()
+
+					if consumer.done():
+						# re-raises the reason of the connection termination
+						consumer.result()
+						consumer = None
+					else:
+						rotated = await self._rotate(websocket, consumer)
+						if rotated is not None:
+							websocket, consumer = rotated
+							rotate_at = time.monotonic() + self.max_connection_age_s
+							await self._notify_connected()
 						else:
-							await self.process_message(response)
+							rotate_at = time.monotonic() + self.rotation_retry_delay_s
+				except (websockets.exceptions.ConnectionClosed, websockets.exceptions.InvalidHandshake, asyncio.TimeoutError, OSError) as e:
+					await SubscriptionMgr._close_connection(websocket, consumer)
+					websocket = None
+					consumer = None
+					self.websocket = None
+					# requests of the lost connection will never be confirmed
+					self.pending_confirmations.clear()
+					self._end_rotation()
+
+					delay = self._get_reconnect_delay()
+					LOG.warning(f"Websocket connection lost ({e!r}), reconnecting in {round(delay, 3)} s.")
+					await asyncio.sleep(delay)
 		except asyncio.CancelledError:
 			LOG.warning(f"Websocket requested to be shutdown.")
 		except Exception:
 			LOG.error(f"Exception occurred. Websocket will be closed.")
 			raise
+		finally:
+			self.websocket = None
+			if self.change_task is not None:
+				self.change_task.cancel()
+			await SubscriptionMgr._close_connection(websocket, consumer)
+			for subscription in self.subscriptions:
+				subscription.close()
 
-	def _create_subscription_message(self) -> dict:
-		SubscriptionMgr.SUBSCRIPTION_ID += 1
+	async def _notify_connected(self) -> None:
+		for subscription in self.subscriptions:
+			await subscription.connected()
 
-		return {
-			"method": "SUBSCRIBE",
-			"params": [
-				subscription.get_channel_name() for subscription in self.subscriptions
-			],
-			"id": SubscriptionMgr.SUBSCRIPTION_ID
+	def request_rotation(self) -> None:
+		if self.rotation_requested is not None:
+			self.rotation_requested.set()
+
+	def add_subscriptions(self, subscriptions : List[Subscription]) -> asyncio.Future:
+		# the returned future is resolved once the change is confirmed or left to the next connection
+		for subscription in subscriptions:
+			subscription.subscription_mgr = self
+			self.subscriptions.append(subscription)
+
+		# not running yet, all subscriptions are initialized and subscribed once started
+		if not self.started:
+			return SubscriptionMgr._create_resolved_future()
+
+		self.uninitialized_subscriptions.extend(subscriptions)
+
+		return self._schedule_changes()
+
+	def remove_subscriptions(self, subscriptions : List[Subscription]) -> asyncio.Future:
+		for subscription in subscriptions:
+			self.subscriptions.remove(subscription)
+
+			if subscription in self.uninitialized_subscriptions:
+				self.uninitialized_subscriptions.remove(subscription)
+			else:
+				# messages of the channel are discarded from now on even if they keep coming until unsubscribed
+				channel_name = subscription.get_channel_name()
+				if self.subscriptions_by_channel.get(channel_name) is subscription:
+					del self.subscriptions_by_channel[channel_name]
+
+			subscription.subscription_mgr = None
+			if self.started:
+				subscription.close()
+
+		if not self.started:
+			return SubscriptionMgr._create_resolved_future()
+
+		return self._schedule_changes()
+
+	def _schedule_changes(self) -> asyncio.Future:
+		future = asyncio.get_event_loop().create_future()
+		self.change_futures.append(future)
+
+		if self.change_task is None:
+			self.change_task = asyncio.create_task(self._apply_changes())
+
+		return future
+
+	async def _apply_changes(self) -> None:
+		await asyncio.sleep(self.change_batch_delay_s)
+
+		async with self.connection_lock:
+			# changes made from now on are part of the next batch
+			futures = self.change_futures
+			self.change_futures = []
+			self.change_task = None
+
+			error = None
+			try:
+				subscriptions, error = await self._initialize_new_subscriptions()
+				for subscription in subscriptions:
+					# subscriptions removed meanwhile are not subscribed
+					if subscription in self.subscriptions:
+						self.subscriptions_by_channel[subscription.get_channel_name()] = subscription
+
+				if self.websocket is not None:
+					channel_names = set(self._get_channel_names())
+					confirmations = []
+					for method, changed_channel_names in [("UNSUBSCRIBE", self.subscribed_channels - channel_names),
+					                                      ("SUBSCRIBE", channel_names - self.subscribed_channels)]:
+						if len(changed_channel_names) > 0:
+							confirmations.append(await self._send_request(self.websocket, method, sorted(changed_channel_names)))
+					self.subscribed_channels = channel_names
+
+					if len(confirmations) > 0:
+						await asyncio.wait_for(asyncio.shield(asyncio.gather(*confirmations)), self.receive_timeout_s)
+			except (websockets.exceptions.ConnectionClosed, asyncio.TimeoutError, OSError) as e:
+				LOG.warning(f"Subscription changes not confirmed ({e!r}), they will be applied when reconnected.")
+			except Exception as e:
+				LOG.error(f"Subscription changes failed: {e!r}")
+				error = e
+			finally:
+				for future in futures:
+					if not future.done():
+						if error is not None:
+							future.set_exception(error)
+						else:
+							future.set_result(None)
+
+	async def _initialize_new_subscriptions(self) -> Tuple[List[Subscription], Optional[Exception]]:
+		# Subscriptions failing to initialize are removed from the manager, the others are subscribed regardless.
+		# Subscriptions may be removed while being initialized. Returns the initialized subscriptions and the first
+		# initialization error.
+		subscriptions = self.uninitialized_subscriptions
+		self.uninitialized_subscriptions = []
+		initialized = []
+		error = None
+		for i, subscription in enumerate(subscriptions):
+			try:
+				await subscription.initialize()
+			except asyncio.CancelledError:
+				# left to the next attempt
+				self.uninitialized_subscriptions[:0] = [x for x in subscriptions[i:] if x in self.subscriptions]
+				raise
+			except Exception as e:
+				LOG.error(f"Subscription {subscription.get_channel_name()} could not be initialized and is removed: {e!r}")
+				# not reported if removed meanwhile
+				if subscription in self.subscriptions:
+					self.subscriptions.remove(subscription)
+					subscription.subscription_mgr = None
+					subscription.close()
+					if error is None:
+						error = e
+				continue
+
+			if subscription not in self.subscriptions:
+				# closed by the removal already, resources acquired by the initialization are released
+				subscription.close()
+				continue
+
+			initialized.append(subscription)
+
+		return initialized, error
+
+	async def _send_request(self, websocket : websockets.WebSocketClientProtocol, method : str, channel_names : List[str]) -> asyncio.Future:
+		request = {
+			"method": method,
+			"params": channel_names,
+			"id": next(self.request_ids)
 		}
 
+		confirmation = asyncio.get_event_loop().create_future()
+		self.pending_confirmations[request["id"]] = confirmation
+		LOG.debug(f"> {request}")
+		try:
+			await websocket.send(json.dumps(request))
+		except Exception:
+			self.pending_confirmations.pop(request["id"], None)
+			raise
+
+		return confirmation
+
+	@staticmethod
+	def _create_resolved_future() -> asyncio.Future:
+		future = asyncio.get_event_loop().create_future()
+		future.set_result(None)
+
+		return future
+
+	async def _connect(self, keep_existing_channels : bool = False) -> Tuple[websockets.WebSocketClientProtocol, asyncio.Future]:
+		LOG.debug(f"Initiating websocket connection.")
+		_, error = await self._initialize_new_subscriptions()
+		if error is not None:
+			# the failed subscriptions were added by changes still waiting for their batch
+			for future in self.change_futures:
+				if not future.done():
+					future.set_exception(error)
+		self._build_subscription_index(keep_existing_channels)
+		channel_names = self._get_channel_names()
+		uri = SubscriptionMgr.WEB_SOCKET_URI + self._create_stream_uri()
+		LOG.debug(f"Websocket uri: {uri}")
+
+		websocket = await websockets.connect(uri, ssl = self.ssl_context, ping_interval = self.ping_interval_s,
+		                                     ping_timeout = self.ping_timeout_s)
+		try:
+			confirmation = await self._send_request(websocket, "SUBSCRIBE", channel_names)
+		except Exception:
+			await websocket.close()
+			raise
+
+		self.subscribed_channels = set(channel_names)
+
+		return websocket, confirmation
+
+	async def _consume(self, websocket : websockets.WebSocketClientProtocol) -> None:
+		self.last_received_at = time.monotonic()
+		watchdog = asyncio.create_task(self._watch(websocket)) if self.receive_timeout_s is not None else None
+		try:
+			while True:
+				message = await websocket.recv()
+				self.last_received_at = time.monotonic()
+				self.reconnect_attempt = 0
+				if LOG.isEnabledFor(logging.DEBUG):
+					LOG.debug(f"< {message}")
+
+				if websocket is self.websocket and not self.handing_over:
+					await self.process_raw_message(message)
+				else:
+					await self._process_rotation_message(websocket, message)
+		finally:
+			if watchdog is not None:
+				watchdog.cancel()
+
+	async def _watch(self, websocket : websockets.WebSocketClientProtocol) -> None:
+		# a single timer per connection instead of a timeout around every receive; a connection without any message
+		# within `receive_timeout_s` is failed, which terminates its consumer with ConnectionClosed
+		while True:
+			await asyncio.sleep(max(0.0, self.last_received_at + self.receive_timeout_s - time.monotonic()))
+			if time.monotonic() - self.last_received_at >= self.receive_timeout_s:
+				LOG.warning(f"No message received for {self.receive_timeout_s} s, failing the websocket connection.")
+				websocket.fail_connection(1011, "receive timeout")
+				return
+
+	async def _rotate(self, websocket : websockets.WebSocketClientProtocol, consumer : asyncio.Task) -> Optional[Tuple[websockets.WebSocketClientProtocol, asyncio.Task]]:
+		# returns the new connection and its consumer, or None if the rotation failed and the current connection is kept
+		LOG.info(f"Rotating websocket connection.")
+		self.rotation_requested.clear()
+
+		try:
+			for subscription in self.subscriptions:
+				await subscription.rotate()
+		except Exception as e:
+			LOG.error(f"Subscriptions could not be rotated, the websocket connection is kept: {e!r}")
+			return None
+
+		async with self.connection_lock:
+			self.rotated_websocket = websocket
+			self.rotated_channels = frozenset(self.subscribed_channels.intersection(self._get_channel_names()))
+			self.rotation_buffer = collections.deque()
+			self.rotation_delivered = set()
+			self.handing_over = True
+			try:
+				new_websocket, confirmation = await self._connect(keep_existing_channels = True)
+			except Exception as e:
+				LOG.error(f"Rotated websocket could not be connected, the websocket connection is kept: {e!r}")
+				self._end_rotation()
+				return None
+			self.incoming_websocket = new_websocket
+			new_consumer = asyncio.create_task(self._consume(new_websocket))
+			try:
+				await asyncio.wait_for(asyncio.shield(confirmation), self.receive_timeout_s)
+			except asyncio.TimeoutError:
+				LOG.warning(f"Subscription of the rotated websocket not confirmed in time, closing the old websocket anyway.")
+			await asyncio.sleep(self.rotation_overlap_s)
+
+			# the new connection takes over, messages of the old one are discarded from now on
+			self.websocket = new_websocket
+			self.rotated_websocket = None
+			self.incoming_websocket = None
+			self.rotated_channels = frozenset()
+			self._build_subscription_index()
+
+			# messages received by the new connection meanwhile are buffered as well
+			while len(self.rotation_buffer) > 0:
+				message = self.rotation_buffer.popleft()
+				if message in self.rotation_delivered:
+					self.rotation_delivered.discard(message)
+				else:
+					await self.process_raw_message(message)
+			self.rotation_buffer = None
+			# messages the old connection was ahead with are still to be skipped
+			self.handing_over = len(self.rotation_delivered) > 0
+
+			await SubscriptionMgr._close_connection(websocket, consumer)
+			LOG.info(f"Websocket connection rotated.")
+
+		return new_websocket, new_consumer
+
+	def _end_rotation(self) -> None:
+		self.rotated_websocket = None
+		self.incoming_websocket = None
+		self.rotated_channels = frozenset()
+		self.rotation_buffer = None
+		self.rotation_delivered = set()
+		self.handing_over = False
+
+	@staticmethod
+	async def _close_connection(websocket : websockets.WebSocketClientProtocol, consumer : asyncio.Task) -> None:
+		if consumer is not None and not consumer.done():
+			consumer.cancel()
+
+		if websocket is not None:
+			try:
+				await websocket.close()
+			except Exception as e:
+				LOG.debug(f"Websocket could not be closed gracefully: {e!r}")
+
+	def _get_reconnect_delay(self) -> float:
+		delay = min(self.max_reconnect_delay_s, self.reconnect_delay_s * 2 ** self.reconnect_attempt)
+		self.reconnect_attempt += 1
+
+		return delay * random.uniform(0.5, 1.0)
+
 	def _create_stream_uri(self) -> str:
-		return "stream?streams=" + "/".join([subscription.get_channel_name() for subscription in self.subscriptions])
+		return "stream?streams=" + "/".join(self._get_channel_names())
+
+	def _get_channel_names(self) -> List[str]:
+		return [subscription.get_channel_name() for subscription in self.subscriptions]
+
+	def _build_subscription_index(self, keep_existing_channels : bool = False) -> None:
+		subscriptions_by_channel = {subscription.get_channel_name(): subscription for subscription in self.subscriptions}
+		if keep_existing_channels:
+			self.subscriptions_by_channel.update(subscriptions_by_channel)
+		else:
+			self.subscriptions_by_channel = subscriptions_by_channel
 
 	@staticmethod
 	def _is_subscription_confirmation(response):
@@ -91,39 +551,634 @@ class SubscriptionMgr(object):
 		else:
 			return False
 
+	async def process_raw_message(self, message : str) -> None:
+		# route the message based on the stream name extracted from the raw frame and decode only the data payload
+		# of active subscriptions; anything not matching the expected layout goes through full decoding
+		if self.lazy_routing and message.startswith(SubscriptionMgr.STREAM_PREFIX):
+			channel_end = message.find('"', len(SubscriptionMgr.STREAM_PREFIX))
+			if channel_end > 0 and message.startswith(SubscriptionMgr.DATA_PREFIX, channel_end):
+				subscription = self.subscriptions_by_channel.get(message[len(SubscriptionMgr.STREAM_PREFIX):channel_end])
+				if subscription is not None and not subscription.paused:
+					if subscription.RAW_DATA:
+						await subscription.process_raw_data(message[channel_end + len(SubscriptionMgr.DATA_PREFIX):-1])
+					else:
+						await subscription.process_message(json_decoder.loads(message[channel_end + len(SubscriptionMgr.DATA_PREFIX):-1]))
+				return
+
+		await self._process_response(json_decoder.loads(message))
+
+	async def _process_rotation_message(self, websocket : websockets.WebSocketClientProtocol, message : str) -> None:
+		# messages of both connections while a connection is rotated, the rotation is rare enough for the slow path
+		if websocket is self.rotated_websocket:
+			if SubscriptionMgr._get_stream_name(message) in self.rotated_channels:
+				self.rotation_delivered.add(message)
+			await self.process_raw_message(message)
+		elif websocket is self.incoming_websocket:
+			if SubscriptionMgr._get_stream_name(message) in self.rotated_channels:
+				self.rotation_buffer.append(message)
+			else:
+				await self.process_raw_message(message)
+		elif websocket is self.websocket:
+			# the new connection after it has taken over
+			if self.rotation_buffer is not None:
+				self.rotation_buffer.append(message)
+			elif message in self.rotation_delivered:
+				self.rotation_delivered.discard(message)
+				self.handing_over = len(self.rotation_delivered) > 0
+			else:
+				await self.process_raw_message(message)
+
+	@staticmethod
+	def _get_stream_name(message : str) -> Optional[str]:
+		if message.startswith(SubscriptionMgr.STREAM_PREFIX):
+			channel_end = message.find('"', len(SubscriptionMgr.STREAM_PREFIX))
+			if channel_end > 0:
+				return message[len(SubscriptionMgr.STREAM_PREFIX):channel_end]
+
+		response = json_decoder.loads(message)
+		return response.get("stream") if isinstance(response, dict) else None
+
+	async def _process_response(self, response : dict) -> None:
+		if self._is_subscription_confirmation(response):
+			LOG.info(f"Subscription confirmed for id: {response['id']}")
+			confirmation = self.pending_confirmations.pop(response['id'], None)
+			if confirmation is not None and not confirmation.done():
+				confirmation.set_result(None)
+		# rejected request, e.g. {"error":{"code":2,"msg":"Invalid request"},"id":1}
+		elif 'error' in response:
+			LOG.error(f"Request {response.get('id')} rejected: {response['error']}")
+			confirmation = self.pending_confirmations.pop(response.get('id'), None)
+			if confirmation is not None and not confirmation.done():
+				confirmation.set_exception(BinanceException(f"Websocket request {response.get('id')} rejected: {response['error']}"))
+		# regular message
+		elif 'stream' in response:
+			await self.process_message(response)
+		else:
+			LOG.debug(f"Unexpected message ignored: {response}")
+
 	async def process_message(self, response : dict) -> None:
-		for subscription in self.subscriptions:
-			if subscription.get_channel_name() == response["stream"]:
-				await subscription.process_message(response["data"])
+		subscription = self.subscriptions_by_channel.get(response["stream"])
+		if subscription is not None and not subscription.paused:
+			await subscription.process_message(response["data"])
+
+class SharedStream(Subscription):
+	# Subscription of a channel on behalf of all subscriptions (consumers) of the very same channel, e.g. composed by
+	# independent modules. The channel is subscribed once, its messages are decoded once and handed over to every
+	# consumer which is not paused; consumers must therefore not modify the received payload.
+	RAW_DATA = True
+
+	def __init__(self, channel_name : str):
+		# consumers are replaced rather than modified so that messages can be fanned out while consumers change;
+		# messages are handed over to active consumers only, i.e. those which have been initialized
+		self.consumers = ()
+		self.active_consumers = ()
+		self._subscription_mgr = None
+
+		super().__init__()
+
+		self.channel_name = channel_name
+		self.initialized = False
+
+	def add_consumer(self, subscription : Subscription) -> None:
+		# the consumer is activated once initialized, together with the stream or on its own if the stream has been
+		# initialized already
+		subscription.subscription_mgr = self._subscription_mgr
+		self.consumers = self.consumers + (subscription,)
+
+	def activate_consumer(self, subscription : Subscription) -> None:
+		if any(consumer is subscription for consumer in self.consumers) and \
+			not any(consumer is subscription for consumer in self.active_consumers):
+			self.active_consumers = self.active_consumers + (subscription,)
+
+	def remove_consumer(self, subscription : Subscription) -> None:
+		self.consumers = tuple(consumer for consumer in self.consumers if consumer is not subscription)
+		self.active_consumers = tuple(consumer for consumer in self.active_consumers if consumer is not subscription)
+		subscription.subscription_mgr = None
+
+	def get_channel_name(self) -> str:
+		return self.channel_name
+
+	def get_expected_message_rate(self) -> float:
+		return max([consumer.get_expected_message_rate() for consumer in self.consumers], default = self.EXPECTED_MESSAGE_RATE)
+
+	async def initialize(self) -> None:
+		# consumers added while the stream is being initialized are initialized as well
+		while True:
+			pending = [consumer for consumer in self.consumers if not any(consumer is x for x in self.active_consumers)]
+			if len(pending) == 0:
 				break
 
+			for consumer in pending:
+				await consumer.initialize()
+				self.activate_consumer(consumer)
+
+		self.initialized = True
+
+	async def rotate(self) -> None:
+		for consumer in self.active_consumers:
+			await consumer.rotate()
+
+	async def connected(self) -> None:
+		for consumer in self.active_consumers:
+			await consumer.connected()
+
+	async def process_message(self, response : dict) -> None:
+		for consumer in self.active_consumers:
+			if not consumer.paused:
+				await consumer.process_message(response)
+
+	async def process_raw_data(self, data : str) -> None:
+		# the payload is decoded at most once and only if there is a consumer not parsing it on its own
+		response = None
+		for consumer in self.active_consumers:
+			if consumer.paused:
+				continue
+
+			if consumer.RAW_DATA:
+				await consumer.process_raw_data(data)
+			else:
+				if response is None:
+					response = json_decoder.loads(data)
+				await consumer.process_message(response)
+
+	def close(self) -> None:
+		super().close()
+
+		for consumer in self.consumers:
+			consumer.close()
+
+	# consumers are assigned to the websocket manager of their stream
+	@property
+	def subscription_mgr(self) -> 'SubscriptionMgr':
+		return self._subscription_mgr
+
+	@subscription_mgr.setter
+	def subscription_mgr(self, subscription_mgr : 'SubscriptionMgr') -> None:
+		self._subscription_mgr = subscription_mgr
+		for consumer in self.consumers:
+			consumer.subscription_mgr = subscription_mgr
+
+	# paused when all active consumers are paused, messages are not even decoded then
+	@property
+	def paused(self) -> bool:
+		return all(consumer.paused for consumer in self.active_consumers)
+
+	@paused.setter
+	def paused(self, paused : bool) -> None:
+		for consumer in self.consumers:
+			consumer.paused = paused
+
 class BestOrderBookTickerSubscription(Subscription):
-	def __init__(self, callbacks : List[Callable[[dict], Any]] = None):
-		super().__init__(callbacks)
+	EXPECTED_MESSAGE_RATE = 1000.0
+
+	def __init__(self, callbacks : List[Callable[[dict], Any]] = None, dispatcher : CallbackDispatcher = None,
+	             typed_events : bool = False, reuse_events : bool = False):
+		super().__init__(callbacks, dispatcher, events.BookTickerEvent if typed_events else None, reuse_events)
+
+	def get_channel_name(self):
+		return "!bookTicker"
+
+class BestBidOfferSubscription(Subscription):
+	# Conflating alternative to BestOrderBookTickerSubscription which keeps just the latest best bid and offer of every
+	# symbol in a BestBidOfferStore instead of passing each update to callbacks. Updates are parsed from the raw payload
+	# without decoding it into a dict.
+	#
+	# Callbacks are invoked with the symbol whose best bid and offer changed (to be looked up in the store). If
+	# `notification_interval_ms` is set, callbacks are invoked at most once per interval and symbol, the latest change
+	# of a symbol is always notified eventually.
+	EXPECTED_MESSAGE_RATE = 1000.0
+	RAW_DATA = True
+
+	# {"u":<update id>,"s":"<symbol>","b":"<bid price>","B":"<bid qty>","a":"<ask price>","A":"<ask qty>"} split by quotes
+	RAW_FIELD_COUNT = 23
+
+	def __init__(self, store : BestBidOfferStore = None, callbacks : List[Callable[[str], Any]] = None,
+	             dispatcher : CallbackDispatcher = None, notification_interval_ms : float = None):
+		super().__init__(callbacks, dispatcher)
+
+		self.store = store if store is not None else BestBidOfferStore()
+
+		self.notification_interval_s = notification_interval_ms / 1000 if notification_interval_ms is not None else None
+		# monotonic time of the last notification by symbol id
+		self.notification_times = array('d')
+		self.pending_symbol_ids = set()
+		self.notification_task = None
 
 	def get_channel_name(self):
 		return "!bookTicker"
 
+	async def initialize(self) -> None:
+		if self.callbacks and self.notification_interval_s is not None and self.notification_task is None:
+			self.notification_task = asyncio.create_task(self._notify_pending())
+
+	async def process_message(self, response : dict) -> None:
+		symbol_id = self.store.get_symbol_id(response["s"])
+		if self.store.update(symbol_id, response["u"], float(response["b"]), float(response["B"]), float(response["a"]), float(response["A"])) \
+			and self.callbacks:
+			await self._notify(symbol_id)
+
+	async def process_raw_data(self, data : str) -> None:
+		fields = data.split('"')
+		if len(fields) != BestBidOfferSubscription.RAW_FIELD_COUNT or fields[1] != "u" or fields[7] != "b" or fields[19] != "A":
+			await self.process_message(json_decoder.loads(data))
+			return
+
+		symbol_id = self.store.get_symbol_id(fields[5])
+		if self.store.update(symbol_id, int(fields[2][1:-1]), float(fields[9]), float(fields[13]), float(fields[17]), float(fields[21])) \
+			and self.callbacks:
+			await self._notify(symbol_id)
+
+	async def _notify(self, symbol_id : int) -> None:
+		if self.notification_interval_s is None:
+			await self.process_callbacks(self.store.symbols[symbol_id])
+			return
+
+		while len(self.notification_times) <= symbol_id:
+			self.notification_times.append(0.0)
+
+		now = time.monotonic()
+		if now - self.notification_times[symbol_id] >= self.notification_interval_s:
+			self.notification_times[symbol_id] = now
+			self.pending_symbol_ids.discard(symbol_id)
+			await self.process_callbacks(self.store.symbols[symbol_id])
+		else:
+			self.pending_symbol_ids.add(symbol_id)
+
+	async def _notify_pending(self) -> None:
+		# notifies changes suppressed by the notification interval once the interval of their symbol has passed
+		while True:
+			await asyncio.sleep(self.notification_interval_s)
+
+			now = time.monotonic()
+			for symbol_id in list(self.pending_symbol_ids):
+				if now - self.notification_times[symbol_id] >= self.notification_interval_s:
+					self.notification_times[symbol_id] = now
+					self.pending_symbol_ids.discard(symbol_id)
+					await self.process_callbacks(self.store.symbols[symbol_id])
+
+	def close(self) -> None:
+		super().close()
+
+		if self.notification_task is not None:
+			self.notification_task.cancel()
+			self.notification_task = None
+
 class TradeSubscription(Subscription):
-	def __init__(self, pair : Pair, callbacks: List[Callable[[dict], Any]] = None):
-		super().__init__(callbacks)
+	EXPECTED_MESSAGE_RATE = 5.0
+
+	def __init__(self, pair : Pair, callbacks: List[Callable[[dict], Any]] = None, dispatcher : CallbackDispatcher = None,
+	             typed_events : bool = False, reuse_events : bool = False, binance_client = None, max_gap_fill : int = 10000):
+		super().__init__(callbacks, dispatcher, events.TradeEvent if typed_events else None, reuse_events)
+
+		self.pair = pair
+		self.channel_name = str(pair).lower() + "@trade"
+
+		# when a client is provided, trades missed (e.g. during a reconnection) are detected by their ids and
+		# backfilled from the REST API before live trades are delivered again
+		self.binance_client = binance_client
+		self.max_gap_fill = max_gap_fill
+		self.last_trade_id = None
+		self.buffered_trades = collections.deque()
+		self.gap_fill_task = None
+
+	def get_channel_name(self):
+		return self.channel_name
+
+	async def process_message(self, response : dict) -> None:
+		if self.binance_client is not None:
+			# live trades are held back while missing trades are being backfilled
+			if self.gap_fill_task is not None:
+				self.buffered_trades.append(response)
+				return
+
+			trade_id = response["t"]
+			if self.last_trade_id is not None:
+				# already delivered
+				if trade_id <= self.last_trade_id:
+					return
+
+				if trade_id > self.last_trade_id + 1:
+					self.buffered_trades.append(response)
+					self.gap_fill_task = asyncio.create_task(self._fill_gaps())
+					return
+
+			self.last_trade_id = trade_id
+
+		await self.process_callbacks(self.create_event(response))
+
+	def close(self) -> None:
+		if self.gap_fill_task is not None:
+			self.gap_fill_task.cancel()
+			self.gap_fill_task = None
+		self.buffered_trades.clear()
+
+		super().close()
+
+	async def _fill_gaps(self) -> None:
+		# runs aside the websocket consumer, delivers buffered live trades in order once the gaps before them are filled
+		try:
+			while len(self.buffered_trades) > 0:
+				response = self.buffered_trades.popleft()
+				trade_id = response["t"]
+				if trade_id <= self.last_trade_id:
+					continue
+
+				if trade_id > self.last_trade_id + 1:
+					await self._backfill(self.last_trade_id + 1, trade_id - 1)
+
+				self.last_trade_id = trade_id
+				await self.process_callbacks(self.create_event(response))
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			LOG.error(f"Delivery of trades for {self.pair} failed, {len(self.buffered_trades)} buffered trades are dropped: {e}")
+			self.buffered_trades.clear()
+		finally:
+			self.gap_fill_task = None
+
+	async def _backfill(self, first_trade_id : int, last_trade_id : int) -> None:
+		LOG.warning(f"Missing trades {first_trade_id}-{last_trade_id} for {self.pair} detected.")
+		if last_trade_id - first_trade_id + 1 > self.max_gap_fill:
+			LOG.warning(f"Only the last {self.max_gap_fill} missing trades for {self.pair} will be backfilled.")
+			first_trade_id = last_trade_id - self.max_gap_fill + 1
+
+		from_id = first_trade_id
+		try:
+			while from_id <= last_trade_id:
+				trades = (await self.binance_client.get_historical_trades(self.pair, limit = min(1000, last_trade_id - from_id + 1), from_id = from_id))["response"]
+				if len(trades) == 0:
+					break
+
+				for trade in trades:
+					if trade["id"] > last_trade_id:
+						break
+					await self.process_callbacks(self.create_event(self._to_stream_trade(trade)))
+
+				from_id = trades[-1]["id"] + 1
+		except Exception as e:
+			LOG.error(f"Backfill of trades {from_id}-{last_trade_id} for {self.pair} failed: {e}")
+
+	def _to_stream_trade(self, trade : dict) -> dict:
+		# Order ids of the trade's parties are not available through the REST API, backfilled trades carry None as
+		# buyer ("b") and seller ("a") order id. The keys are kept so that consumers (and TradeEvent) can rely on the
+		# layout of live trades.
+		return {
+			"e": "trade",
+			"E": trade["time"],
+			"s": str(self.pair),
+			"t": trade["id"],
+			"p": trade["price"],
+			"q": trade["qty"],
+			"b": None,
+			"a": None,
+			"T": trade["time"],
+			"m": trade["isBuyerMaker"],
+			"M": trade["isBestMatch"]
+		}
+
+class AggregateTradeSubscription(Subscription):
+	EXPECTED_MESSAGE_RATE = 3.0
+
+	def __init__(self, pair : Pair, callbacks: List[Callable[[dict], Any]] = None, dispatcher : CallbackDispatcher = None,
+	             typed_events : bool = False, reuse_events : bool = False, bar_aggregators : List[BarAggregator] = None):
+		super().__init__(callbacks, dispatcher, events.AggregateTradeEvent if typed_events else None, reuse_events)
+
+		self.pair = pair
+		self.channel_name = str(pair).lower() + "@aggTrade"
+
+		# bars are updated by every trade before callbacks are invoked
+		self.bar_aggregators = bar_aggregators if bar_aggregators is not None else []
+
+	def get_channel_name(self):
+		return self.channel_name
+
+	async def process_message(self, response : dict) -> None:
+		if self.bar_aggregators:
+			price = float(response["p"])
+			quantity = float(response["q"])
+			trade_count = response["l"] - response["f"] + 1
+			for bar_aggregator in self.bar_aggregators:
+				bar_aggregator.add_trade(response["s"], response["a"], response["T"], price, quantity, trade_count)
+
+		await self.process_callbacks(self.create_event(response))
+
+	def close(self) -> None:
+		super().close()
+
+		# aggregators may be shared with subscriptions of other symbols, they are closed with their last symbol
+		for bar_aggregator in self.bar_aggregators:
+			bar_aggregator.remove_symbol(str(self.pair))
+
+class CandlestickSubscription(Subscription):
+	# the current candlestick is pushed with every change (at most every 2 seconds), `x` marks the closed one
+	EXPECTED_MESSAGE_RATE = 1.0
+
+	def __init__(self, pair : Pair, interval : enums.CandelstickInterval, callbacks: List[Callable[[dict], Any]] = None,
+	             dispatcher : CallbackDispatcher = None, typed_events : bool = False, reuse_events : bool = False):
+		super().__init__(callbacks, dispatcher, events.CandlestickEvent if typed_events else None, reuse_events)
+
+		self.pair = pair
+		self.interval = interval
+		self.channel_name = str(pair).lower() + "@kline_" + interval.value
+
+	def get_channel_name(self):
+		return self.channel_name
+
+class DepthSubscription(Subscription):
+	def __init__(self, pair : Pair, binance_client, callbacks : List[Callable[[OrderBook], Any]] = None,
+	             update_speed_100ms : bool = False, snapshot_depth : enums.DepthLimit = enums.DepthLimit.L_1000,
+	             dispatcher : CallbackDispatcher = None):
+		super().__init__(callbacks, dispatcher)
 
 		self.pair = pair
+		self.binance_client = binance_client
+		self.update_speed_100ms = update_speed_100ms
+		self.snapshot_depth = snapshot_depth
+		self.channel_name = str(pair).lower() + ("@depth@100ms" if update_speed_100ms else "@depth")
+
+		self.order_book = OrderBook(pair)
+		self.synchronized = False
+
+		# diff updates received while the order book is being (re)synchronized with a REST snapshot
+		self.buffered_updates = []
+		self.snapshot_task = None
 
 	def get_channel_name(self):
-		return str(self.pair).lower() + "@trade"
+		return self.channel_name
+
+	def get_expected_message_rate(self) -> float:
+		return 10.0 if self.update_speed_100ms else 1.0
+
+	async def process_message(self, response : dict) -> None:
+		if not self.synchronized:
+			self.buffered_updates.append(response)
+			if self.snapshot_task is None:
+				self.snapshot_task = asyncio.create_task(self._synchronize())
+			return
+
+		# update already applied
+		if response["u"] <= self.order_book.last_update_id:
+			return
+
+		if not self._is_continuous(response):
+			LOG.warning(f"Gap detected in depth updates for {self.pair} (last update id {self.order_book.last_update_id}, "
+			            f"received {response['U']}-{response['u']}). Resynchronizing order book.")
+			self._reset()
+			await self.process_message(response)
+			return
+
+		self.order_book.apply_update(response)
+		await self.process_callbacks(self.order_book)
+
+	async def _synchronize(self) -> None:
+		try:
+			snapshot = await self.binance_client.get_orderbook(self.pair, limit = self.snapshot_depth)
+		except Exception as e:
+			LOG.error(f"Order book snapshot for {self.pair} could not be retrieved, will be retried with the next update: {e}")
+			self.snapshot_task = None
+			return
+
+		self.order_book.set_snapshot(snapshot["response"])
+
+		updates = self.buffered_updates
+		self.buffered_updates = []
+		for i, update in enumerate(updates):
+			# update already reflected in the snapshot
+			if update["u"] <= self.order_book.last_update_id:
+				continue
+
+			if not self._is_continuous(update):
+				LOG.warning(f"Order book snapshot for {self.pair} does not connect to the buffered updates. Resynchronizing order book.")
+				self._reset()
+				self.buffered_updates = updates[i:] + self.buffered_updates
+				self.snapshot_task = asyncio.create_task(self._synchronize())
+				return
+
+			self.order_book.apply_update(update)
+
+		self.synchronized = True
+		self.snapshot_task = None
+		LOG.debug(f"Order book for {self.pair} synchronized at update id {self.order_book.last_update_id}.")
+
+		await self.process_callbacks(self.order_book)
+
+	def _is_continuous(self, update : dict) -> bool:
+		next_update_id = self.order_book.last_update_id + 1
+		return update["U"] <= next_update_id <= update["u"]
+
+	def _reset(self) -> None:
+		self.synchronized = False
+		self.order_book.clear()
 
 class AccountSubscription(Subscription):
-	def __init__(self, binance_client, callbacks: List[Callable[[dict], Any]] = None):
-		super().__init__(callbacks)
+	EXPECTED_MESSAGE_RATE = 0.1
+
+	# number of recent execution reports remembered to discard duplicates
+	DEDUPLICATION_WINDOW = 10000
+
+	def __init__(self, binance_client, callbacks: List[Callable[[dict], Any]] = None, dispatcher : CallbackDispatcher = None,
+	             typed_events : bool = False, keep_alive_interval_s : float = 30 * 60, account_store : AccountStore = None):
+		super().__init__(callbacks, dispatcher, events.create_account_event if typed_events else None)
 
 		self.binance_client = binance_client
 		self.listen_key = None
+		# listen key of the connection being rotated out, closed once the new connection has taken over
+		self.rotated_listen_key = None
+
+		# optional local state of orders and balances seeded on initialization and updated before callbacks are invoked,
+		# reconciled whenever the websocket is (re)connected
+		self.account_store = account_store
+		self.account_store_initialized = False
+
+		# listen key expires 60 minutes after its creation unless kept alive
+		self.keep_alive_interval_s = keep_alive_interval_s
+		self.keep_alive_task = None
+
+		# execution reports may be received twice while the websocket is being rotated
+		self.recent_execution_reports = collections.OrderedDict()
 
 	async def initialize(self):
+		await self._create_listen_key()
+
+		if self.account_store is not None and not self.account_store_initialized:
+			await self.account_store.initialize()
+			self.account_store_initialized = True
+
+		if self.keep_alive_task is not None:
+			self.keep_alive_task.cancel()
+		self.keep_alive_task = asyncio.create_task(self._keep_alive())
+
+	async def rotate(self) -> None:
+		listen_key = self.listen_key
+		await self._create_listen_key()
+
+		# binance returns the active listen key again as long as it is valid
+		if self.rotated_listen_key is None and listen_key != self.listen_key:
+			self.rotated_listen_key = listen_key
+
+	async def connected(self) -> None:
+		if self.rotated_listen_key is not None and self.rotated_listen_key != self.listen_key:
+			try:
+				await self.binance_client.close_listen_key(self.rotated_listen_key)
+				LOG.debug(f"Listen key {self.rotated_listen_key} closed.")
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				LOG.warning(f"Listen key {self.rotated_listen_key} could not be closed: {e}")
+		self.rotated_listen_key = None
+
+		if self.account_store is not None:
+			self.account_store.request_reconciliation()
+
+	def get_channel_name(self):
+		return self.listen_key
+
+	async def process_message(self, response : dict) -> None:
+		event_type = response.get("e")
+		if event_type == "executionReport":
+			key = (response["i"], response["t"], response["x"])
+			if key in self.recent_execution_reports:
+				LOG.debug(f"Duplicate execution report {key} discarded.")
+				return
+
+			self.recent_execution_reports[key] = None
+			if len(self.recent_execution_reports) > AccountSubscription.DEDUPLICATION_WINDOW:
+				self.recent_execution_reports.popitem(last = False)
+		elif event_type == "listenKeyExpired":
+			LOG.warning(f"Listen key expired, websocket will be rotated.")
+			if self.subscription_mgr is not None:
+				self.subscription_mgr.request_rotation()
+
+		if self.account_store is not None:
+			self.account_store.process_event(response)
+
+		await self.process_callbacks(self.create_event(response))
+
+	def close(self) -> None:
+		super().close()
+
+		if self.keep_alive_task is not None:
+			self.keep_alive_task.cancel()
+			self.keep_alive_task = None
+
+		if self.account_store is not None and self.account_store_initialized:
+			self.account_store.close()
+			self.account_store_initialized = False
+
+	async def _create_listen_key(self) -> None:
 		listen_key_response = await self.binance_client.get_listen_key()
 		self.listen_key = listen_key_response["response"]["listenKey"]
 		LOG.debug(f'Listen key: {self.listen_key}')
 
-	def get_channel_name(self):
-		return self.listen_key
\ No newline at end of file
+	async def _keep_alive(self) -> None:
+		while True:
+			await asyncio.sleep(self.keep_alive_interval_s)
+			try:
+				await self.binance_client.keep_alive_listen_key(self.listen_key)
+				LOG.debug(f"Listen key {self.listen_key} kept alive.")
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				LOG.error(f"Listen key could not be kept alive, websocket will be rotated: {e}")
+				if self.subscription_mgr is not None:
+					self.subscription_mgr.request_rotation()
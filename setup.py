@@ -28,7 +28,12 @@ setuptools.setup(
 	],
 	install_requires=[
 		'aiohttp==3.6.2',
-		'websockets==8.1'
+		'websockets==8.1',
+		'yarl==1.4.2'
 	],
+	extras_require={
+		'fastjson': ['orjson'],
+		'numpy': ['numpy']
+	},
 	python_requires='>=3.6',
 )
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import urllib.parse
+
+import pytest
+import websockets
+
+from binance.subscriptions import SubscriptionMgr
+
+PAIR_SYMBOL = "ETHBTC"
+CHANNEL = "ethbtc@trade"
+
+class FakeServer(object):
+	# local combined stream endpoint broadcasting the very same trades to every connection subscribed to the trade channel
+	def __init__(self, rejected_channels = ()) -> None:
+		self.rejected_channels = rejected_channels
+		self.channels_by_connection = {}
+		self.connection_count = 0
+		self.requests = []
+		self.trade_id = 0
+		self.server = None
+		self.producer = None
+
+	async def start(self) -> str:
+		self.server = await websockets.serve(self._handle, "127.0.0.1", 0)
+		self.producer = asyncio.create_task(self._produce())
+
+		return f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/"
+
+	async def stop(self) -> None:
+		self.producer.cancel()
+		self.server.close()
+		await self.server.wait_closed()
+
+	async def _handle(self, websocket) -> None:
+		query = urllib.parse.parse_qs(urllib.parse.urlparse(websocket.path).query)
+		self.channels_by_connection[websocket] = set(query["streams"][0].split("/"))
+		self.connection_count += 1
+		try:
+			async for message in websocket:
+				request = json.loads(message)
+				self.requests.append((request["method"], request["params"]))
+				if any(channel in self.rejected_channels for channel in request["params"]):
+					await websocket.send(json.dumps({"error": {"code": 2, "msg": "Invalid request"}, "id": request["id"]}))
+					continue
+
+				if request["method"] == "SUBSCRIBE":
+					self.channels_by_connection[websocket].update(request["params"])
+				elif request["method"] == "UNSUBSCRIBE":
+					self.channels_by_connection[websocket].difference_update(request["params"])
+				await websocket.send(json.dumps({"result": None, "id": request["id"]}))
+		except websockets.exceptions.ConnectionClosed:
+			pass
+		finally:
+			del self.channels_by_connection[websocket]
+
+	async def _produce(self) -> None:
+		while True:
+			self.trade_id += 1
+			data = {"e": "trade", "E": self.trade_id, "s": PAIR_SYMBOL, "t": self.trade_id, "p": "1", "q": "1", "b": 1, "a": 1,
+			        "T": self.trade_id, "m": True, "M": True}
+			frame = json.dumps({"stream": CHANNEL, "data": data}, separators = (',', ':'))
+			for websocket, channels in list(self.channels_by_connection.items()):
+				if CHANNEL in channels:
+					try:
+						await websocket.send(frame)
+					except websockets.exceptions.ConnectionClosed:
+						pass
+			await asyncio.sleep(0.001)
+
+@pytest.fixture
+def fake_server(monkeypatch):
+	server = FakeServer()
+
+	async def start(rejected_channels = ()):
+		server.rejected_channels = rejected_channels
+		monkeypatch.setattr(SubscriptionMgr, "WEB_SOCKET_URI", await server.start())
+		return server
+
+	return start
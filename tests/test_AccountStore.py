@@ -0,0 +1,144 @@
+import asyncio
+
+from binance.AccountStore import AccountStore, AssetBalance, Order
+
+SYMBOL = "BTCUSDT"
+
+def rest_order(order_id, status = "NEW", update_time = 1000, executed_quantity = "0"):
+	return {"symbol": SYMBOL, "orderId": order_id, "orderListId": -1, "clientOrderId": f"c{order_id}", "price": "100",
+	        "origQty": "1", "executedQty": executed_quantity, "cummulativeQuoteQty": "0", "status": status,
+	        "timeInForce": "GTC", "type": "LIMIT", "side": "BUY", "stopPrice": "0", "time": 900, "updateTime": update_time}
+
+def execution_report(order_id, execution_type, status, transaction_time, executed_quantity = "0", client_order_id = None,
+                     orig_client_order_id = ""):
+	return {"e": "executionReport", "E": transaction_time, "s": SYMBOL, "c": client_order_id or f"c{order_id}", "S": "BUY",
+	        "o": "LIMIT", "f": "GTC", "q": "1", "p": "100", "P": "0", "F": "0", "g": -1, "C": orig_client_order_id,
+	        "x": execution_type, "X": status, "r": "NONE", "i": order_id, "l": "0", "z": executed_quantity, "L": "0",
+	        "n": "0", "N": None, "T": transaction_time, "t": -1, "w": True, "m": False, "O": 900, "Z": "0", "Y": "0"}
+
+class FakeClient(object):
+	def __init__(self, open_orders = None, orders = None):
+		self.open_orders = open_orders or []
+		# order id -> order returned by get_order
+		self.orders = orders or {}
+		self.calls = []
+
+	async def get_account(self):
+		self.calls.append("get_account")
+		return {"response": {"updateTime": 1000, "balances": [{"asset": "BTC", "free": "1.0", "locked": "0.5"}]}}
+
+	async def get_open_orders(self, pair = None):
+		self.calls.append("get_open_orders")
+		return {"response": self.open_orders}
+
+	async def get_order(self, pair, order_id = None):
+		self.calls.append(("get_order", str(pair), order_id))
+		return {"response": self.orders[order_id]}
+
+def test_older_updates_ignored():
+	account_store = AccountStore(FakeClient())
+	account_store.process_event(execution_report(1, "TRADE", "PARTIALLY_FILLED", 2000, "0.5"))
+	account_store.update_order(Order.from_rest(rest_order(1, update_time = 1000)))
+
+	order = account_store.get_order(SYMBOL, 1)
+	assert (order.status, order.executed_quantity) == ("PARTIALLY_FILLED", 0.5)
+
+	account_store.process_event(execution_report(1, "TRADE", "FILLED", 3000, "1"))
+	assert account_store.get_order(SYMBOL, 1).status == "FILLED"
+
+def test_lower_executed_quantity_ignored_at_same_time():
+	account_store = AccountStore(FakeClient())
+	account_store.process_event(execution_report(1, "TRADE", "PARTIALLY_FILLED", 2000, "0.7"))
+	account_store.process_event(execution_report(1, "TRADE", "PARTIALLY_FILLED", 2000, "0.5"))
+
+	assert account_store.get_order(SYMBOL, 1).executed_quantity == 0.7
+
+def test_cancellation_keeps_client_order_id_of_order():
+	account_store = AccountStore(FakeClient())
+	account_store.process_event(execution_report(1, "NEW", "NEW", 2000))
+	account_store.process_event(execution_report(1, "CANCELED", "CANCELED", 2100, client_order_id = "cancel1",
+	                                             orig_client_order_id = "c1"))
+
+	assert account_store.get_order_by_client_order_id("c1").status == "CANCELED"
+	assert account_store.get_order_by_client_order_id("cancel1") is None
+
+def test_open_and_closed_orders_indexed():
+	account_store = AccountStore(FakeClient(), max_closed_orders = 2)
+	for order_id in range(1, 5):
+		account_store.process_event(execution_report(order_id, "NEW", "NEW", 2000))
+	account_store.process_event(execution_report(5, "NEW", "NEW", 2000))
+	account_store.update_order(Order.from_rest(dict(rest_order(6), symbol = "ETHUSDT")))
+
+	assert sorted(order.order_id for order in account_store.get_open_orders(SYMBOL)) == [1, 2, 3, 4, 5]
+	assert len(account_store.get_open_orders()) == 6
+
+	for order_id in range(1, 4):
+		account_store.process_event(execution_report(order_id, "TRADE", "FILLED", 3000, "1"))
+
+	assert sorted(order.order_id for order in account_store.get_open_orders(SYMBOL)) == [4, 5]
+	# the oldest closed order is evicted
+	assert account_store.get_order(SYMBOL, 1) is None
+	assert account_store.get_order_by_client_order_id("c1") is None
+	assert list(account_store.closed_orders) == [(SYMBOL, 2), (SYMBOL, 3)]
+
+def test_balances_ordered_by_update_time():
+	account_store = AccountStore(FakeClient())
+	account_store.process_event({"e": "outboundAccountPosition", "E": 2000, "u": 2000, "B": [{"a": "BTC", "f": "0.9", "l": "0.6"}]})
+	account_store.update_balance(AssetBalance("BTC", 1.0, 0.5, 1000))
+
+	balance = account_store.get_balance("BTC")
+	assert (balance.free, balance.locked, balance.update_time) == (0.9, 0.6, 2000)
+
+def test_reconcile_fetches_orders_missing_on_exchange():
+	async def run():
+		client = FakeClient([rest_order(1), rest_order(2)], {2: rest_order(2, "FILLED", 5000, "1")})
+		account_store = AccountStore(client)
+		await account_store.reconcile()
+
+		assert sorted(order.order_id for order in account_store.get_open_orders()) == [1, 2]
+		assert account_store.get_balance("BTC").free == 1.0
+
+		# order 2 was filled while no events were received
+		client.open_orders = [rest_order(1)]
+		await account_store.reconcile()
+
+		assert ("get_order", SYMBOL, 2) in client.calls
+		assert account_store.get_order(SYMBOL, 2).status == "FILLED"
+		assert [order.order_id for order in account_store.get_open_orders()] == [1]
+
+	asyncio.run(run())
+
+def test_reconcile_keeps_newer_stream_state():
+	async def run():
+		account_store = AccountStore(FakeClient([rest_order(1)]))
+		account_store.process_event(execution_report(1, "TRADE", "PARTIALLY_FILLED", 2000, "0.5"))
+		account_store.process_event({"e": "outboundAccountPosition", "E": 2000, "u": 2000, "B": [{"a": "BTC", "f": "0.9", "l": "0.6"}]})
+		await account_store.reconcile()
+
+		assert account_store.get_order(SYMBOL, 1).executed_quantity == 0.5
+		assert account_store.get_balance("BTC").free == 0.9
+
+	asyncio.run(run())
+
+def test_shared_store_reconciled_until_last_user_closes():
+	async def run():
+		client = FakeClient()
+		account_store = AccountStore(client, reconciliation_interval_s = 60)
+		await account_store.initialize()
+		await account_store.initialize()
+
+		# seeded once
+		assert client.calls.count("get_account") == 1
+
+		account_store.request_reconciliation()
+		await asyncio.sleep(0.01)
+		assert client.calls.count("get_account") == 2
+
+		account_store.close()
+		assert account_store.reconciliation_task is not None
+
+		account_store.close()
+		assert account_store.reconciliation_task is None
+		assert not account_store.initialized
+
+	asyncio.run(run())
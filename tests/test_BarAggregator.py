@@ -0,0 +1,214 @@
+import asyncio
+import time
+
+import pytest
+
+from binance import enums
+from binance.BarAggregator import BarAggregator
+from binance.Pair import Pair
+from binance.subscriptions import AggregateTradeSubscription
+
+PAIR = Pair("BTC", "USDT")
+SYMBOL = str(PAIR)
+
+def values(bar):
+	return bar.open_time, bar.close_time, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.trade_count
+
+def test_trades_aggregated_into_aligned_bars():
+	closed = []
+	bar_aggregator = BarAggregator(60000, [closed.append])
+	bar_aggregator.add_trade(SYMBOL, 1, 60500, 10.0, 1.0)
+	bar_aggregator.add_trade(SYMBOL, 2, 70000, 12.0, 2.0, trade_count = 3)
+	bar_aggregator.add_trade(SYMBOL, 3, 119999, 9.0, 1.0)
+
+	assert closed == []
+	bar = bar_aggregator.get_bar(PAIR)
+	assert values(bar) == (60000, 119999, 10.0, 12.0, 9.0, 9.0, 4.0, 5)
+	assert bar.quote_volume == 10.0 + 24.0 + 9.0
+	assert bar.last_trade_id == 3
+
+	bar_aggregator.add_trade(SYMBOL, 4, 120000, 11.0, 1.0)
+
+	assert [values(bar) for bar in closed] == [(60000, 119999, 10.0, 12.0, 9.0, 9.0, 4.0, 5)]
+	assert values(bar_aggregator.get_bar(SYMBOL)) == (120000, 179999, 11.0, 11.0, 11.0, 11.0, 1.0, 1)
+
+def test_empty_intervals_produce_flat_bars():
+	closed = []
+	bar_aggregator = BarAggregator(60000, [closed.append])
+	bar_aggregator.add_trade(SYMBOL, 1, 0, 10.0, 1.0)
+	bar_aggregator.add_trade(SYMBOL, 2, 185000, 12.0, 1.0)
+
+	assert [values(bar) for bar in closed] == [
+		(0, 59999, 10.0, 10.0, 10.0, 10.0, 1.0, 1),
+		(60000, 119999, 10.0, 10.0, 10.0, 10.0, 0.0, 0),
+		(120000, 179999, 10.0, 10.0, 10.0, 10.0, 0.0, 0)
+	]
+	assert bar_aggregator.get_bar(SYMBOL).open_time == 180000
+
+def test_older_trades_ignored():
+	bar_aggregator = BarAggregator(60000)
+	bar_aggregator.add_trade(SYMBOL, 5, 60000, 10.0, 1.0)
+	bar_aggregator.add_trade(SYMBOL, 5, 60001, 20.0, 1.0)
+	bar_aggregator.add_trade(SYMBOL, 6, 59999, 20.0, 1.0)
+
+	assert values(bar_aggregator.get_bar(SYMBOL)) == (60000, 119999, 10.0, 10.0, 10.0, 10.0, 1.0, 1)
+
+def test_symbols_aggregated_independently():
+	bar_aggregator = BarAggregator(60000)
+	bar_aggregator.add_trade("AAA", 1, 0, 1.0, 1.0)
+	bar_aggregator.add_trade("BBB", 1, 0, 2.0, 1.0)
+
+	assert bar_aggregator.get_bar("AAA").close == 1.0
+	assert bar_aggregator.get_bar("BBB").close == 2.0
+	assert bar_aggregator.get_bar("CCC") is None
+
+def test_weekly_bars_start_on_monday():
+	bar_aggregator = BarAggregator.from_interval(enums.CandelstickInterval.I_1W)
+	# 2020-01-08 (Wednesday) -> 2020-01-06 (Monday)
+	assert bar_aggregator.get_open_time(1578441600000) == 1578268800000
+
+def test_monthly_interval_rejected():
+	with pytest.raises(ValueError):
+		BarAggregator.from_interval(enums.CandelstickInterval.I_1MONTH)
+
+class FakeClient(object):
+	def __init__(self, candlesticks, trades):
+		self.candlesticks = candlesticks
+		self.trades = trades
+
+	async def get_candelsticks(self, pair, limit, interval, start_tmstmp_ms, end_tmstmp_ms):
+		return {"response": [x for x in self.candlesticks if start_tmstmp_ms <= x[0] <= end_tmstmp_ms][:limit]}
+
+	async def get_aggregate_trades(self, pair, limit, start_tmstmp_ms = None, from_id = None):
+		return {"response": [x for x in self.trades if (start_tmstmp_ms is None or x["T"] >= start_tmstmp_ms) and
+		                                               (from_id is None or x["a"] >= from_id)][:limit]}
+
+def test_current_bar_seeded_from_rest():
+	async def run():
+		# 5 minute bar, the first live trade arrives in its third minute
+		candlesticks = [[0, "10", "15", "9", "11", "2", 59999, "20", 4], [60000, "11", "12", "8", "12", "1", 119999, "12", 2]]
+		trades = [{"a": 7, "p": "13", "q": "1", "f": 10, "l": 11, "T": 125000}, {"a": 8, "p": "14", "q": "1", "f": 12, "l": 12, "T": 126000}]
+		bar_aggregator = BarAggregator(300000, binance_client = FakeClient(candlesticks, trades))
+
+		# the first live trade is also returned by REST
+		bar_aggregator.add_trade(SYMBOL, 8, 126000, 14.0, 1.0)
+		bar_aggregator.add_trade(SYMBOL, 9, 127000, 7.0, 1.0)
+		assert bar_aggregator.get_bar(SYMBOL) is None
+
+		await asyncio.sleep(0.01)
+
+		bar = bar_aggregator.get_bar(SYMBOL)
+		assert values(bar) == (0, 299999, 10.0, 15.0, 7.0, 7.0, 6.0, 10)
+		assert bar.last_trade_id == 9
+		assert len(bar_aggregator.seed_tasks) == 0
+
+	asyncio.run(run())
+
+def test_bars_closed_by_timer():
+	async def run():
+		closed = []
+		bar_aggregator = BarAggregator(100, [closed.append], close_delay_ms = 20)
+		now_ms = int(time.time() * 1000)
+		bar_aggregator.add_trade(SYMBOL, 1, now_ms, 10.0, 1.0)
+		await asyncio.sleep(0.3)
+
+		assert len(closed) >= 2
+		assert (closed[0].volume, closed[0].trade_count) == (1.0, 1)
+		# no trade since
+		assert all((bar.open, bar.volume, bar.trade_count) == (10.0, 0.0, 0) for bar in closed[1:])
+
+		# the first trade of a bar opened by the timer sets its open price
+		bar_aggregator.add_trade(SYMBOL, 2, int(time.time() * 1000), 12.0, 1.0)
+		assert values(bar_aggregator.get_bar(SYMBOL))[2:] == (12.0, 12.0, 12.0, 12.0, 1.0, 1)
+
+		bar_aggregator.close()
+		assert bar_aggregator.close_task is None
+
+	asyncio.run(run())
+
+class SlowClient(FakeClient):
+	# client whose further pages of trades take a while
+	async def get_aggregate_trades(self, pair, limit, start_tmstmp_ms = None, from_id = None):
+		if from_id is not None:
+			await asyncio.sleep(0.3)
+		return await super().get_aggregate_trades(pair, limit, start_tmstmp_ms, from_id)
+
+def seed_slowly(monkeypatch, interval_ms, closed, offset_ms = 0):
+	monkeypatch.setattr(BarAggregator, "SEED_PAGE_SIZE", 1)
+	now_ms = int(time.time() * 1000)
+	bar_aggregator = BarAggregator(interval_ms, [closed.append], offset_ms, binance_client = SlowClient([], []), close_delay_ms = 20)
+	open_time = bar_aggregator.get_open_time(now_ms)
+	bar_aggregator.binance_client.trades = [{"a": 1, "p": "10", "q": "1", "f": 1, "l": 1, "T": open_time}]
+	bar_aggregator.add_trade(SYMBOL, 2, now_ms, 11.0, 1.0)
+
+	return bar_aggregator
+
+def test_timer_idle_while_seeding(monkeypatch):
+	async def run():
+		closed = []
+		bar_aggregator = seed_slowly(monkeypatch, 100, closed)
+		start = time.process_time()
+		await asyncio.sleep(0.25)
+
+		# the bar being seeded is past its close time
+		assert time.process_time() - start < 0.1
+		assert closed == []
+
+		await asyncio.sleep(0.15)
+		assert (closed[0].open, closed[0].close, closed[0].trade_count) == (10.0, 11.0, 2)
+
+		bar_aggregator.close()
+
+	asyncio.run(run())
+
+def test_timer_woken_up_by_first_bar(monkeypatch):
+	async def run():
+		closed = []
+		now_ms = int(time.time() * 1000)
+		# the bar closes shortly after it is seeded, long before an interval passes
+		bar_aggregator = seed_slowly(monkeypatch, 2000, closed, offset_ms = now_ms + 500)
+		await asyncio.sleep(0.7)
+
+		assert len(closed) == 1
+		assert closed[0].trade_count == 2
+
+		bar_aggregator.close()
+
+	asyncio.run(run())
+
+def test_failing_callback_keeps_timer():
+	async def run():
+		closed = []
+		def callback(bar):
+			closed.append(bar)
+			if len(closed) == 1:
+				raise ValueError("callback failed")
+
+		bar_aggregator = BarAggregator(100, [callback], close_delay_ms = 20)
+		bar_aggregator.add_trade(SYMBOL, 1, int(time.time() * 1000), 10.0, 1.0)
+		await asyncio.sleep(0.3)
+
+		assert len(closed) >= 2
+		assert not bar_aggregator.close_task.done()
+
+		bar_aggregator.close()
+
+	asyncio.run(run())
+
+def test_closing_subscription_releases_its_symbol():
+	async def run():
+		bar_aggregator = BarAggregator(60000, close_delay_ms = 1000)
+		subscriptions = [AggregateTradeSubscription(Pair(base, "USDT"), bar_aggregators = [bar_aggregator]) for base in ["AAA", "BBB"]]
+		for subscription in subscriptions:
+			await subscription.process_message({"e": "aggTrade", "E": 0, "s": str(subscription.pair), "a": 1, "p": "1",
+			                                    "q": "1", "f": 1, "l": 1, "T": int(time.time() * 1000), "m": True, "M": True})
+
+		subscriptions[0].close()
+		assert bar_aggregator.get_bar("AAAUSDT") is None
+		assert bar_aggregator.get_bar("BBBUSDT") is not None
+		assert bar_aggregator.close_task is not None
+
+		subscriptions[1].close()
+		assert bar_aggregator.close_task is None
+
+	asyncio.run(run())
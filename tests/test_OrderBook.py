@@ -0,0 +1,117 @@
+import asyncio
+
+from binance.OrderBook import OrderBook
+from binance.Pair import Pair
+from binance.dispatchers import SyncDispatcher
+from binance.subscriptions import DepthSubscription
+
+PAIR = Pair("ETH", "BTC")
+
+class FakeClient(object):
+	def __init__(self, snapshots):
+		self.snapshots = list(snapshots)
+		self.calls = 0
+
+	async def get_orderbook(self, pair, limit):
+		self.calls += 1
+		return {"response": self.snapshots.pop(0)}
+
+def snapshot(last_update_id, bids = None, asks = None):
+	return {"lastUpdateId": last_update_id, "bids": bids or [["1.0", "1"]], "asks": asks or [["2.0", "1"]]}
+
+def update(first_update_id, last_update_id, bids = None, asks = None):
+	return {"e": "depthUpdate", "s": str(PAIR), "U": first_update_id, "u": last_update_id, "b": bids or [], "a": asks or []}
+
+async def process(subscription, updates):
+	for depth_update in updates:
+		await subscription.process_message(depth_update)
+		# lets the snapshot task run
+		await asyncio.sleep(0)
+
+def test_levels_sorted_best_first():
+	order_book = OrderBook(PAIR)
+	order_book.set_snapshot({"lastUpdateId": 1, "bids": [["1.0", "1"], ["3.0", "2"], ["2.0", "3"]],
+	                         "asks": [["5.0", "1"], ["4.0", "2"], ["6.0", "3"]]})
+
+	assert order_book.get_best_bid() == (3.0, 2.0)
+	assert order_book.get_best_ask() == (4.0, 2.0)
+	assert order_book.get_bids() == [(3.0, 2.0), (2.0, 3.0), (1.0, 1.0)]
+	assert order_book.get_asks(2) == [(4.0, 2.0), (5.0, 1.0)]
+	assert order_book.get_spread() == 1.0
+
+def test_depth_limits_levels():
+	order_book = OrderBook(PAIR)
+	order_book.set_snapshot(snapshot(1, bids = [["1.0", "1"], ["2.0", "1"]], asks = [["3.0", "1"], ["4.0", "1"]]))
+
+	assert order_book.get_bids(0) == []
+	assert order_book.get_asks(0) == []
+	assert order_book.get_bids(1) == [(2.0, 1.0)]
+	assert order_book.get_asks(1) == [(3.0, 1.0)]
+	# deeper than the book
+	assert order_book.get_bids(5) == [(2.0, 1.0), (1.0, 1.0)]
+
+def test_zero_quantity_removes_level():
+	order_book = OrderBook(PAIR)
+	order_book.set_snapshot(snapshot(1, bids = [["1.0", "1"], ["2.0", "1"]]))
+	order_book.apply_update(update(2, 2, bids = [["2.0", "0"], ["0.5", "0"], ["1.0", "4"]]))
+
+	assert order_book.get_bids() == [(1.0, 4.0)]
+	assert order_book.last_update_id == 2
+
+def test_updates_buffered_until_snapshot():
+	async def run():
+		client = FakeClient([snapshot(10)])
+		books = []
+		subscription = DepthSubscription(PAIR, client, callbacks = [lambda x: books.append(x.last_update_id)], dispatcher = SyncDispatcher())
+
+		# the first update is reflected in the snapshot, the second one straddles it
+		await subscription.process_message(update(5, 8, bids = [["1.5", "1"]]))
+		await subscription.process_message(update(9, 12, bids = [["1.6", "1"]]))
+		await asyncio.sleep(0)
+		await process(subscription, [update(13, 13, asks = [["1.9", "1"]])])
+
+		assert client.calls == 1
+		assert subscription.synchronized
+		assert books == [12, 13]
+		assert subscription.order_book.get_best_bid() == (1.6, 1.0)
+		assert subscription.order_book.get_best_ask() == (1.9, 1.0)
+
+	asyncio.run(run())
+
+def test_stale_updates_ignored():
+	async def run():
+		subscription = DepthSubscription(PAIR, FakeClient([snapshot(10)]), dispatcher = SyncDispatcher())
+		await process(subscription, [update(11, 11), update(12, 12, bids = [["1.5", "1"]]), update(11, 12, bids = [["1.7", "1"]])])
+
+		assert subscription.order_book.last_update_id == 12
+		assert subscription.order_book.get_best_bid() == (1.5, 1.0)
+
+	asyncio.run(run())
+
+def test_gap_triggers_resynchronization():
+	async def run():
+		client = FakeClient([snapshot(10), snapshot(20, bids = [["3.0", "1"]])])
+		subscription = DepthSubscription(PAIR, client, dispatcher = SyncDispatcher())
+		# updates up to the new snapshot are dropped
+		await process(subscription, [update(11, 11), update(15, 16), update(21, 21)])
+
+		assert client.calls == 2
+		assert subscription.synchronized
+		assert subscription.order_book.last_update_id == 21
+		assert subscription.order_book.get_best_bid() == (3.0, 1.0)
+
+	asyncio.run(run())
+
+def test_snapshot_not_connecting_is_retried():
+	async def run():
+		# the first snapshot is older than the first buffered update
+		client = FakeClient([snapshot(3), snapshot(12)])
+		subscription = DepthSubscription(PAIR, client, dispatcher = SyncDispatcher())
+		await process(subscription, [update(10, 12), update(13, 13)])
+		await asyncio.sleep(0)
+
+		assert client.calls == 2
+		assert subscription.synchronized
+		assert subscription.order_book.last_update_id == 13
+
+	asyncio.run(run())
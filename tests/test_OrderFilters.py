@@ -0,0 +1,93 @@
+import pytest
+
+from binance import enums
+from binance.BinanceException import OrderValidationException
+from binance.OrderFilters import OrderFilters, format_fixed_point, parse_fixed_point
+from binance.Pair import Pair
+from binance.SymbolInfo import SymbolInfoIndex
+
+PAIR = Pair("BNB", "BTC")
+
+EXCHANGE_INFO = {
+	"symbols": [{
+		"symbol": "BNBBTC",
+		"status": "TRADING",
+		"baseAsset": "BNB",
+		"quoteAsset": "BTC",
+		"filters": [
+			{"filterType": "PRICE_FILTER", "minPrice": "0.00000100", "maxPrice": "100.00000000", "tickSize": "0.00000100"},
+			{"filterType": "LOT_SIZE", "minQty": "0.01000000", "maxQty": "9000.00000000", "stepSize": "0.01000000"},
+			{"filterType": "MARKET_LOT_SIZE", "minQty": "0.10000000", "maxQty": "1000.00000000", "stepSize": "0.10000000"},
+			{"filterType": "MIN_NOTIONAL", "minNotional": "0.00010000"}
+		]
+	}]
+}
+
+@pytest.fixture
+def order_filters():
+	return OrderFilters(SymbolInfoIndex(EXCHANGE_INFO))
+
+@pytest.mark.parametrize("price, round_up, expected", [
+	("0.0012345", False, "0.001234"),
+	("0.0012345", True, "0.001235"),
+	("0.001234", False, "0.001234"),
+	("0.001234", True, "0.001234"),
+	(0.00123499, False, "0.001234"),
+	("12.34567891", False, "12.345678")
+])
+def test_round_price_to_tick_size(order_filters, price, round_up, expected):
+	assert order_filters.round_price(PAIR, price, round_up) == expected
+
+@pytest.mark.parametrize("quantity, market, round_up, expected", [
+	("1.239", False, False, "1.23"),
+	("1.231", False, True, "1.24"),
+	("1.239", True, False, "1.2"),
+	("1.201", True, True, "1.3"),
+	("5", False, False, "5")
+])
+def test_round_quantity_to_step_size(order_filters, quantity, market, round_up, expected):
+	assert order_filters.round_quantity(PAIR, quantity, market, round_up) == expected
+
+def test_rounding_exact_for_float_noise(order_filters):
+	# 0.1 + 0.2 == 0.30000000000000004 as a float
+	assert order_filters.round_quantity(PAIR, 0.1 + 0.2) == "0.3"
+	assert order_filters.round_price(PAIR, 0.000003 * 3) == "0.000009"
+
+def test_rounded_values_pass_validation(order_filters):
+	price = order_filters.round_price(PAIR, "0.00123456")
+	quantity = order_filters.round_quantity(PAIR, "3.14159")
+
+	order_filters.validate_order(PAIR, enums.OrderType.LIMIT, quantity, price)
+
+@pytest.mark.parametrize("quantity, price", [
+	("1.001", "0.001"),
+	("1", "0.0010001"),
+	("0.001", "0.001"),
+	("10000", "0.001"),
+	("0.01", "0.001"),
+	("1", "0.000001234567891"),
+	("1", "abc")
+])
+def test_invalid_orders_rejected(order_filters, quantity, price):
+	with pytest.raises(OrderValidationException):
+		order_filters.validate_order(PAIR, enums.OrderType.LIMIT, quantity, price)
+
+def test_market_lot_size_checked_for_market_orders(order_filters):
+	order_filters.validate_order(PAIR, enums.OrderType.LIMIT, "0.05", "0.01")
+
+	with pytest.raises(OrderValidationException):
+		order_filters.validate_order(PAIR, enums.OrderType.MARKET, "0.05")
+
+def test_unknown_symbols(order_filters):
+	# not validated, but cannot be rounded
+	order_filters.validate_order(Pair("XYZ", "BTC"), enums.OrderType.LIMIT, "0.123456789", "1")
+
+	with pytest.raises(OrderValidationException):
+		order_filters.round_price(Pair("XYZ", "BTC"), "1")
+
+def test_fixed_point_round_trip():
+	assert parse_fixed_point("0.00000001", "price") == 1
+	assert parse_fixed_point("12.50000000", "price") == 1250000000
+	assert format_fixed_point(1250000000) == "12.5"
+	assert format_fixed_point(100000000) == "1"
+	assert format_fixed_point(-1) == "-0.00000001"
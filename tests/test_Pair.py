@@ -0,0 +1,51 @@
+import pickle
+
+import pytest
+
+from binance.Pair import Pair
+
+def test_pairs_interned():
+	pair = Pair("PAIRA", "USDT")
+
+	assert Pair("PAIRA", "USDT") is pair
+	assert pair == Pair("PAIRA", "USDT")
+	assert pair != Pair("PAIRB", "USDT")
+	assert len({pair, Pair("PAIRA", "USDT")}) == 1
+	assert str(pair) == "PAIRAUSDT"
+
+def test_pairs_immutable():
+	pair = Pair("PAIRC", "USDT")
+
+	with pytest.raises(AttributeError):
+		pair.base = "PAIRD"
+	with pytest.raises(AttributeError):
+		del pair.quote
+	with pytest.raises(AttributeError):
+		pair.other = 1
+
+	assert (pair.base, pair.quote, pair.symbol) == ("PAIRC", "USDT", "PAIRCUSDT")
+
+def test_conflicting_split_rejected():
+	pair = Pair("PAIRE", "BTC")
+
+	with pytest.raises(ValueError):
+		Pair("PAIR", "EBTC")
+
+	assert Pair.from_symbol("PAIREBTC") is pair
+
+def test_from_symbol():
+	assert Pair.from_symbol("PAIRFUSDT") is None
+
+	pair = Pair("PAIRF", "USDT")
+	assert Pair.from_symbol("PAIRFUSDT") is pair
+
+def test_exchange_info_registered():
+	Pair.register_exchange_info({"symbols": [{"symbol": "PAIRGBNB", "baseAsset": "PAIRG", "quoteAsset": "BNB"}]})
+
+	assert Pair.from_symbol("PAIRGBNB") is Pair("PAIRG", "BNB")
+
+def test_unpickled_pairs_interned():
+	pair = Pair("PAIRH", "USDT")
+
+	assert pickle.loads(pickle.dumps(pair)) is pair
+	assert pickle.loads(pickle.dumps([pair, pair]))[1] is pair
@@ -0,0 +1,107 @@
+import asyncio
+
+from binance import enums
+from binance.RateLimiter import RateLimiter
+
+def test_within_budget_proceeds_immediately():
+	async def run():
+		rate_limiter = RateLimiter(weight_limit = 10, weight_interval_s = 60)
+		for _ in range(10):
+			await asyncio.wait_for(rate_limiter.acquire(), 0.1)
+
+		assert rate_limiter.weight_bucket.inflight == 10
+		assert rate_limiter.weight_bucket.tokens < 1
+
+	asyncio.run(run())
+
+def test_exhausted_budget_waits_for_refill():
+	async def run():
+		rate_limiter = RateLimiter(weight_limit = 10, weight_interval_s = 1)
+		await rate_limiter.acquire(10)
+
+		loop = asyncio.get_running_loop()
+		start = loop.time()
+		await rate_limiter.acquire(5)
+
+		# 5 of 10 tokens per second
+		assert 0.4 <= loop.time() - start < 1.0
+
+	asyncio.run(run())
+
+def test_waiters_released_by_priority_then_fifo():
+	async def run():
+		rate_limiter = RateLimiter(weight_limit = 10, weight_interval_s = 0.1)
+		await rate_limiter.acquire(10)
+
+		released = []
+		async def acquire(name, priority):
+			await rate_limiter.acquire(10, priority = priority)
+			released.append(name)
+
+		tasks = [asyncio.create_task(acquire("low", enums.RequestPriority.LOW)),
+		         asyncio.create_task(acquire("normal1", enums.RequestPriority.NORMAL)),
+		         asyncio.create_task(acquire("high", enums.RequestPriority.HIGH)),
+		         asyncio.create_task(acquire("normal2", enums.RequestPriority.NORMAL))]
+		await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+		assert released == ["high", "normal1", "normal2", "low"]
+
+	asyncio.run(run())
+
+def test_order_count_limited_separately():
+	async def run():
+		rate_limiter = RateLimiter(weight_limit = 1000, order_limit = 2, order_interval_s = 60)
+		await rate_limiter.acquire(1, order_count = 1)
+		await rate_limiter.acquire(1, order_count = 1)
+
+		# plain requests are not held up by the order count
+		await asyncio.wait_for(rate_limiter.acquire(1), 0.1)
+
+		order = asyncio.create_task(rate_limiter.acquire(1, order_count = 1))
+		await asyncio.sleep(0.05)
+		assert not order.done()
+		order.cancel()
+
+	asyncio.run(run())
+
+def test_headers_correct_budget():
+	async def run():
+		rate_limiter = RateLimiter(weight_limit = 100, weight_interval_s = 60)
+		await rate_limiter.acquire(1)
+		await rate_limiter.acquire(1)
+
+		# the server counted other clients of the same IP too, one of the two requests is still in flight
+		rate_limiter.release(1, headers = {"X-MBX-USED-WEIGHT-1M": "90"})
+
+		assert rate_limiter.weight_bucket.inflight == 1
+		assert 8.9 < rate_limiter.weight_bucket.tokens <= 9.1
+
+	asyncio.run(run())
+
+def test_block_holds_all_requests():
+	async def run():
+		rate_limiter = RateLimiter()
+		rate_limiter.block(0.2)
+
+		loop = asyncio.get_running_loop()
+		start = loop.time()
+		await rate_limiter.acquire(priority = enums.RequestPriority.HIGH)
+
+		assert loop.time() - start >= 0.19
+
+	asyncio.run(run())
+
+def test_cancelled_waiter_releases_granted_budget():
+	async def run():
+		rate_limiter = RateLimiter(weight_limit = 10, weight_interval_s = 60)
+		await rate_limiter.acquire(10)
+
+		waiter = asyncio.create_task(rate_limiter.acquire(5))
+		await asyncio.sleep(0)
+		waiter.cancel()
+		await asyncio.gather(waiter, return_exceptions = True)
+
+		assert len(rate_limiter.waiters) == 0 or rate_limiter.waiters[0][4].done()
+		assert rate_limiter.weight_bucket.inflight == 10
+
+	asyncio.run(run())
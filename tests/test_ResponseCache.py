@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from binance.ResponseCache import ResponseCache
+
+class Fetcher(object):
+	def __init__(self, delay_s : float = 0.01, error : Exception = None) -> None:
+		self.delay_s = delay_s
+		self.error = error
+		self.calls = 0
+
+	async def __call__(self) -> dict:
+		self.calls += 1
+		await asyncio.sleep(self.delay_s)
+		if self.error is not None:
+			raise self.error
+
+		return {"response": self.calls}
+
+def test_concurrent_requests_coalesced():
+	async def run():
+		cache = ResponseCache()
+		fetch = Fetcher()
+		responses = await asyncio.gather(*[cache.get("exchangeInfo", None, fetch) for _ in range(5)])
+
+		assert fetch.calls == 1
+		assert all(response is responses[0] for response in responses)
+		assert len(cache.inflight) == 0
+
+	asyncio.run(run())
+
+def test_responses_expire():
+	async def run():
+		cache = ResponseCache({"ticker/price": 0.05})
+		fetch = Fetcher(0)
+
+		assert await cache.get("ticker/price", {"symbol": "BTCUSDT"}, fetch) == {"response": 1}
+		assert await cache.get("ticker/price", {"symbol": "BTCUSDT"}, fetch) == {"response": 1}
+
+		await asyncio.sleep(0.06)
+		assert await cache.get("ticker/price", {"symbol": "BTCUSDT"}, fetch) == {"response": 2}
+
+	asyncio.run(run())
+
+def test_requests_keyed_by_params():
+	async def run():
+		cache = ResponseCache()
+		fetch = Fetcher(0)
+		await cache.get("ticker/price", {"symbol": "BTCUSDT"}, fetch)
+		await cache.get("ticker/price", {"symbol": "ETHBTC"}, fetch)
+		await cache.get("ticker/price", None, fetch)
+
+		assert fetch.calls == 3
+
+		cache.invalidate("ticker/price")
+		await cache.get("ticker/price", {"symbol": "BTCUSDT"}, fetch)
+
+		assert fetch.calls == 4
+
+	asyncio.run(run())
+
+def test_errors_shared_and_not_cached():
+	async def run():
+		cache = ResponseCache()
+		fetch = Fetcher(error = ValueError("failed"))
+		results = await asyncio.gather(*[cache.get("exchangeInfo", None, fetch) for _ in range(3)], return_exceptions = True)
+
+		assert fetch.calls == 1
+		assert all(isinstance(result, ValueError) for result in results)
+
+		fetch.error = None
+		assert await cache.get("exchangeInfo", None, fetch) == {"response": 2}
+
+	asyncio.run(run())
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+	async def run():
+		cache = ResponseCache()
+		fetch = Fetcher(0.05)
+		first = asyncio.create_task(cache.get("exchangeInfo", None, fetch))
+		second = asyncio.create_task(cache.get("exchangeInfo", None, fetch))
+		await asyncio.sleep(0.01)
+		first.cancel()
+
+		assert await second == {"response": 1}
+		with pytest.raises(asyncio.CancelledError):
+			await first
+
+	asyncio.run(run())
+
+def test_only_configured_endpoints_cached():
+	cache = ResponseCache({"depth": 1})
+
+	assert cache.is_cached("exchangeInfo")
+	assert cache.is_cached("depth")
+	assert not cache.is_cached("account")
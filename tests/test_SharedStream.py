@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+import ssl
+
+import pytest
+
+from binance.BinanceClient import BinanceClient
+from binance.Pair import Pair
+from binance.dispatchers import SyncDispatcher
+from binance.subscriptions import SharedStream, TradeSubscription
+
+PAIR = Pair("ETH", "BTC")
+CHANNEL = "ethbtc@trade"
+
+class RecordingSubscription(TradeSubscription):
+	def __init__(self, pair : Pair = PAIR, raw_data : bool = False, delay_s : float = 0, error : Exception = None) -> None:
+		super().__init__(pair, callbacks = [lambda trade: self.trade_ids.append(trade["t"])], dispatcher = SyncDispatcher())
+
+		self.RAW_DATA = raw_data
+		self.delay_s = delay_s
+		self.error = error
+		self.trade_ids = []
+		self.messages = []
+
+	async def initialize(self) -> None:
+		await asyncio.sleep(self.delay_s)
+		if self.error is not None:
+			raise self.error
+
+	async def process_message(self, response : dict) -> None:
+		self.messages.append(response)
+		await super().process_message(response)
+
+	async def process_raw_data(self, data : str) -> None:
+		self.messages.append(data)
+
+def create_client():
+	cafile = ssl.get_default_verify_paths().cafile
+	if cafile is None or not os.path.exists(cafile):
+		pytest.skip("No CA certificates available.")
+
+	client = BinanceClient(cafile)
+	# the local server is not encrypted
+	client.ssl_context = None
+
+	return client
+
+async def stop_client(client, task, server):
+	task.cancel()
+	for subscription_mgr_task in client.subscription_mgr_tasks.values():
+		subscription_mgr_task.cancel()
+	await asyncio.gather(task, *client.subscription_mgr_tasks.values(), return_exceptions = True)
+	await server.stop()
+
+def test_messages_decoded_once_for_active_consumers():
+	async def run():
+		shared_stream = SharedStream(CHANNEL)
+		consumers = [RecordingSubscription(), RecordingSubscription(), RecordingSubscription(raw_data = True),
+		             RecordingSubscription(), RecordingSubscription()]
+		for consumer in consumers[:4]:
+			shared_stream.add_consumer(consumer)
+		await shared_stream.initialize()
+
+		consumers[3].pause()
+		# not initialized yet
+		shared_stream.add_consumer(consumers[4])
+
+		assert shared_stream.RAW_DATA
+		await shared_stream.process_raw_data('{"t":1}')
+
+		assert consumers[0].messages == [{"t": 1}]
+		assert consumers[1].messages[0] is consumers[0].messages[0]
+		assert consumers[2].messages == ['{"t":1}']
+		assert consumers[3].messages == []
+		assert consumers[4].messages == []
+
+	asyncio.run(run())
+
+def test_consumers_added_during_initialization_activated():
+	async def run():
+		shared_stream = SharedStream(CHANNEL)
+		shared_stream.add_consumer(RecordingSubscription(delay_s = 0.02))
+		initialization = asyncio.create_task(shared_stream.initialize())
+		await asyncio.sleep(0.01)
+		late_consumer = RecordingSubscription()
+		shared_stream.add_consumer(late_consumer)
+		await initialization
+
+		assert shared_stream.initialized
+		assert len(shared_stream.active_consumers) == 2
+		assert shared_stream.active_consumers[1] is late_consumer
+
+	asyncio.run(run())
+
+def test_stream_state_shared_with_consumers():
+	shared_stream = SharedStream(CHANNEL)
+	consumers = [RecordingSubscription(), RecordingSubscription()]
+	shared_stream.add_consumer(consumers[0])
+
+	subscription_mgr = object()
+	shared_stream.subscription_mgr = subscription_mgr
+	shared_stream.add_consumer(consumers[1])
+
+	assert all(consumer.subscription_mgr is subscription_mgr for consumer in consumers)
+
+	shared_stream.remove_consumer(consumers[0])
+	assert consumers[0].subscription_mgr is None
+	assert shared_stream.consumers == (consumers[1],)
+
+	shared_stream.pause()
+	assert consumers[1].paused
+	shared_stream.resume()
+	assert not consumers[1].paused
+
+def test_channel_shared_across_subscription_sets(fake_server):
+	async def run():
+		server = await fake_server()
+		client = create_client()
+		consumers = [RecordingSubscription(), RecordingSubscription(), RecordingSubscription()]
+		client.compose_subscriptions([consumers[0], RecordingSubscription(Pair("LTC", "BTC"))])
+		client.compose_subscriptions([consumers[1]])
+		task = asyncio.create_task(client.start_subscriptions())
+		await asyncio.sleep(0.1)
+
+		# the second set has no channel of its own
+		assert server.connection_count == 1
+		assert server.requests == [("SUBSCRIBE", [CHANNEL, "ltcbtc@trade"])]
+		assert len(consumers[0].trade_ids) > 0
+		assert consumers[1].trade_ids == consumers[0].trade_ids
+		server.requests.clear()
+
+		# joins the running stream
+		await asyncio.wait_for(client.add_subscriptions([consumers[2]]), 1)
+		await asyncio.sleep(0.05)
+
+		assert server.requests == []
+		assert len(consumers[2].trade_ids) > 0
+		assert consumers[2].subscription_mgr is consumers[0].subscription_mgr
+
+		await client.remove_subscriptions([consumers[0], consumers[1]])
+		received = len(consumers[0].trade_ids)
+		await asyncio.sleep(0.05)
+
+		assert server.requests == []
+		assert len(consumers[0].trade_ids) == received
+		assert consumers[2].trade_ids[-1] > consumers[0].trade_ids[-1]
+
+		await client.remove_subscriptions([consumers[2]])
+
+		assert server.requests == [("UNSUBSCRIBE", [CHANNEL])]
+		assert CHANNEL not in client.shared_streams
+
+		await stop_client(client, task, server)
+
+	asyncio.run(run())
+
+def test_failing_subscriptions_composed_after_start(fake_server, caplog):
+	async def run():
+		server = await fake_server()
+		client = create_client()
+		consumer = RecordingSubscription()
+		client.compose_subscriptions([consumer])
+		task = asyncio.create_task(client.start_subscriptions())
+		await asyncio.sleep(0.1)
+
+		# joining a running stream
+		with pytest.raises(ValueError):
+			await asyncio.wait_for(client.add_subscriptions([RecordingSubscription(error = ValueError("failed"))]), 1)
+
+		# a new channel
+		with pytest.raises(ValueError):
+			await asyncio.wait_for(client.add_subscriptions([RecordingSubscription(Pair("XRP", "BTC"), error = ValueError("failed"))]), 1)
+		assert "xrpbtc@trade" not in client.shared_streams
+
+		# errors of compositions nobody waits for are logged
+		with caplog.at_level(logging.ERROR):
+			client.compose_subscriptions([RecordingSubscription(Pair("ADA", "BTC"), error = ValueError("failed"))])
+			await asyncio.sleep(0.2)
+		assert any("could not be started" in record.getMessage() for record in caplog.records)
+
+		received = len(consumer.trade_ids)
+		await asyncio.sleep(0.05)
+		assert len(consumer.trade_ids) > received
+		assert len(consumer.subscription_mgr.subscriptions) == 1
+
+		await stop_client(client, task, server)
+
+	asyncio.run(run())
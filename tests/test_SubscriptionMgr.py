@@ -0,0 +1,230 @@
+import asyncio
+
+import pytest
+
+from binance.BinanceException import BinanceException
+from binance.Pair import Pair
+from binance.dispatchers import SyncDispatcher
+from binance.subscriptions import AccountSubscription, SubscriptionMgr, TradeSubscription
+
+PAIR = Pair("ETH", "BTC")
+CHANNEL = "ethbtc@trade"
+
+class FakeClient(object):
+	def __init__(self, failing_calls = ()) -> None:
+		# numbers of get_listen_key calls which fail
+		self.failing_calls = failing_calls
+		self.listen_key_calls = 0
+		self.closed_listen_keys = []
+
+	async def get_listen_key(self) -> dict:
+		self.listen_key_calls += 1
+		if self.listen_key_calls in self.failing_calls:
+			raise BinanceException("listen key not available")
+
+		return {"response": {"listenKey": f"key{self.listen_key_calls}"}}
+
+	async def keep_alive_listen_key(self, listen_key : str) -> dict:
+		return {"response": {}}
+
+	async def close_listen_key(self, listen_key : str) -> dict:
+		self.closed_listen_keys.append(listen_key)
+		return {"response": {}}
+
+def create_trade_subscription(trade_ids):
+	return TradeSubscription(PAIR, callbacks = [lambda trade: trade_ids.append(trade["t"])], dispatcher = SyncDispatcher())
+
+def assert_contiguous(trade_ids):
+	assert len(trade_ids) > 0
+	assert trade_ids == list(range(trade_ids[0], trade_ids[0] + len(trade_ids)))
+
+def test_rotation_delivers_each_message_once(fake_server):
+	async def run():
+		server = await fake_server()
+		trade_ids = []
+		subscription_mgr = SubscriptionMgr([create_trade_subscription(trade_ids)], None, rotation_overlap_s = 0.05)
+		task = asyncio.create_task(subscription_mgr.run())
+
+		await asyncio.sleep(0.1)
+		for _ in range(5):
+			subscription_mgr.request_rotation()
+			await asyncio.sleep(0.15)
+
+		task.cancel()
+		await asyncio.gather(task, return_exceptions = True)
+		await server.stop()
+
+		assert server.connection_count == 6
+		assert_contiguous(trade_ids)
+
+	asyncio.run(run())
+
+def test_failed_rotation_keeps_connection(fake_server):
+	async def run():
+		server = await fake_server()
+		trade_ids = []
+		# the listen key of the first rotation is not available
+		client = FakeClient(failing_calls = [2])
+		account_subscription = AccountSubscription(client, dispatcher = SyncDispatcher())
+		subscription_mgr = SubscriptionMgr([create_trade_subscription(trade_ids), account_subscription], None,
+		                                   rotation_overlap_s = 0.05, rotation_retry_delay_s = 0.1)
+		task = asyncio.create_task(subscription_mgr.run())
+
+		await asyncio.sleep(0.1)
+		subscription_mgr.request_rotation()
+		await asyncio.sleep(0.05)
+
+		assert not task.done()
+		assert server.connection_count == 1
+
+		# retried
+		await asyncio.sleep(0.2)
+
+		task.cancel()
+		await asyncio.gather(task, return_exceptions = True)
+		await server.stop()
+
+		assert server.connection_count == 2
+		assert account_subscription.listen_key == "key3"
+		# the listen key of the old connection is released
+		assert client.closed_listen_keys == ["key1"]
+		assert_contiguous(trade_ids)
+
+	asyncio.run(run())
+
+class SlowSubscription(TradeSubscription):
+	# trade subscription whose initialization takes a while and optionally fails
+	def __init__(self, pair : Pair, trade_ids : list, delay_s : float = 0.05, error : Exception = None) -> None:
+		super().__init__(pair, callbacks = [lambda trade: trade_ids.append(trade["t"])], dispatcher = SyncDispatcher())
+
+		self.delay_s = delay_s
+		self.error = error
+		self.closed = False
+
+	async def initialize(self) -> None:
+		await asyncio.sleep(self.delay_s)
+		if self.error is not None:
+			raise self.error
+
+	def close(self) -> None:
+		self.closed = True
+		super().close()
+
+async def start_subscription_mgr(subscriptions):
+	subscription_mgr = SubscriptionMgr(subscriptions, None)
+	task = asyncio.create_task(subscription_mgr.run())
+	while subscription_mgr.websocket is None:
+		await asyncio.sleep(0.01)
+
+	return subscription_mgr, task
+
+async def stop_subscription_mgr(task, server):
+	task.cancel()
+	await asyncio.gather(task, return_exceptions = True)
+	await server.stop()
+
+def test_subscriptions_added_and_removed_live(fake_server):
+	async def run():
+		server = await fake_server()
+		trade_ids = []
+		subscription_mgr, task = await start_subscription_mgr([TradeSubscription(Pair("LTC", "BTC"))])
+		subscription = create_trade_subscription(trade_ids)
+
+		await asyncio.wait_for(subscription_mgr.add_subscriptions([subscription]), 1)
+		await asyncio.sleep(0.05)
+
+		assert ("SUBSCRIBE", [CHANNEL]) in server.requests
+		assert len(trade_ids) > 0
+
+		await asyncio.wait_for(subscription_mgr.remove_subscriptions([subscription]), 1)
+		received = len(trade_ids)
+		await asyncio.sleep(0.05)
+
+		assert ("UNSUBSCRIBE", [CHANNEL]) in server.requests
+		assert len(trade_ids) == received
+		assert subscription.subscription_mgr is None
+		# still connected
+		assert server.connection_count == 1
+		assert not task.done()
+
+		await stop_subscription_mgr(task, server)
+
+	asyncio.run(run())
+
+def test_subscription_removed_while_initializing(fake_server):
+	async def run():
+		server = await fake_server()
+		trade_ids = []
+		subscription_mgr, task = await start_subscription_mgr([TradeSubscription(Pair("LTC", "BTC"))])
+		subscription = SlowSubscription(PAIR, trade_ids)
+
+		added = subscription_mgr.add_subscriptions([subscription])
+		# the batch is being initialized
+		await asyncio.sleep(subscription_mgr.change_batch_delay_s + 0.01)
+		removed = subscription_mgr.remove_subscriptions([subscription])
+		await asyncio.wait_for(asyncio.gather(added, removed), 1)
+		await asyncio.sleep(0.05)
+
+		assert CHANNEL not in subscription_mgr.subscriptions_by_channel
+		assert all(CHANNEL not in params for _, params in server.requests)
+		assert trade_ids == []
+		assert subscription.closed
+
+		await stop_subscription_mgr(task, server)
+
+	asyncio.run(run())
+
+def test_failing_subscription_removed_while_initializing(fake_server):
+	async def run():
+		server = await fake_server()
+		subscription_mgr, task = await start_subscription_mgr([TradeSubscription(Pair("LTC", "BTC"))])
+		subscription = SlowSubscription(PAIR, [], error = ValueError("initialization failed"))
+
+		added = subscription_mgr.add_subscriptions([subscription])
+		await asyncio.sleep(subscription_mgr.change_batch_delay_s + 0.01)
+		subscription_mgr.remove_subscriptions([subscription])
+
+		# the failure of a removed subscription is not reported
+		await asyncio.wait_for(added, 1)
+		assert not task.done()
+
+		await stop_subscription_mgr(task, server)
+
+	asyncio.run(run())
+
+def test_failing_initialization_fails_change(fake_server):
+	async def run():
+		server = await fake_server()
+		trade_ids = []
+		subscription_mgr, task = await start_subscription_mgr([TradeSubscription(Pair("LTC", "BTC"))])
+		failing_subscription = SlowSubscription(Pair("XRP", "BTC"), [], error = ValueError("initialization failed"))
+		subscription = SlowSubscription(PAIR, trade_ids)
+
+		with pytest.raises(ValueError):
+			await asyncio.wait_for(subscription_mgr.add_subscriptions([failing_subscription, subscription]), 1)
+		await asyncio.sleep(0.05)
+
+		# the other subscriptions of the batch are subscribed
+		assert failing_subscription not in subscription_mgr.subscriptions
+		assert failing_subscription.closed
+		assert len(trade_ids) > 0
+		assert not task.done()
+
+		await stop_subscription_mgr(task, server)
+
+	asyncio.run(run())
+
+def test_rejected_request_fails_change(fake_server):
+	async def run():
+		server = await fake_server(rejected_channels = [CHANNEL])
+		subscription_mgr, task = await start_subscription_mgr([TradeSubscription(Pair("LTC", "BTC"))])
+
+		with pytest.raises(BinanceException):
+			await asyncio.wait_for(subscription_mgr.add_subscriptions([create_trade_subscription([])]), 1)
+
+		assert len(subscription_mgr.pending_confirmations) == 0
+		assert not task.done()
+
+		await stop_subscription_mgr(task, server)
+
+	asyncio.run(run())
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from binance import columnar
+
+KLINES = [
+	[1499040000000, "0.01634790", "0.80000000", "0.01575800", "0.01577100", "148976.11427815", 1499644799999,
+	 "2434.19055334", 308, "1756.87402397", "28.46694368", "0"],
+	[1499644800000, "0.01577100", "0.01600000", "0.01500000", "0.01590000", "10.5", 1500249599999,
+	 "0.16", 2, "1.25", "0.02", "0"]
+]
+
+AGGREGATE_TRADES = [
+	{"a": 26129, "p": "0.01633102", "q": "4.70443515", "f": 27781, "l": 27781, "T": 1498793709153, "m": True, "M": True},
+	{"a": 26130, "p": "0.01633103", "q": "1.5", "f": 27782, "l": 27790, "T": 1498793709160, "m": False, "M": True}
+]
+
+TRADES = [
+	{"id": 28457, "price": "4.00000100", "qty": "12.00000000", "quoteQty": "48.000012", "time": 1499865549590,
+	 "isBuyerMaker": True, "isBestMatch": True},
+	{"id": 28458, "price": "4.1", "qty": "1", "quoteQty": "4.1", "time": 1499865549600, "isBuyerMaker": False,
+	 "isBestMatch": False}
+]
+
+def encode(rows):
+	return json.dumps(rows, separators = (',', ':')).encode()
+
+def test_klines_decoded_by_position():
+	res = columnar.KLINE_LAYOUT.decode(encode(KLINES))
+
+	assert len(res) == 2
+	assert res["open_time"].tolist() == [1499040000000, 1499644800000]
+	assert res["close_time"].dtype == numpy.int64
+	assert res["open"][0] == 0.0163479
+	assert res["volume"][1] == 10.5
+	assert res["trade_count"].tolist() == [308, 2]
+	assert res["taker_buy_quote_volume"][0] == 28.46694368
+
+def test_aggregate_trades_decoded_by_key():
+	res = columnar.AGGREGATE_TRADE_LAYOUT.decode(encode(AGGREGATE_TRADES))
+
+	assert res["agg_trade_id"].tolist() == [26129, 26130]
+	assert res["price"][1] == 0.01633103
+	assert res["last_trade_id"].tolist() == [27781, 27790]
+	assert res["time"][0] == 1498793709153
+	assert res["is_buyer_maker"].tolist() == [True, False]
+	assert res["is_best_match"].tolist() == [True, True]
+
+def test_key_order_taken_from_response():
+	# the decoded columns do not depend on the order of the keys within the rows
+	trades = [dict(reversed(list(trade.items()))) for trade in TRADES]
+	res = columnar.TRADE_LAYOUT.decode(encode(trades))
+
+	assert res["id"].tolist() == [28457, 28458]
+	assert res["quote_quantity"][0] == 48.000012
+	assert res["is_buyer_maker"].tolist() == [True, False]
+	assert res["is_best_match"].tolist() == [True, False]
+
+def test_large_ids_exact():
+	trades = [dict(TRADES[0], id = 2 ** 53 - 1, time = 4102444800000)]
+	res = columnar.TRADE_LAYOUT.decode(encode(trades))
+
+	assert res["id"][0] == 2 ** 53 - 1
+	assert res["time"][0] == 4102444800000
+
+@pytest.mark.parametrize("layout", [columnar.KLINE_LAYOUT, columnar.AGGREGATE_TRADE_LAYOUT, columnar.TRADE_LAYOUT])
+def test_empty_response(layout):
+	res = layout.decode(b'[]')
+
+	assert len(res) == 0
+	assert res.dtype == layout.dtype
+
+def test_array_builder_concatenates_pages():
+	builder = columnar.ArrayBuilder(columnar.KLINE_LAYOUT, capacity = 1)
+	page = columnar.KLINE_LAYOUT.decode(encode(KLINES))
+	for _ in range(5):
+		builder.append(page)
+	builder.append(columnar.KLINE_LAYOUT.empty())
+
+	res = builder.get_array()
+	assert len(res) == 10
+	assert res["open_time"].tolist() == [1499040000000, 1499644800000] * 5